@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon, QFont, QFontDatabase
 from tagqt.ui.main import MainWindow
@@ -47,4 +48,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Frozen builds re-run this entry point in scan worker processes
+    multiprocessing.freeze_support()
     main()
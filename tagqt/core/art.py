@@ -1,3 +1,4 @@
+import json
 import time
 
 import requests
@@ -5,6 +6,22 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from PIL import Image
 from io import BytesIO
+from tagqt.core.httpcache import cache_key, get_http_cache
+from tagqt.core.musicbrainz import MusicBrainzClient
+from tagqt.core.throttle import get_scheduler
+
+# _fetch's marker for a 404, as opposed to None for a failed request
+_NOT_FOUND = object()
+
+
+def _json_has(field):
+    """found() check for a JSON search response: True if field is non-empty."""
+    def found(body):
+        try:
+            return bool(json.loads(body).get(field))
+        except (ValueError, AttributeError):
+            return False
+    return found
 
 class CoverArtManager:
     """Manages cover art searching and downloading from iTunes and MusicBrainz."""
@@ -30,13 +47,42 @@ class CoverArtManager:
                 return None
         return None
 
-    def download_and_process_cover(self, url):
-        def do_download():
-            response = self.session.get(url, timeout=15)
+    def _fetch(self, endpoint, url, params=None, headers=None, timeout=10, found=bool):
+        """
+        GET url through the web cache and return the body, or None if it's
+        missing or unreachable. A 404, or a body that found() rejects, is
+        cached as "not found"; network failures aren't cached.
+        """
+        cache = get_http_cache()
+        key = cache_key(url, params)
+        if cache is not None:
+            hit, body = cache.get(endpoint, key)
+            if hit:
+                return body
+
+        def do_get():
+            response = get_scheduler().get(url, session=self.session, params=params,
+                                           headers=headers, timeout=timeout)
+            if response.status_code == 404:
+                return _NOT_FOUND
             response.raise_for_status()
             return response.content
 
-        content = self._retry(do_download)
+        body = self._retry(do_get)
+        if body is None:
+            return None
+        if body is _NOT_FOUND or not found(body):
+            body = None
+        if cache is not None:
+            cache.put(endpoint, key, body)
+        return body
+
+    @staticmethod
+    def _endpoint(url):
+        return 'coverart' if 'coverartarchive.org' in url or 'mzstatic.com' in url else 'itunes'
+
+    def download_and_process_cover(self, url):
+        content = self._fetch(self._endpoint(url), url, timeout=15)
         if not content:
             return None
 
@@ -53,24 +99,10 @@ class CoverArtManager:
             return None
 
     def search_cover_musicbrainz(self, artist, album):
-        def do_search():
-            query = f'artist:"{artist}" AND release:"{album}"'
-            url = "https://musicbrainz.org/ws/2/release-group"
-            params = {
-                "query": query,
-                "fmt": "json"
-            }
-            headers = {"User-Agent": "tagqt/1.0 ( contact@example.com )"}
-            
-            response = self.session.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            return response.json()
-
-        data = self._retry(do_search)
-        if data and data.get("release-groups"):
-            rg_id = data["release-groups"][0]["id"]
-            cover_url = f"https://coverartarchive.org/release-group/{rg_id}/front"
-            return cover_url
+        # Goes to whichever MusicBrainz source is configured (web, mirror or local dataset)
+        rg_id = MusicBrainzClient.find_release_group(artist, album)
+        if rg_id:
+            return f"https://coverartarchive.org/release-group/{rg_id}/front"
         return None
 
     def search_cover(self, artist, album):
@@ -91,9 +123,9 @@ class CoverArtManager:
                 "entity": "album",
                 "limit": 5
             }
-            response = self.session.get(self.ITUNES_API_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            body = self._fetch('itunes', self.ITUNES_API_URL, params=params,
+                               found=_json_has("results"))
+            data = json.loads(body) if body else {}
             
             for item in data.get("results", []):
                 url = item.get("artworkUrl100")
@@ -0,0 +1,139 @@
+"""Parallel per-file batch execution for the tag-writing workers.
+
+BatchExecutor runs a function over a list of items on a thread pool and
+yields the outcomes in the order the items were given. Concurrency is also
+capped per storage device: an SSD gets the whole pool, a spinning disk one
+file at a time (parallel seeks only slow it down), and a network mount a few
+files to hide latency without flooding the server.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tagqt.core.scan import default_worker_count, is_network_path
+
+ROTATIONAL_LIMIT = 1
+NETWORK_LIMIT = 4
+# How far past the oldest unfinished item work may run ahead
+WINDOW_FACTOR = 4
+
+
+def _is_rotational(dev):
+    """True if the block device behind st_dev is a spinning disk (Linux only)."""
+    try:
+        block = os.path.realpath(f'/sys/dev/block/{os.major(dev)}:{os.minor(dev)}')
+    except (AttributeError, ValueError):
+        return False
+    # Partitions keep their queue settings on the parent disk
+    for directory in (block, os.path.dirname(block)):
+        try:
+            with open(os.path.join(directory, 'queue', 'rotational')) as f:
+                return f.read().strip() == '1'
+        except OSError:
+            continue
+    return False
+
+
+class BatchExecutor:
+    """
+    Ordered, device-aware thread pool for per-file work.
+
+    workers: pool size, defaults to the CPU count.
+    path_of: maps an item to the file path its device is looked up by.
+    """
+
+    def __init__(self, workers=None, path_of=None):
+        self.workers = max(1, workers or default_worker_count())
+        self.path_of = path_of or (lambda item: item)
+        self._limits = {}
+
+    def _device(self, item):
+        path = self.path_of(item)
+        if not isinstance(path, str):
+            return None, self.workers
+        try:
+            dev = os.stat(path).st_dev
+        except (OSError, ValueError):
+            return None, self.workers
+        limit = self._limits.get(dev)
+        if limit is None:
+            if is_network_path(path):
+                limit = NETWORK_LIMIT
+            elif _is_rotational(dev):
+                limit = ROTATIONAL_LIMIT
+            else:
+                limit = self.workers
+            self._limits[dev] = limit = min(limit, self.workers)
+        return dev, limit
+
+    def map(self, func, items, stop_event=None):
+        """
+        Yield (item, result, error) for each item, in the order given; error
+        is the exception func raised, or None. Once stop_event is set no new
+        items are started; the ones already running finish and are yielded.
+        """
+        items = list(items)
+        if not items:
+            return
+        if self.workers == 1 or len(items) == 1:
+            for item in items:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                yield self._call(func, item)
+            return
+
+        devices = {}
+        window = self.workers * WINDOW_FACTOR
+        running = {}    # future -> index
+        active = {}     # device -> files running on it
+        done = {}       # index -> (item, result, error), waiting for earlier items
+        deferred = []   # indices held back by their device's limit
+        next_new = 0
+        next_out = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while next_out < len(items):
+                if stop_event is None or not stop_event.is_set():
+                    # Start the earliest waiting items whose device has room
+                    end = min(len(items), next_out + window)
+                    held = []
+                    for index in deferred + list(range(next_new, end)):
+                        if len(running) >= self.workers:
+                            held.append(index)
+                            continue
+                        if index not in devices:
+                            devices[index] = self._device(items[index])
+                        dev, limit = devices[index]
+                        if active.get(dev, 0) < limit:
+                            active[dev] = active.get(dev, 0) + 1
+                            running[executor.submit(self._call, func, items[index])] = index
+                        else:
+                            held.append(index)
+                    deferred = held
+                    next_new = max(next_new, end)
+                elif not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    active[devices[index][0]] -= 1
+                    done[index] = future.result()
+
+                while next_out in done:
+                    yield done.pop(next_out)
+                    next_out += 1
+
+            # Stopped: hand back what did run, still in order
+            for index in sorted(done):
+                yield done[index]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _call(func, item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
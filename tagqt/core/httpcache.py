@@ -0,0 +1,191 @@
+"""Persistent cache of web service responses.
+
+MusicBrainz, Cover Art Archive, iTunes and LRCLIB responses are stored by
+request, so re-running a batch over the same library doesn't repeat (and
+get throttled on) every lookup. Each endpoint has its own time-to-live;
+"not found" answers are cached too, for a shorter time. The database is
+capped in size and evicts the least recently used responses first.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+CACHE_FILE = os.path.expanduser("~/.config/TagQt/http_cache.db")
+SCHEMA_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+DAY = 24 * 60 * 60
+# Seconds a response stays fresh, per endpoint
+ENDPOINT_TTLS = {
+    'musicbrainz': 30 * DAY,
+    'coverart': 90 * DAY,
+    'itunes': 14 * DAY,
+    'lrclib': 30 * DAY,
+}
+# "Not found" can change as the databases grow, so it expires sooner
+NEGATIVE_TTLS = {
+    'musicbrainz': 3 * DAY,
+    'coverart': 7 * DAY,
+    'itunes': 3 * DAY,
+    'lrclib': 3 * DAY,
+}
+DEFAULT_TTL = 7 * DAY
+DEFAULT_NEGATIVE_TTL = DAY
+
+
+def cache_key(url, params=None):
+    """Canonical key for a GET request: the URL plus its sorted parameters."""
+    if not params:
+        return url
+    return url + '?' + json.dumps(sorted(params.items()), ensure_ascii=False, default=str)
+
+
+class HttpCache:
+    """SQLite-backed response store with per-endpoint TTLs and LRU eviction."""
+
+    def __init__(self, db_path=CACHE_FILE, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS responses")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                endpoint TEXT NOT NULL,
+                key TEXT NOT NULL,
+                body BLOB,
+                size INTEGER NOT NULL,
+                expires REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (endpoint, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, endpoint, key):
+        """
+        Return (hit, body). body is None for a cached "not found"; a miss
+        (hit False) means the caller should make the request.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, size, expires FROM responses WHERE endpoint = ? AND key = ?",
+                (endpoint, key)
+            ).fetchone()
+            if row is None or row[2] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE endpoint = ? AND key = ?", (endpoint, key))
+                    self._total -= row[1]
+                    self._conn.commit()
+                self.misses[endpoint] += 1
+                return False, None
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE endpoint = ? AND key = ?",
+                (now, endpoint, key)
+            )
+            self._conn.commit()
+            self.hits[endpoint] += 1
+            return True, row[0]
+
+    def put(self, endpoint, key, body):
+        """Store a response body, or None to remember that nothing was found."""
+        now = time.time()
+        if body is None:
+            ttl = NEGATIVE_TTLS.get(endpoint, DEFAULT_NEGATIVE_TTL)
+        else:
+            ttl = ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+        size = len(key) + (len(body) if body is not None else 0)
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE endpoint = ? AND key = ?", (endpoint, key)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (endpoint, key, body, size, expires, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (endpoint, key, body, size, now + ttl, now)
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used rows until 10% under the cap, so eviction
+        # doesn't run again on the very next put
+        target = self.max_bytes * 0.9
+        while self._total > target:
+            rows = self._conn.execute(
+                "SELECT endpoint, key, size FROM responses ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._total = 0
+                return
+            for endpoint, key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE endpoint = ? AND key = ?", (endpoint, key))
+                self._total -= size
+                if self._total <= target:
+                    break
+
+    def stats(self):
+        """Return (hits, misses) totals across endpoints since startup."""
+        return sum(self.hits.values()), sum(self.misses.values())
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Return the shared HttpCache, or None if the database can't be opened."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = HttpCache()
+            except (sqlite3.Error, OSError) as e:
+                print(f"[TagQt] Warning: web cache unavailable: {e}")
+                _cache = False
+        return _cache or None
+
+
+def set_http_cache(cache):
+    """
+    Use cache as the shared HttpCache from now on, e.g. one opened at another
+    path; None turns caching off. The one it replaces is closed.
+    """
+    global _cache
+    with _cache_lock:
+        previous, _cache = _cache, cache if cache is not None else False
+    if previous and previous is not cache:
+        previous.close()
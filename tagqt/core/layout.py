@@ -0,0 +1,402 @@
+"""
+Tag layout maintenance: puts tags where readers find them first and leaves
+padding behind them so later edits are written in place.
+
+optimize_file() rewrites a file only when its layout is off:
+
+    MP3   ID3v2.4 at the front, no ID3v1 trailer, duplicate pictures,
+          comments and lyrics dropped, padding near the target
+    FLAC  STREAMINFO, SEEKTABLE, VORBIS_COMMENT, then pictures, with one
+          PADDING block last; no stray ID3 tags; duplicate pictures and
+          comment entries dropped
+    M4A   moov ahead of mdat (chunk offsets are patched), top-level free
+          atoms dropped, padding inside moov near the target
+"""
+
+import os
+import shutil
+import struct
+from collections import namedtuple
+
+from mutagen.flac import FLAC, Padding, Picture, SeekTable, StreamInfo, VCFLACDict
+from mutagen.id3 import ID3, ID3NoHeaderError
+from mutagen.mp4 import MP4
+from mutagen.mp4._atom import Atoms
+
+from tagqt.core.tags import DEFAULT_PADDING
+
+SUPPORTED_EXTENSIONS = ('.mp3', '.flac', '.m4a', '.mp4', '.m4b')
+
+# Below this much padding a file can't take a tag edit in place
+IN_PLACE_HEADROOM = 4 * 1024
+
+_COPY_CHUNK = 1024 * 1024
+_MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+
+class LayoutError(Exception):
+    """Raised when a file's structure can't be safely rewritten."""
+
+
+LayoutResult = namedtuple('LayoutResult', 'path old_size new_size padding changes')
+LayoutResult.__doc__ = """
+Outcome of optimize_file(). changes lists what was done; it is empty when
+the file was already laid out well and left untouched. padding is the free
+space behind the tags afterwards.
+"""
+
+
+class LayoutReport:
+    """Tallies a layout batch: files rewritten, bytes saved, and how many can now be edited in place."""
+
+    def __init__(self):
+        self.optimized = 0
+        self.unchanged = 0
+        self.bytes_saved = 0
+        self.in_place_ready = 0
+
+    def add(self, result):
+        if result.changes:
+            self.optimized += 1
+            self.bytes_saved += result.old_size - result.new_size
+        else:
+            self.unchanged += 1
+        if result.padding >= IN_PLACE_HEADROOM:
+            self.in_place_ready += 1
+
+    @property
+    def files(self):
+        return self.optimized + self.unchanged
+
+    @property
+    def in_place_rate(self):
+        return self.in_place_ready / self.files if self.files else 0.0
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024 or unit == 'MB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def describe(result):
+    """One-line summary of an optimize_file() result for the batch status list."""
+    delta = result.old_size - result.new_size
+    verb = "Saved" if delta >= 0 else "Grew by"
+    return f"{verb} {_format_size(abs(delta))}: {', '.join(result.changes)}"
+
+
+def padding_ok(padding, target):
+    """True if padding is close enough to target that rewriting isn't worth it."""
+    return target // 2 <= padding <= target * 4 + IN_PLACE_HEADROOM
+
+
+def _has_id3v1(path):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < 128:
+            return False
+        f.seek(-128, os.SEEK_END)
+        return f.read(3) == b'TAG'
+
+
+def optimize_file(path, padding=DEFAULT_PADDING):
+    """Normalize the tag layout of one file; returns a LayoutResult."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise LayoutError("Format not supported")
+
+    old_size = os.path.getsize(path)
+    if ext == '.mp3':
+        changes, final_padding = _optimize_mp3(path, padding)
+    elif ext == '.flac':
+        changes, final_padding = _optimize_flac(path, padding)
+    else:
+        changes, final_padding = _optimize_mp4(path, padding)
+    return LayoutResult(path, old_size, os.path.getsize(path), final_padding, changes)
+
+
+# -- MP3 --------------------------------------------------------------------
+
+def _id3_padding(path, id3):
+    """Trailing zero bytes inside the ID3v2 tag (its header included in id3.size)."""
+    if not id3.size:
+        return 0
+    with open(path, 'rb') as f:
+        data = f.read(id3.size)
+    return len(data) - len(data.rstrip(b'\x00'))
+
+
+def _dedupe_frames(id3, frame_id, key):
+    seen = set()
+    dropped = 0
+    for frame in id3.getall(frame_id):
+        k = key(frame)
+        if k in seen:
+            del id3[frame.HashKey]
+            dropped += 1
+        else:
+            seen.add(k)
+    return dropped
+
+
+def _optimize_mp3(path, target):
+    try:
+        id3 = ID3(path)
+    except ID3NoHeaderError:
+        id3 = None
+    if id3 is None:
+        # No tags at all (mutagen reads a lone ID3v1 tag as an ID3 object)
+        return [], 0
+
+    v1 = _has_id3v1(path)
+    changes = []
+    if id3.version < (2, 2, 0):
+        changes.append("ID3v1 → v2.4")
+    elif id3.version != (2, 4, 0):
+        changes.append(f"ID3v2.{id3.version[1]} → v2.4")
+    if v1:
+        changes.append("dropped ID3v1")
+
+    dropped = (_dedupe_frames(id3, 'APIC', lambda f: f.data)
+               + _dedupe_frames(id3, 'COMM', lambda f: (f.lang, f.desc, tuple(f.text)))
+               + _dedupe_frames(id3, 'USLT', lambda f: (f.lang, f.text)))
+    if dropped:
+        changes.append(f"dropped {dropped} duplicate frame{'s' if dropped != 1 else ''}")
+
+    current = _id3_padding(path, id3)
+    if not padding_ok(current, target):
+        changes.append(f"padding {_format_size(current)} → {_format_size(target)}")
+    if not changes:
+        return [], current
+
+    id3.save(path, v1=0, v2_version=4, padding=lambda info: target)
+    return changes, target
+
+
+# -- FLAC -------------------------------------------------------------------
+
+_FLAC_ORDER = {StreamInfo: 0, SeekTable: 1, VCFLACDict: 2, Picture: 4}
+
+
+def _flac_rank(block):
+    # CUESHEET, APPLICATION and unknown blocks go between comments and pictures
+    return _FLAC_ORDER.get(type(block), 3)
+
+
+def _optimize_flac(path, target):
+    audio = FLAC(path)
+    blocks = audio.metadata_blocks
+    changes = []
+
+    with open(path, 'rb') as f:
+        id3_in_front = f.read(3) == b'ID3'
+    if id3_in_front or _has_id3v1(path):
+        changes.append("dropped ID3 tags")
+
+    if audio.tags is not None:
+        seen = set()
+        entries = []
+        for key, value in audio.tags:
+            k = (key.lower(), value)
+            if k not in seen:
+                seen.add(k)
+                entries.append((key, value))
+        if len(entries) < len(audio.tags):
+            dropped = len(audio.tags) - len(entries)
+            audio.tags[:] = entries
+            changes.append(f"dropped {dropped} duplicate comment{'s' if dropped != 1 else ''}")
+
+    seen = set()
+    content = []
+    for block in blocks:
+        if isinstance(block, Padding):
+            continue
+        if isinstance(block, Picture):
+            if block.data in seen:
+                continue
+            seen.add(block.data)
+        content.append(block)
+    pictures = sum(isinstance(b, Picture) for b in blocks)
+    dropped = pictures - len(seen)
+    if dropped:
+        changes.append(f"dropped {dropped} duplicate picture{'s' if dropped != 1 else ''}")
+
+    ordered = sorted(content, key=_flac_rank)
+    if [_flac_rank(b) for b in content] != [_flac_rank(b) for b in ordered]:
+        changes.append("moved comments ahead of pictures")
+
+    pads = [b for b in blocks if isinstance(b, Padding)]
+    current = sum(b.length for b in pads)
+    if not pads:
+        changes.append(f"added {_format_size(target)} padding")
+    elif len(pads) > 1 or not isinstance(blocks[-1], Padding):
+        changes.append(f"merged padding into one {_format_size(target)} block")
+    elif not padding_ok(current, target):
+        changes.append(f"padding {_format_size(current)} → {_format_size(target)}")
+    if not changes:
+        return [], current
+
+    # mutagen writes existing padding blocks as one block after everything else
+    blocks[:] = ordered + pads
+    audio.save(deleteid3=True, padding=lambda info: target)
+    return changes, target
+
+
+# -- MP4 --------------------------------------------------------------------
+
+def _read_atom_header(f, offset, end):
+    """Return (name, size, header_length) of the atom at offset."""
+    f.seek(offset)
+    header = f.read(8)
+    if len(header) < 8:
+        raise LayoutError("Truncated atom header")
+    size, name = struct.unpack('>I4s', header)
+    header_len = 8
+    if size == 1:
+        size = struct.unpack('>Q', f.read(8))[0]
+        header_len = 16
+    elif size == 0:
+        size = end - offset
+    if size < header_len or offset + size > end:
+        raise LayoutError(f"Corrupt {name.decode('latin-1')} atom")
+    return name, size, header_len
+
+
+def _top_level_atoms(path):
+    end = os.path.getsize(path)
+    atoms = []
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset + 8 <= end:
+            name, size, _ = _read_atom_header(f, offset, end)
+            atoms.append((name, offset, size))
+            offset += size
+    return atoms
+
+
+def _chunk_offset_tables(data, start, end):
+    """Yield (name, body offset) of every stco/co64 atom inside moov's bytes."""
+    pos = start
+    while pos + 8 <= end:
+        size, name = struct.unpack_from('>I4s', data, pos)
+        header_len = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, pos + 8)[0]
+            header_len = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_len or pos + size > end:
+            raise LayoutError("Corrupt atom inside moov")
+        if name in _MP4_CONTAINERS:
+            yield from _chunk_offset_tables(data, pos + header_len, pos + size)
+        elif name in (b'stco', b'co64'):
+            yield name, pos + header_len
+        pos += size
+
+
+def _mp4_padding(path):
+    """Size of the free atoms mutagen keeps next to ilst, or 0."""
+    with open(path, 'rb') as f:
+        atoms = Atoms(f)
+    try:
+        meta = atoms.path(b'moov', b'udta', b'meta')[-1]
+    except KeyError:
+        return 0
+    return sum(child.length for child in meta.children or () if child.name == b'free')
+
+
+def _faststart(path, atoms, dest):
+    """
+    Write path to dest with moov moved right after ftyp and top-level free
+    atoms dropped, shifting every chunk offset by how far its atom moved.
+    """
+    moov = next(a for a in atoms if a[0] == b'moov')
+    head = [a for a in atoms if a[0] == b'ftyp']
+    rest = [a for a in atoms if a[0] not in (b'ftyp', b'moov', b'free', b'skip')]
+    order = head + [moov] + rest
+
+    new_offsets = {}
+    position = 0
+    for atom in order:
+        new_offsets[atom[1]] = position
+        position += atom[2]
+
+    with open(path, 'rb') as src:
+        src.seek(moov[1])
+        data = bytearray(src.read(moov[2]))
+        _, _, header_len = _read_atom_header(src, moov[1], moov[1] + moov[2])
+
+        for name, body in _chunk_offset_tables(data, header_len, len(data)):
+            count = struct.unpack_from('>I', data, body + 4)[0]
+            fmt, width = ('>I', 4) if name == b'stco' else ('>Q', 8)
+            for i in range(count):
+                at = body + 8 + i * width
+                value = struct.unpack_from(fmt, data, at)[0]
+                owner = next((a for a in rest if a[1] <= value < a[1] + a[2]), None)
+                if owner is None:
+                    raise LayoutError("Chunk offset points outside the media data")
+                value += new_offsets[owner[1]] - owner[1]
+                if width == 4 and value > 0xFFFFFFFF:
+                    raise LayoutError("Moving moov would overflow 32-bit chunk offsets")
+                struct.pack_into(fmt, data, at, value)
+
+        with open(dest, 'wb') as out:
+            for atom in order:
+                if atom is moov:
+                    out.write(data)
+                    continue
+                src.seek(atom[1])
+                remaining = atom[2]
+                while remaining:
+                    chunk = src.read(min(_COPY_CHUNK, remaining))
+                    if not chunk:
+                        raise LayoutError("File ended early")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+
+
+def _optimize_mp4(path, target):
+    atoms = _top_level_atoms(path)
+    names = [a[0] for a in atoms]
+    if b'moov' not in names:
+        raise LayoutError("No moov atom")
+
+    changes = []
+    moov_late = b'mdat' in names and names.index(b'moov') > names.index(b'mdat')
+    if moov_late:
+        changes.append("moved moov to front")
+        free = sum(a[2] for a in atoms if a[0] in (b'free', b'skip'))
+        if free:
+            changes.append(f"dropped {_format_size(free)} of free atoms")
+
+    current = _mp4_padding(path)
+    if not padding_ok(current, target):
+        changes.append(f"padding {_format_size(current)} → {_format_size(target)}")
+    if not changes:
+        return [], current
+
+    if not moov_late:
+        audio = MP4(path)
+        if audio.tags is None:
+            audio.add_tags()
+        audio.save(padding=lambda info: target)
+        return changes, target
+
+    length = MP4(path).info.length
+    tmp = path + '.tagqt-layout'
+    try:
+        _faststart(path, atoms, tmp)
+        shutil.copymode(path, tmp)
+        audio = MP4(tmp)
+        if audio.tags is None:
+            audio.add_tags()
+        if abs(audio.info.length - length) > 0.01:
+            raise LayoutError("Rewritten file didn't check out; left unchanged")
+        audio.save(padding=lambda info: target)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return changes, target
@@ -0,0 +1,142 @@
+"""Persistent on-disk index of scanned audio files.
+
+Each row is keyed by path and validated against size, mtime and inode, so a
+folder load only re-parses files that are new or changed since the last scan.
+"""
+
+import os
+import sqlite3
+import threading
+
+from tagqt.core.record import TrackRecord
+
+INDEX_FILE = os.path.expanduser("~/.config/TagQt/library.db")
+SCHEMA_VERSION = 5
+
+
+class LibraryIndex:
+    """SQLite-backed cache of TrackRecords keyed by path + size + mtime + inode."""
+
+    def __init__(self, db_path=INDEX_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS tracks")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _folder_range(folder):
+        prefix = os.path.join(folder, '')
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return prefix, upper
+
+    def lookup_folder(self, folder):
+        """Return {path: (size, mtime_ns, inode, json)} for every indexed file under folder."""
+        prefix, upper = self._folder_range(folder)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns, inode, data FROM tracks WHERE path >= ? AND path < ?",
+                (prefix, upper)
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    @staticmethod
+    def is_current(entry, st):
+        size, mtime_ns, inode, _ = entry
+        return size == st.st_size and mtime_ns == st.st_mtime_ns and inode == st.st_ino
+
+    def store(self, entries):
+        """Insert or replace (path, stat_result, TrackRecord) entries."""
+        if not entries:
+            return
+        rows = [(path, st.st_size, st.st_mtime_ns, st.st_ino, record.to_json())
+                for path, st, record in entries]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracks (path, size, mtime_ns, inode, data) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def update(self, path, md):
+        """Refresh an already-indexed file from an open MetadataHandler after it was saved."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        record = TrackRecord.from_handler(path, md, st)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tracks SET size = ?, mtime_ns = ?, inode = ?, data = ? WHERE path = ?",
+                (st.st_size, st.st_mtime_ns, st.st_ino, record.to_json(), path)
+            )
+            self._conn.commit()
+
+    def rename(self, old_path, new_path):
+        with self._lock:
+            self._conn.execute("DELETE FROM tracks WHERE path = ?", (new_path,))
+            self._conn.execute("UPDATE tracks SET path = ? WHERE path = ?", (new_path, old_path))
+            self._conn.commit()
+
+    def remove(self, paths):
+        if not paths:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in paths])
+            self._conn.commit()
+
+    def prune(self, folder, existing_paths):
+        """Drop rows under folder whose files were not seen by the last full scan."""
+        existing = set(existing_paths)
+        stale = [p for p in self.lookup_folder(folder) if p not in existing]
+        self.remove(stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_library_index():
+    """Return the shared LibraryIndex, or None if the database can't be opened."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = LibraryIndex()
+            except (sqlite3.Error, OSError) as e:
+                print(f"[TagQt] Warning: library index unavailable: {e}")
+                _index = False
+        return _index or None
+
+
+def set_library_index(index):
+    """
+    Use index as the shared LibraryIndex from now on, e.g. one opened at
+    another path; None turns indexing off. The one it replaces is closed.
+    """
+    global _index
+    with _index_lock:
+        previous, _index = _index, index if index is not None else False
+    if previous and previous is not index:
+        previous.close()
@@ -1,5 +1,10 @@
+import json
+
 import requests
 
+from tagqt.core.httpcache import cache_key, get_http_cache
+from tagqt.core.throttle import get_scheduler
+
 try:
     import syncedlyrics
     SYNCEDLYRICS_AVAILABLE = True
@@ -11,32 +16,55 @@ class LyricsFetcher:
     """Searches for synced and plain lyrics from lrclib.net."""
     BASE_URL = "https://lrclib.net/api/search"
 
-    def search_lyrics(self, artist, title, album=None):
+    def search_lyrics(self, artist, title, album=None, cancel=None):
+        """
+        LRCLIB results for a track. cancel is an optional threading.Event;
+        setting it while the request is still queued raises RequestCancelled.
+        """
         params = {
             "q": f"{artist} {title}",
         }
         
-        try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data:
-                results.append({
-                    "id": item.get("id"),
-                    "trackName": item.get("trackName"),
-                    "artistName": item.get("artistName"),
-                    "albumName": item.get("albumName"),
-                    "duration": item.get("duration"),
-                    "syncedLyrics": item.get("syncedLyrics"),
-                    "plainLyrics": item.get("plainLyrics"),
-                    "isSynced": bool(item.get("syncedLyrics"))
-                })
-            return results
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching lyrics: {e}")
-            return []
+        cache = get_http_cache()
+        key = cache_key(self.BASE_URL, params)
+        data = None
+        if cache is not None:
+            hit, body = cache.get('lrclib', key)
+            if hit:
+                data = json.loads(body) if body is not None else []
+
+        if data is None:
+            try:
+                response = get_scheduler().get(self.BASE_URL, params=params, timeout=10, cancel=cancel)
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching lyrics: {e}")
+                return []
+            if cache is not None:
+                # An empty result list is cached as "not found"
+                cache.put('lrclib', key, response.content if data else None)
+
+        results = []
+        for item in data:
+            results.append({
+                "id": item.get("id"),
+                "trackName": item.get("trackName"),
+                "artistName": item.get("artistName"),
+                "albumName": item.get("albumName"),
+                "duration": item.get("duration"),
+                "syncedLyrics": item.get("syncedLyrics"),
+                "plainLyrics": item.get("plainLyrics"),
+                "isSynced": bool(item.get("syncedLyrics"))
+            })
+        return results
+
+    @staticmethod
+    def _synced_search(artist, title, enhanced):
+        """syncedlyrics.search(), scheduled as one request since it does its own fetching."""
+        import syncedlyrics
+        with get_scheduler().slot("syncedlyrics"):
+            return syncedlyrics.search(f"{artist} {title}", enhanced=enhanced)
 
     def search_with_providers(self, artist: str, title: str,
                                album: str | None,
@@ -51,9 +79,8 @@ class LyricsFetcher:
                 continue
             try:
                 if key in ("syncedlyrics_word", "syncedlyrics_line"):
-                    import syncedlyrics
                     enhanced = key == "syncedlyrics_word"
-                    lrc = syncedlyrics.search(f"{artist} {title}", enhanced=enhanced)
+                    lrc = self._synced_search(artist, title, enhanced)
                     if lrc:
                         label = "Word Synced" if enhanced else "Line Synced"
                         all_results.append({
@@ -92,16 +119,12 @@ class LyricsFetcher:
                 continue
             try:
                 if key == "syncedlyrics_word":
-                    # calls syncedlyrics.search() directly rather than through
-                    # a separate method so we only hit the API once per provider slot
-                    import syncedlyrics
-                    result = syncedlyrics.search(f"{artist} {title}", enhanced=True)
+                    result = self._synced_search(artist, title, enhanced=True)
                     if result:
                         return result, key
 
                 elif key == "syncedlyrics_line":
-                    import syncedlyrics
-                    result = syncedlyrics.search(f"{artist} {title}", enhanced=False)
+                    result = self._synced_search(artist, title, enhanced=False)
                     if result:
                         return result, key
 
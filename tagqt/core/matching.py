@@ -0,0 +1,206 @@
+"""
+Matches an album's files to a release's tracklist in one pass.
+
+Every file is scored against every track on three signals, each 0..1:
+
+    title      token overlap blended with a character-level ratio, so
+               "Intro" prefers "Intro" over "Intro (Reprise)" and near
+               spellings still score high
+    number     track (and disc) number from the tags or the filename
+    duration   closeness of the file's length to the recording's
+
+Signals a file doesn't have are left out of its score rather than counted
+as a mismatch. The files are then assigned to tracks so the total score is
+highest (Hungarian algorithm), and pairs below MIN_SCORE are dropped.
+Files already tagged with a MusicBrainz recording ID on the release skip
+the scoring and go straight to that track.
+"""
+
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+TITLE_WEIGHT = 0.6
+NUMBER_WEIGHT = 0.2
+DURATION_WEIGHT = 0.2
+MIN_SCORE = 0.5
+# Length differences beyond this many seconds score zero
+DURATION_TOLERANCE = 30.0
+
+FileFacts = namedtuple('FileFacts', 'title alt_title track disc duration recording_id',
+                       defaults=(None,))
+FileFacts.__doc__ = """
+What's known about one file: its title tag, a title guessed from the
+filename, track and disc numbers (None when unknown), length in seconds
+and the MusicBrainz recording ID from its tags, if any.
+"""
+
+Track = namedtuple('Track', 'disc position title length count recording')
+
+_LEADING_INT = re.compile(r'\s*(\d+)')
+
+
+def leading_int(text):
+    """3 from "3/12" or "03 Song"; None if text doesn't start with a number."""
+    m = _LEADING_INT.match(str(text)) if text else None
+    return int(m.group(1)) if m else None
+
+
+def facts_for(path, md, alt_title):
+    """FileFacts from an open MetadataHandler; alt_title is the filename-derived title."""
+    track = leading_int(md.track_number)
+    if track is None:
+        track = leading_int(os.path.basename(path))
+    # A bare "04.mp3" gives a number, not a title
+    if alt_title and alt_title.strip().isdigit():
+        alt_title = ''
+    return FileFacts(md.title or '', alt_title or '', track,
+                     leading_int(md.disc_number), md.duration or 0,
+                     md.musicbrainz_track_id or None)
+
+
+def _tokens(title):
+    text = unicodedata.normalize('NFKD', title.lower())
+    # "Don't", "Don’t" and "Dont" are the same word
+    text = re.sub(r"['\u2019`]", '', text)
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^\w]+', ' ', text).split()
+
+
+def title_similarity(a, b):
+    """0..1 similarity of two titles; 1.0 when they normalize the same."""
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta or not tb:
+        return 0.0
+    if ta == tb:
+        return 1.0
+    shared = len(set(ta) & set(tb))
+    dice = 2 * shared / (len(set(ta)) + len(set(tb)))
+    ratio = SequenceMatcher(None, ' '.join(ta), ' '.join(tb)).ratio()
+    return (dice + ratio) / 2
+
+
+def release_tracks(release):
+    """Flatten a MusicBrainz release's media into Tracks."""
+    tracks = []
+    for disc_num, disc in enumerate(release.get("medium-list", []), 1):
+        track_list = disc.get("track-list", [])
+        for track in track_list:
+            recording = track.get("recording", {})
+            length = track.get("length") or recording.get("length")
+            tracks.append(Track(
+                disc_num,
+                int(track["position"]) if track.get("position") else None,
+                recording.get("title") or track.get("title") or "",
+                int(length) / 1000 if length else 0,
+                len(track_list),
+                recording,
+            ))
+    return tracks
+
+
+def score(facts, track, multi_disc):
+    total = weight = 0.0
+
+    titles = [t for t in (facts.title, facts.alt_title) if t]
+    if titles and track.title:
+        total += TITLE_WEIGHT * max(title_similarity(t, track.title) for t in titles)
+        weight += TITLE_WEIGHT
+
+    if facts.track is not None and track.position is not None:
+        same = facts.track == track.position
+        if same and multi_disc and facts.disc is not None:
+            same = facts.disc == track.disc
+        total += NUMBER_WEIGHT * same
+        weight += NUMBER_WEIGHT
+
+    if facts.duration and track.length:
+        diff = abs(facts.duration - track.length)
+        total += DURATION_WEIGHT * max(0.0, 1 - diff / DURATION_TOLERANCE)
+        weight += DURATION_WEIGHT
+
+    return total / weight if weight else 0.0
+
+
+def _assign(cost):
+    """
+    Minimum-cost assignment of rows to columns (rows <= columns).
+    Returns {row: column}. O(rows^2 * columns).
+    """
+    n, m = len(cost), len(cost[0])
+    inf = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)   # column -> row (1-based), 0 if free
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta, j1 = inf, 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - ui0 - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    return {owner[j] - 1: j - 1 for j in range(1, m + 1) if owner[j]}
+
+
+def match_files(facts, tracks):
+    """
+    Assign files to tracks. facts is a list of FileFacts; returns
+    {file index: (Track, score)} for the files that matched.
+    """
+    if not facts or not tracks:
+        return {}
+
+    result = {}
+    by_recording = {t.recording.get('id'): t for t in tracks if t.recording.get('id')}
+    for i, f in enumerate(facts):
+        track = by_recording.pop(f.recording_id, None) if f.recording_id else None
+        if track is not None:
+            result[i] = (track, 1.0)
+
+    taken = {id(t) for t, _ in result.values()}
+    file_idx = [i for i in range(len(facts)) if i not in result]
+    track_idx = [j for j, t in enumerate(tracks) if id(t) not in taken]
+    if not file_idx or not track_idx:
+        return result
+
+    multi_disc = len({t.disc for t in tracks}) > 1
+    scores = [[score(facts[i], tracks[j], multi_disc) for j in track_idx] for i in file_idx]
+
+    if len(file_idx) <= len(track_idx):
+        pairs = _assign([[1 - s for s in row] for row in scores])
+    else:
+        transposed = [[1 - scores[a][b] for a in range(len(file_idx))] for b in range(len(track_idx))]
+        pairs = {a: b for b, a in _assign(transposed).items()}
+
+    for a, b in pairs.items():
+        if scores[a][b] >= MIN_SCORE:
+            result[file_idx[a]] = (tracks[track_idx[b]], scores[a][b])
+    return result
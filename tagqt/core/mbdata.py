@@ -0,0 +1,344 @@
+"""Offline MusicBrainz dataset.
+
+Releases, release groups and artists imported from the MusicBrainz JSON
+dumps (https://data.metabrainz.org/pub/musicbrainz/data/json-dumps/) into a
+local SQLite file. LocalDataset answers the four musicbrainzngs calls the
+auto-tagger makes, in the same shapes, so MusicBrainzClient can use it in
+place of the web service with no rate limit and no network.
+
+Build a dataset from the downloaded dump archives with
+
+    python -m tagqt.core.mbdata musicbrainz.db release.tar.xz artist.tar.xz ...
+
+Only the fields TagQt reads are kept, compressed, per entity.
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import re
+import sqlite3
+import sys
+import tarfile
+import threading
+import unicodedata
+import zlib
+
+SCHEMA_VERSION = 1
+KINDS = ('release', 'release-group', 'artist')
+IMPORT_BATCH = 1000
+
+
+class DatasetError(Exception):
+    pass
+
+
+def normalize(text):
+    """Lowercase ASCII words only; how titles and names are indexed and looked up."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r"[''`]", '', text.lower())
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+def _tag_list(entity):
+    """JSON dump tags (or genres) as a musicbrainzngs tag-list."""
+    tags = entity.get('tags') or entity.get('genres') or []
+    return [{'name': t.get('name', ''), 'count': str(t.get('count', 0))} for t in tags]
+
+
+def _artist_credit(entity):
+    credits = []
+    for credit in entity.get('artist-credit') or []:
+        artist = credit.get('artist') or {}
+        credits.append({
+            'name': credit.get('name') or artist.get('name', ''),
+            'artist': {'id': artist.get('id'), 'name': artist.get('name', '')},
+        })
+        if credit.get('joinphrase'):
+            credits.append(credit['joinphrase'])
+    return credits
+
+
+def convert_release(entity):
+    """A JSON dump release as musicbrainzngs returns it from get_release_by_id."""
+    media = []
+    track_total = 0
+    for medium in entity.get('media') or []:
+        tracks = []
+        for track in medium.get('tracks') or []:
+            recording = track.get('recording') or {}
+            length = track.get('length') or recording.get('length')
+            tracks.append({
+                'id': track.get('id'),
+                'position': str(track.get('position', '')),
+                'number': track.get('number'),
+                'length': str(length) if length else None,
+                'recording': {
+                    'id': recording.get('id'),
+                    'title': recording.get('title') or track.get('title', ''),
+                    'length': str(recording['length']) if recording.get('length') else None,
+                    'genre-list': [{'name': g.get('name', ''), 'count': str(g.get('count', 0))}
+                                   for g in recording.get('genres') or []],
+                },
+            })
+        track_total += len(tracks)
+        media.append({
+            'position': str(medium.get('position', '')),
+            'format': medium.get('format'),
+            'track-count': medium.get('track-count', len(tracks)),
+            'track-list': tracks,
+        })
+    group = entity.get('release-group') or {}
+    return {
+        'id': entity['id'],
+        'title': entity.get('title', ''),
+        'status': entity.get('status') or '',
+        'date': entity.get('date') or '',
+        'country': entity.get('country') or '',
+        'artist-credit': _artist_credit(entity),
+        'release-group': {'id': group['id']} if group.get('id') else {},
+        'tag-list': _tag_list(entity),
+        'medium-list': media,
+        'medium-track-count': track_total,
+    }
+
+
+def convert_release_group(entity):
+    return {'id': entity['id'], 'title': entity.get('title', ''), 'tag-list': _tag_list(entity)}
+
+
+def convert_artist(entity):
+    return {'id': entity['id'], 'name': entity.get('name', ''), 'tag-list': _tag_list(entity)}
+
+
+def _credit_name(release):
+    return ''.join(c if isinstance(c, str) else c.get('name', '') for c in release.get('artist-credit', []))
+
+
+def _pack(data):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def _connect(db_path, readonly=False):
+    if readonly:
+        if not os.path.exists(db_path):
+            raise DatasetError(f"{db_path} doesn't exist")
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.close()
+            raise DatasetError(f"{db_path} isn't a TagQt MusicBrainz dataset (or needs re-importing)")
+        return conn
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS releases (
+            id TEXT PRIMARY KEY,
+            title_norm TEXT NOT NULL,
+            artist_norm TEXT NOT NULL,
+            data BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS releases_title ON releases (title_norm);
+        CREATE INDEX IF NOT EXISTS releases_artist ON releases (artist_norm);
+        CREATE TABLE IF NOT EXISTS release_groups (id TEXT PRIMARY KEY, data BLOB NOT NULL);
+        CREATE TABLE IF NOT EXISTS artists (id TEXT PRIMARY KEY, data BLOB NOT NULL);
+    """)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+class LocalDataset:
+    """
+    Read-only view of an imported dataset with the musicbrainzngs methods
+    MusicBrainzClient calls. Lookups of unknown IDs return an empty dict,
+    which the client treats as "not found".
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = _connect(db_path, readonly=True)
+        self._lock = threading.Lock()
+
+    def _fetch(self, sql, args):
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def _by_id(self, table, entity_id):
+        rows = self._fetch(f"SELECT data FROM {table} WHERE id = ?", (entity_id,))
+        return _unpack(rows[0][0]) if rows else None
+
+    def search_releases(self, artist=None, release=None, limit=25, **kwargs):
+        """
+        Releases whose normalized title is the album's (or starts with it,
+        for "Album (Deluxe Edition)"), ranked like the web search's ext:score:
+        exact artist 100, partial 90, and 60 when the artist doesn't match.
+        """
+        title, name = normalize(release), normalize(artist)
+        if title:
+            rows = self._fetch("SELECT artist_norm, data FROM releases WHERE title_norm = ?", (title,))
+            if not rows:
+                rows = self._fetch(
+                    "SELECT artist_norm, data FROM releases WHERE title_norm GLOB ? LIMIT 500", (title + ' *',))
+        elif name:
+            rows = self._fetch("SELECT artist_norm, data FROM releases WHERE artist_norm = ? LIMIT 500", (name,))
+        else:
+            return {'release-list': [], 'release-count': 0}
+
+        ranked = []
+        for artist_norm, blob in rows:
+            if not name or artist_norm == name:
+                relevance = 100
+            elif name in artist_norm or artist_norm in name:
+                relevance = 90
+            else:
+                relevance = 60
+            ranked.append((relevance, blob))
+        ranked.sort(key=lambda r: -r[0])
+
+        results = []
+        for relevance, blob in ranked[:limit]:
+            data = _unpack(blob)
+            data['ext:score'] = str(relevance)
+            results.append(data)
+        return {'release-list': results, 'release-count': len(results)}
+
+    def get_release_by_id(self, release_id, includes=None):
+        data = self._by_id('releases', release_id)
+        return {'release': data} if data else {}
+
+    def get_release_group_by_id(self, group_id, includes=None):
+        data = self._by_id('release_groups', group_id)
+        return {'release-group': data} if data else {}
+
+    def get_artist_by_id(self, artist_id, includes=None):
+        data = self._by_id('artists', artist_id)
+        return {'artist': data} if data else {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _open_text(path):
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _kind_of(name):
+    base = os.path.basename(name)
+    for kind in sorted(KINDS, key=len, reverse=True):
+        if base == kind or base.startswith(kind + '.') or base.startswith(kind + '_'):
+            return kind
+    return None
+
+
+def _dump_streams(path):
+    """Yield (kind, line iterator) for each entity file in a dump archive or JSON-lines file."""
+    if '.tar' in os.path.basename(path):
+        with tarfile.open(path, 'r:*') as tar:
+            for member in tar:
+                kind = _kind_of(member.name) if member.name.startswith('mbdump/') else None
+                if kind and member.isfile():
+                    f = tar.extractfile(member)
+                    yield kind, (line.decode('utf-8') for line in f)
+        return
+    kind = _kind_of(path)
+    if kind is None:
+        raise DatasetError(f"Can't tell what {path} contains; name it release, release-group or artist")
+    with _open_text(path) as f:
+        yield kind, f
+
+
+def import_dump(db_path, paths, progress=None):
+    """
+    Add the entities in the given dump files to the dataset at db_path,
+    replacing any already there. progress(kind, count) is called every
+    IMPORT_BATCH entities. Returns the number imported per kind.
+    """
+    conn = _connect(db_path)
+    counts = dict.fromkeys(KINDS, 0)
+    try:
+        for path in paths:
+            for kind, lines in _dump_streams(path):
+                batch = []
+                for line in lines:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entity = json.loads(line)
+                    if kind == 'release':
+                        data = convert_release(entity)
+                        batch.append((data['id'], normalize(data['title']), normalize(_credit_name(data)), _pack(data)))
+                    elif kind == 'release-group':
+                        batch.append((entity['id'], _pack(convert_release_group(entity))))
+                    else:
+                        batch.append((entity['id'], _pack(convert_artist(entity))))
+                    if len(batch) >= IMPORT_BATCH:
+                        counts[kind] += _insert(conn, kind, batch)
+                        batch = []
+                        if progress:
+                            progress(kind, counts[kind])
+                counts[kind] += _insert(conn, kind, batch)
+                if progress:
+                    progress(kind, counts[kind])
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return counts
+
+
+def _insert(conn, kind, batch):
+    if not batch:
+        return 0
+    if kind == 'release':
+        sql = "INSERT OR REPLACE INTO releases (id, title_norm, artist_norm, data) VALUES (?, ?, ?, ?)"
+    elif kind == 'release-group':
+        sql = "INSERT OR REPLACE INTO release_groups (id, data) VALUES (?, ?)"
+    else:
+        sql = "INSERT OR REPLACE INTO artists (id, data) VALUES (?, ?)"
+    with conn:
+        conn.executemany(sql, batch)
+    return len(batch)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2:
+        print("usage: python -m tagqt.core.mbdata DATASET.db DUMP [DUMP ...]")
+        print("DUMP is a MusicBrainz JSON dump archive (release.tar.xz, release-group.tar.xz,")
+        print("artist.tar.xz) or a JSON-lines file named after its entity type.")
+        return 2
+
+    current = []
+
+    def report(kind, count):
+        if current and current[-1] != kind:
+            print()
+        current[:] = [kind]
+        print(f"\r{kind}: {count}", end='', flush=True)
+
+    try:
+        counts = import_dump(argv[0], argv[1:], progress=report)
+    except (DatasetError, OSError, sqlite3.Error, ValueError, tarfile.TarError) as e:
+        print(f"\nImport failed: {e}")
+        return 1
+    print()
+    print(", ".join(f"{count} {kind}s" for kind, count in counts.items() if count))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
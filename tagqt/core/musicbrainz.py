@@ -1,14 +1,220 @@
 import musicbrainzngs
+import json
 import re
 import unicodedata
 import time
+import threading
+import sqlite3
+from contextlib import nullcontext
+from urllib.parse import urlparse
 import requests
+from tagqt.core.httpcache import get_http_cache
+from tagqt.core.mbdata import DatasetError, LocalDataset
+from tagqt.core.matching import match_files, release_tracks
+from tagqt.core.throttle import HostPolicy, get_scheduler
 
 musicbrainzngs.set_useragent("TagQt", "1.0", "https://github.com/example/tagqt")
-musicbrainzngs.set_rate_limit(limit_or_interval=1.0, new_requests=1)
+# Requests are paced by the shared scheduler (tagqt.core.throttle) instead,
+# so cover searches on musicbrainz.org count against the same limit
+musicbrainzngs.set_rate_limit(False)
+
+DEFAULT_SERVER = "https://musicbrainz.org"
+# A self-hosted mirror has no rate limit; this caps the requests sent at once
+MIRROR_IN_FLIGHT = 8
+
+# Weights of the signals a search candidate is ranked on; see score_release()
+RELEASE_WEIGHTS = {
+    "tracks": 0.4,
+    "duration": 0.2,
+    "status": 0.15,
+    "country": 0.1,
+    "date": 0.1,
+    "relevance": 0.05,
+}
+# At most this many equally plausible candidates have their tracklists
+# downloaded to compare durations
+DURATION_SHORTLIST = 3
+# Seconds of total-length difference per track that still scores anything
+DURATION_SLACK = 10.0
+
+
+def _year(date):
+    return int(date[:4]) if date and date[:4].isdigit() else None
+
+
+def _release_track_count(release):
+    """Track count from a search result or a full release."""
+    if release.get("medium-track-count") is not None:
+        return int(release["medium-track-count"])
+    count = 0
+    for medium in release.get("medium-list", []):
+        if medium.get("track-count") is not None:
+            count += int(medium["track-count"])
+        else:
+            count += len(medium.get("track-list", []))
+    return count or None
+
+
+def _release_length(release):
+    """Total length in seconds from a full release, or None if any track lacks one."""
+    total = 0
+    for medium in release.get("medium-list", []):
+        for track in medium.get("track-list", []):
+            length = track.get("length") or track.get("recording", {}).get("length")
+            if not length:
+                return None
+            total += int(length) / 1000
+    return total or None
+
+
+def score_release(candidate, file_count=None, duration=None, country=None,
+                  earliest_year=None, tracklist=None):
+    """
+    Rank a search candidate 0..1 against the album's files: its track count
+    against the number of files, total length against theirs (needs the
+    full tracklist), official status, release country, how close its date
+    is to the earliest edition, and MusicBrainz's own search relevance.
+    Signals that can't be judged are left out rather than scored as zero.
+    """
+    signals = {}
+
+    tracks = _release_track_count(candidate)
+    if file_count and tracks:
+        if tracks == file_count:
+            signals["tracks"] = 1.0
+        elif tracks > file_count:
+            # Some files may be missing from the folder
+            signals["tracks"] = 0.8 * file_count / tracks
+        else:
+            # More files than tracks can't all match
+            signals["tracks"] = 0.0
+
+    if duration and tracklist is not None and tracks == file_count:
+        length = _release_length(tracklist)
+        if length:
+            slack = DURATION_SLACK * file_count
+            signals["duration"] = max(0.0, 1 - abs(length - duration) / slack)
+
+    signals["status"] = 1.0 if candidate.get("status") == "Official" else 0.3
+
+    release_country = candidate.get("country")
+    if country and release_country == country:
+        signals["country"] = 1.0
+    elif release_country == "XW":
+        signals["country"] = 0.75
+    elif not release_country:
+        signals["country"] = 0.5
+    else:
+        signals["country"] = 0.25 if country else 0.5
+
+    year = _year(candidate.get("date", ""))
+    if year and earliest_year:
+        signals["date"] = max(0.0, 1 - (year - earliest_year) / 10)
+    elif earliest_year:
+        signals["date"] = 0.0
+
+    relevance = candidate.get("ext:score")
+    if relevance is not None:
+        signals["relevance"] = int(relevance) / 100
+
+    weight = sum(RELEASE_WEIGHTS[k] for k in signals)
+    return sum(RELEASE_WEIGHTS[k] * v for k, v in signals.items()) / weight if weight else 0.0
+
+
+class GenreMemo:
+    """
+    Resolved genre lists by (kind, MusicBrainz ID) for the life of the
+    process. Answers, including empty ones, are remembered, so every album
+    by an artist shares one lookup. A failed lookup (fetch returns None) is
+    not, so the next album asks again. Concurrent callers asking for the
+    same ID wait for the first one instead of making their own request.
+    The raw responses behind it are also kept in the on-disk web cache.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, key, fetch):
+        while True:
+            with self._lock:
+                if (kind, key) in self._values:
+                    return self._values[(kind, key)]
+                pending = self._pending.get((kind, key))
+                if pending is None:
+                    pending = self._pending[(kind, key)] = threading.Event()
+                    break
+            pending.wait()
+
+        value = None
+        try:
+            value = fetch(key)
+        finally:
+            with self._lock:
+                if value is not None:
+                    self._values[(kind, key)] = value
+                del self._pending[(kind, key)]
+            pending.set()
+        return value or []
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def _top_names(tags, limit=3):
+    """Names of the most-voted tags or genres."""
+    sorted_tags = sorted(tags, key=lambda x: int(x.get("count", 0)), reverse=True)
+    return [t.get("name", "") for t in sorted_tags[:limit]]
+
 
 class MusicBrainzClient:
     """Queries MusicBrainz for release, artist, and genre metadata."""
+    genre_memo = GenreMemo()
+    # Anything with musicbrainzngs' search_releases / get_*_by_id calls:
+    # the module itself for musicbrainz.org or a mirror, or a LocalDataset
+    backend = musicbrainzngs
+    server = DEFAULT_SERVER
+
+    @classmethod
+    def configure(cls, source="web", server=None, dataset=None):
+        """
+        Choose where lookups go: "web" (musicbrainz.org, 1 request/s),
+        "mirror" (a self-hosted server at the server URL, not rate limited)
+        or "local" (an imported dataset file, see tagqt.core.mbdata).
+        Falls back to musicbrainz.org if the mirror URL or dataset is unusable.
+        Returns the source actually in use.
+        """
+        if cls.backend is not musicbrainzngs:
+            cls.backend.close()
+        cls.backend = musicbrainzngs
+        cls.server = DEFAULT_SERVER
+        cls.genre_memo.clear()
+
+        if source == "local" and dataset:
+            try:
+                cls.backend = LocalDataset(dataset)
+                return "local"
+            except (DatasetError, sqlite3.Error) as e:
+                print(f"[TagQt] Warning: MusicBrainz dataset unavailable, using musicbrainz.org: {e}")
+
+        url = urlparse(server or "") if source == "mirror" else None
+        if url and url.scheme in ("http", "https") and url.netloc:
+            # musicbrainzngs appends /ws/2/... straight after the host, so a
+            # mirror served under a path prefix keeps it by passing it along
+            base = re.sub(r"/ws/2$", "", url.path.rstrip("/"))
+            musicbrainzngs.set_hostname(url.netloc + base, use_https=url.scheme == "https")
+            get_scheduler().set_policy(url.hostname, HostPolicy(None, 1, MIRROR_IN_FLIGHT))
+            cls.server = server
+            return "mirror"
+        if source == "mirror":
+            print(f"[TagQt] Warning: invalid MusicBrainz mirror URL {server!r}, using musicbrainz.org")
+
+        default = urlparse(DEFAULT_SERVER)
+        musicbrainzngs.set_hostname(default.netloc, use_https=default.scheme == "https")
+        return "web"
+
     @staticmethod
     def normalize_title(title):
         if not title:
@@ -48,39 +254,139 @@ class MusicBrainzClient:
             except musicbrainzngs.MusicBrainzError as e:
                 print(f"MusicBrainz API error: {e}")
                 return None
+            except sqlite3.Error as e:
+                print(f"MusicBrainz dataset error: {e}")
+                return None
         return None
+
+    @classmethod
+    def _query(cls, key, func, found=bool, missing=None):
+        """
+        Run a musicbrainzngs call through the web cache. A 404, or a result
+        that found() rejects, is cached as "not found" and returned as
+        missing; a lookup that failed returns None.
+        """
+        # A local dataset is already on disk; caching it again gains nothing
+        cache = get_http_cache() if cls.backend is musicbrainzngs else None
+        if cache is not None:
+            hit, body = cache.get('musicbrainz', key)
+            if hit:
+                return json.loads(body) if body is not None else missing
+
+        not_found = False
+
+        def call():
+            nonlocal not_found
+            slot = get_scheduler().slot(cls.server) if cls.backend is musicbrainzngs else nullcontext()
+            try:
+                with slot:
+                    return func()
+            except musicbrainzngs.ResponseError as e:
+                if getattr(e.cause, 'code', None) != 404:
+                    raise
+                not_found = True
+                return None
+
+        data = cls._retry(call)
+        if data is not None and not found(data):
+            data, not_found = None, True
+        if cache is not None and (data is not None or not_found):
+            cache.put('musicbrainz', key, json.dumps(data).encode('utf-8') if data is not None else None)
+        return missing if not_found else data
     
     @classmethod
-    def search_release(cls, artist, album, track_title=None):
+    def choose_release(cls, releases, file_count=None, duration=None, country=None):
+        """
+        Pick the search candidate that best fits the album's files; returns
+        (release, score, tracklist). Tracklists are only downloaded when
+        durations are needed to separate several candidates with the right
+        track count; tracklist is the winner's fetch_release() result if it
+        was downloaded, else None.
+        """
+        years = [_year(r.get("date", "")) for r in releases]
+        earliest = min((y for y in years if y), default=None)
+        scored = [
+            (score_release(r, file_count, None, country, earliest), i, r)
+            for i, r in enumerate(releases)
+        ]
+        scored.sort(key=lambda x: (-x[0], x[1]))
+
+        tracklists = {}  # candidate index -> fetch_release() result
+        if duration and file_count:
+            shortlist = [(s, i, r) for s, i, r in scored
+                         if _release_track_count(r) == file_count][:DURATION_SHORTLIST]
+            if len(shortlist) > 1:
+                rescored = []
+                for _, i, r in shortlist:
+                    tracklists[i] = cls.fetch_release(r.get("id"))
+                    rescored.append((score_release(r, file_count, duration, country, earliest, tracklists[i]), i, r))
+                others = [x for x in scored if x[1] not in tracklists]
+                scored = sorted(rescored + others, key=lambda x: (-x[0], x[1]))
+
+        best_score, best_index, best = scored[0]
+        return best, best_score, tracklists.get(best_index)
+
+    @classmethod
+    def _search_releases(cls, artist, album):
+        """Release search candidates for artist and album, best match first."""
         if not artist and not album:
-            return None
+            return []
         
         def do_search():
-            return musicbrainzngs.search_releases(
+            return cls.backend.search_releases(
                 artist=artist,
                 release=album,
                 limit=10
             )
         
-        data = cls._retry(do_search)
-        if not data:
-            return None
-            
-        releases = data.get("release-list", [])
+        data = cls._query(json.dumps(['release-search', artist, album]), do_search,
+                          found=lambda d: bool(d.get("release-list")))
+        return data.get("release-list", []) if data else []
+
+    @classmethod
+    def find_release_group(cls, artist, album):
+        """
+        ID of the release group of the best search match for artist and
+        album, or None. Uses the same search as search_release(), so cover
+        lookups share its cache and the configured source.
+        """
+        for release in cls._search_releases(artist, album):
+            group_id = (release.get("release-group") or {}).get("id")
+            if group_id:
+                return group_id
+        return None
+
+    @classmethod
+    def search_release(cls, artist, album, file_count=None, duration=None, country=None):
+        """
+        Search for a release and choose among the candidates with
+        choose_release(); file_count, duration (total seconds) and country
+        describe the files being tagged and may be left out. If choosing
+        downloaded the winner's tracklist, it comes back as "tracklist".
+        """
+        releases = cls._search_releases(artist, album)
         if not releases:
             return None
         
-        official = [r for r in releases if r.get("status") == "Official"]
-        best = official[0] if official else releases[0]
-        
-        release_id = best.get("id")
-        
+        best, score, tracklist = cls.choose_release(releases, file_count, duration, country)
+        result = cls.summarize_release(best, score)
+        result["tracklist"] = tracklist
+        return result
+
+    @classmethod
+    def summarize_release(cls, best, score=None):
+        """
+        The release-level fields auto-tag writes, from a search candidate or
+        a fetch_release() result, with the genre fallbacks resolved.
+        """
         result = {
-            "id": release_id,
+            "id": best.get("id"),
             "title": best.get("title"),
             "date": best.get("date", ""),
             "country": best.get("country", ""),
             "status": best.get("status", ""),
+            "score": score,
+            "release_track_count": _release_track_count(best),
             "artist": "",
             "genres": [],
             "disc_count": 1,
@@ -100,56 +406,56 @@ class MusicBrainzClient:
                 result["artist"] = first.get("name", "") or first.get("artist", {}).get("name", "")
                 result["artist_id"] = first.get("artist", {}).get("id")
         
-        tags = best.get("tag-list", [])
-        if tags:
-            sorted_tags = sorted(tags, key=lambda x: int(x.get("count", 0)), reverse=True)
-            result["genres"] = [t.get("name", "") for t in sorted_tags[:3]]
+        result["genres"] = _top_names(best.get("tag-list", []))
         
         if not result["genres"] and result.get("release_group_id"):
-            rg_genres = cls.lookup_release_group(result["release_group_id"])
-            if rg_genres:
-                result["genres"] = rg_genres
+            result["genres"] = cls.genre_memo.get("release-group", result["release_group_id"], cls.lookup_release_group)
         
         if not result["genres"] and result.get("artist_id"):
-            artist_genres = cls.lookup_artist(result["artist_id"])
-            if artist_genres:
-                result["genres"] = artist_genres
+            result["genres"] = cls.genre_memo.get("artist", result["artist_id"], cls.lookup_artist)
         
         return result
     
     @classmethod
-    def lookup_release(cls, release_id, track_title=None):
+    def fetch_release(cls, release_id):
+        """Download a release with its tracklist; match_track() reads it without further requests."""
         if not release_id:
             return None
             
+        includes = ["recordings", "media", "tags", "release-groups", "artist-credits"]
+
         def do_lookup():
-            return musicbrainzngs.get_release_by_id(
-                release_id,
-                includes=["recordings", "media", "tags", "release-groups"]
-            )
+            return cls.backend.get_release_by_id(release_id, includes=includes)
         
-        data = cls._retry(do_lookup)
+        data = cls._query(json.dumps(['release', release_id, includes]), do_lookup)
         if not data:
             return None
-            
-        release = data.get("release", {})
-        
-        result = {
-            "genres": [],
-            "disc_count": 1,
+        return data.get("release", {})
+
+    @classmethod
+    def lookup_release(cls, release_id, track_title=None):
+        release = cls.fetch_release(release_id)
+        if release is None:
+            return None
+        return cls.match_track(release, track_title)
+
+    @staticmethod
+    def _release_details(release):
+        return {
             "track_disc": None,
             "track_position": None,
             "track_count": None,
-            "release_group_id": release.get("release-group", {}).get("id") if release.get("release-group") else None
+            "recording_id": None,
+            "release_group_id": release.get("release-group", {}).get("id") if release.get("release-group") else None,
+            "genres": _top_names(release.get("genre-list", [])),
+            "disc_count": len(release.get("medium-list", [])),
         }
-        
-        genres = release.get("genre-list", [])
-        if genres:
-            sorted_genres = sorted(genres, key=lambda x: int(x.get("count", 0)), reverse=True)
-            result["genres"] = [g.get("name", "") for g in sorted_genres[:3]]
-        
+
+    @classmethod
+    def match_track(cls, release, track_title=None):
+        """Find track_title in a fetch_release() result; returns the release's disc and genre details too."""
+        result = cls._release_details(release)
         media = release.get("medium-list", [])
-        result["disc_count"] = len(media)
         
         if track_title and media:
             for disc_num, disc in enumerate(media, 1):
@@ -161,11 +467,11 @@ class MusicBrainzClient:
                         result["track_disc"] = disc_num
                         result["track_position"] = int(track.get("position", 0)) if track.get("position") else None
                         result["track_count"] = len(tracks)
+                        result["recording_id"] = recording.get("id")
                         
-                        rec_genres = recording.get("genre-list", [])
+                        rec_genres = _top_names(recording.get("genre-list", []))
                         if rec_genres:
-                            sorted_rec = sorted(rec_genres, key=lambda x: int(x.get("count", 0)), reverse=True)
-                            result["genres"] = [g.get("name", "") for g in sorted_rec[:3]]
+                            result["genres"] = rec_genres
                         
                         break
                 if result["track_disc"]:
@@ -173,40 +479,55 @@ class MusicBrainzClient:
         
         return result
 
+    @classmethod
+    def match_tracks(cls, release, facts):
+        """
+        Match a whole album's files against a fetch_release() result at once.
+        facts is a list of matching.FileFacts; returns a match_track()-style
+        dict per file, with no track fields set for files that didn't match.
+        """
+        matches = match_files(facts, release_tracks(release))
+        results = []
+        for i in range(len(facts)):
+            result = cls._release_details(release)
+            if i in matches:
+                track, _ = matches[i]
+                result["track_disc"] = track.disc
+                result["track_position"] = track.position
+                result["track_count"] = track.count
+                result["recording_id"] = track.recording.get("id")
+                rec_genres = _top_names(track.recording.get("genre-list", []))
+                if rec_genres:
+                    result["genres"] = rec_genres
+            results.append(result)
+        return results
+
     @classmethod
     def lookup_release_group(cls, rg_id):
+        """Top genres of a release group; None if the lookup failed."""
         if not rg_id:
             return []
             
         def do_lookup():
-            return musicbrainzngs.get_release_group_by_id(rg_id, includes=["tags"])
+            return cls.backend.get_release_group_by_id(rg_id, includes=["tags"])
         
-        data = cls._retry(do_lookup)
-        if not data:
-            return []
+        data = cls._query(json.dumps(['release-group', rg_id]), do_lookup, missing={})
+        if data is None:
+            return None
             
-        rg = data.get("release-group", {})
-        tags = rg.get("tag-list", [])
-        if tags:
-            sorted_tags = sorted(tags, key=lambda x: int(x.get("count", 0)), reverse=True)
-            return [t.get("name", "") for t in sorted_tags[:3]]
-        return []
+        return _top_names(data.get("release-group", {}).get("tag-list", []))
 
     @classmethod
     def lookup_artist(cls, artist_id):
+        """Top genres of an artist; None if the lookup failed."""
         if not artist_id:
             return []
             
         def do_lookup():
-            return musicbrainzngs.get_artist_by_id(artist_id, includes=["tags"])
+            return cls.backend.get_artist_by_id(artist_id, includes=["tags"])
         
-        data = cls._retry(do_lookup)
-        if not data:
-            return []
+        data = cls._query(json.dumps(['artist', artist_id]), do_lookup, missing={})
+        if data is None:
+            return None
             
-        artist = data.get("artist", {})
-        tags = artist.get("tag-list", [])
-        if tags:
-            sorted_tags = sorted(tags, key=lambda x: int(x.get("count", 0)), reverse=True)
-            return [t.get("name", "") for t in sorted_tags[:3]]
-        return []
+        return _top_names(data.get("artist", {}).get("tag-list", []))
@@ -0,0 +1,275 @@
+"""
+Filter-bar query language, compiled to predicates over a TrackStore.
+
+    jazz                    any of filename/title/artist/album contains "jazz"
+    re:zero                 unknown field names are searched as plain text
+    "miles davis"           quoted phrase
+    genre:jazz              field contains text
+    year:1990..1999         numeric range; either end may be left open
+    bitrate<256             numeric comparison: < <= > >= =
+    samplerate:44.1         Hz or kHz, with or without a unit (44100, 44.1, 44khz)
+    has:cover, missing:tracknumber
+    -term                   negates any term
+
+Terms are AND-ed. Each term is evaluated over a whole store column at once
+and the resulting row sets are intersected.
+"""
+
+import math
+import os
+import re
+
+from tagqt.core.textindex import TrigramIndex
+
+
+class QueryError(ValueError):
+    """Raised for a query that can't be compiled."""
+
+
+FIELD_ALIASES = {
+    'title': 'title',
+    'artist': 'artist',
+    'album': 'album',
+    'albumartist': 'album_artist', 'album_artist': 'album_artist',
+    'year': 'year', 'date': 'year',
+    'genre': 'genre',
+    'disc': 'disc_number', 'discnumber': 'disc_number', 'disc_number': 'disc_number',
+    'track': 'track_number', 'tracknumber': 'track_number', 'track_number': 'track_number',
+    'bpm': 'bpm',
+    'key': 'initial_key', 'initialkey': 'initial_key', 'initial_key': 'initial_key',
+    'duration': 'duration', 'length': 'duration',
+    'bitrate': 'bitrate',
+    'samplerate': 'sample_rate', 'sample_rate': 'sample_rate',
+    'size': 'size',
+    'cover': 'has_cover',
+    'file': 'path', 'filename': 'path', 'path': 'path',
+}
+
+# Stored as numbers
+NUMERIC_FIELDS = {'duration', 'bitrate', 'sample_rate', 'size'}
+# Stored as text, compared by their leading integer ("3/12" -> 3)
+NUMERIC_TEXT_FIELDS = {'year', 'disc_number', 'track_number', 'bpm'}
+
+_TOKEN = re.compile(r'(-?)(?:([A-Za-z_]+)(:|<=|>=|<|>|=))?("[^"]*"?|\S+)')
+_LEADING_INT = re.compile(r'\s*(\d+)')
+_SIZE_UNITS = {'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2, 'g': 1024 ** 3, 'gb': 1024 ** 3}
+
+
+def _leading_int(text):
+    m = _LEADING_INT.match(text) if text else None
+    return int(m.group(1)) if m else None
+
+
+def _parse_number(field, text):
+    text = text.strip().lower()
+    try:
+        if field == 'duration' and ':' in text:
+            minutes, seconds = text.split(':', 1)
+            return int(minutes) * 60 + float(seconds)
+        if field == 'size':
+            m = re.fullmatch(r'([\d.]+)\s*([kmg]b?)?', text)
+            if m:
+                return float(m.group(1)) * _SIZE_UNITS.get(m.group(2) or '', 1)
+        if field == 'sample_rate':
+            return _parse_sample_rate(text)
+        value = float(text)
+    except ValueError:
+        raise QueryError(f"'{text}' isn't a number")
+    return value
+
+
+def _parse_sample_rate(text):
+    """
+    Sample rates are stored as whole kHz (44.1 kHz as 44), so a query value
+    is converted to kHz and floored to the same 1 kHz bucket. A bare number
+    of 1000 or more is taken as Hz.
+    """
+    m = re.fullmatch(r'([\d.]+)\s*(khz|hz)?', text)
+    if not m:
+        raise ValueError(text)
+    value = float(m.group(1))
+    unit = m.group(2)
+    if unit == 'hz' or (unit is None and value >= 1000):
+        value /= 1000
+    return math.floor(value)
+
+
+class Term:
+    """One compiled query term: a row-set over the whole store and a per-row check."""
+
+    def __init__(self, negate=False):
+        self.negate = negate
+
+    def rows(self, store):
+        raise NotImplementedError
+
+    def test(self, store, row):
+        raise NotImplementedError
+
+
+class TextTerm(Term):
+    """Bare word: substring of filename/title/artist/album, via the search index."""
+
+    def __init__(self, text, index, negate=False):
+        super().__init__(negate)
+        self.text = TrigramIndex.normalize(text)
+        self.index = index
+
+    def rows(self, store):
+        rows = store.rows_by_path
+        return {rows[path] for path in self.index.search(self.text) if path in rows}
+
+    def test(self, store, row):
+        return self.index.matches(store.paths[row], self.text)
+
+
+class FieldTextTerm(Term):
+    """field:text — casefolded substring of one field."""
+
+    def __init__(self, field, text, negate=False):
+        super().__init__(negate)
+        self.field = field
+        self.text = text.casefold()
+
+    def _value(self, value):
+        return os.path.basename(value) if self.field == 'path' else value
+
+    def rows(self, store):
+        text = self.text
+        value = self._value
+        return {i for i, v in enumerate(store.columns[self.field]) if v and text in value(v).casefold()}
+
+    def test(self, store, row):
+        v = store.value(row, self.field)
+        return bool(v) and self.text in self._value(v).casefold()
+
+
+class RangeTerm(Term):
+    """Numeric comparison or lo..hi range (inclusive; None leaves an end open)."""
+
+    def __init__(self, field, lo, hi, lo_open=False, hi_open=False, negate=False):
+        super().__init__(negate)
+        self.field = field
+        self.lo, self.hi = lo, hi
+        self.lo_open, self.hi_open = lo_open, hi_open
+        self.convert = _leading_int if field in NUMERIC_TEXT_FIELDS else None
+
+    def _ok(self, v):
+        if self.convert is not None:
+            v = self.convert(v)
+            if v is None:
+                return False
+        lo, hi = self.lo, self.hi
+        if lo is not None and (v <= lo if self.lo_open else v < lo):
+            return False
+        if hi is not None and (v >= hi if self.hi_open else v > hi):
+            return False
+        return True
+
+    def rows(self, store):
+        ok = self._ok
+        return {i for i, v in enumerate(store.columns[self.field]) if ok(v)}
+
+    def test(self, store, row):
+        return self._ok(store.value(row, self.field))
+
+
+class PresenceTerm(Term):
+    """has:field / missing:field — whether the field is set (non-empty, non-zero)."""
+
+    def __init__(self, field, present, negate=False):
+        super().__init__(negate)
+        self.field = field
+        self.present = present
+
+    def rows(self, store):
+        present = self.present
+        return {i for i, v in enumerate(store.columns[self.field]) if bool(v) == present}
+
+    def test(self, store, row):
+        return bool(store.value(row, self.field)) == self.present
+
+
+def _field(name):
+    field = FIELD_ALIASES.get(name.lower())
+    if field is None:
+        raise QueryError(f"Unknown field '{name}'")
+    return field
+
+
+def _compile_term(negate, name, op, value, index):
+    if value.startswith('"'):
+        value = value.strip('"')
+    if name and name.lower() not in FIELD_ALIASES and name.lower() not in ('has', 'missing'):
+        # Not a field we know, e.g. a title like "re:zero"; search it as text
+        value = name + op + value
+        name = None
+    if not name:
+        return TextTerm(value, index, negate)
+
+    if op == ':' and name.lower() in ('has', 'missing'):
+        return PresenceTerm(_field(value), name.lower() == 'has', negate)
+
+    field = _field(name)
+    numeric = field in NUMERIC_FIELDS or field in NUMERIC_TEXT_FIELDS
+    if op == ':':
+        if numeric and '..' in value:
+            lo, hi = value.split('..', 1)
+            return RangeTerm(field,
+                             _parse_number(field, lo) if lo else None,
+                             _parse_number(field, hi) if hi else None, negate=negate)
+        if field in NUMERIC_FIELDS:
+            number = _parse_number(field, value)
+            return RangeTerm(field, number, number, negate=negate)
+        if field == 'has_cover':
+            raise QueryError("Use has:cover or missing:cover")
+        return FieldTextTerm(field, value, negate)
+
+    if not numeric:
+        raise QueryError(f"'{name}' can't be compared with {op}")
+    number = _parse_number(field, value)
+    if op == '=':
+        return RangeTerm(field, number, number, negate=negate)
+    if op in ('<', '<='):
+        return RangeTerm(field, None, number, hi_open=(op == '<'), negate=negate)
+    return RangeTerm(field, number, None, lo_open=(op == '>'), negate=negate)
+
+
+class Query:
+    """A compiled query: the AND of its terms."""
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def rows(self, store):
+        """Return the ascending list of matching rows."""
+        result = None
+        # Positive terms narrow the set first; negations are subtracted after
+        for term in sorted(self.terms, key=lambda t: t.negate):
+            rows = term.rows(store)
+            if term.negate:
+                if result is None:
+                    result = set(range(len(store)))
+                result -= rows
+            else:
+                result = rows if result is None else result & rows
+            if not result:
+                return []
+        return sorted(result) if result is not None else list(range(len(store)))
+
+    def test(self, store, row):
+        return all(term.test(store, row) != term.negate for term in self.terms)
+
+
+def compile_query(text, index):
+    """Compile filter-bar text against a TrigramIndex; raises QueryError."""
+    terms = []
+    for m in _TOKEN.finditer(text):
+        negate, name, op, value = m.groups()
+        if value in ('"', '""'):
+            continue
+        terms.append(_compile_term(bool(negate), name, op, value, index))
+    return Query(terms)
@@ -0,0 +1,96 @@
+"""Compact, immutable per-file track records used by the track list."""
+
+import json
+import os
+import sys
+from collections import namedtuple
+
+from tagqt.core.tags import MetadataHandler
+
+RECORD_FIELDS = (
+    'title', 'artist', 'album', 'album_artist', 'year', 'genre',
+    'disc_number', 'track_number', 'bpm', 'initial_key',
+    'duration', 'bitrate', 'sample_rate', 'size', 'has_cover',
+    'cover_mime', 'cover_width', 'cover_height', 'cover_size', 'inode', 'device',
+)
+
+_NUMERIC_FIELDS = ('duration', 'bitrate', 'sample_rate', 'size', 'cover_width', 'cover_height', 'cover_size', 'inode',
+                   'device')
+_STAT_FIELDS = ('size', 'inode', 'device')
+
+# Values repeated across many rows; interning makes every row share one string.
+_INTERNED_FIELDS = ('artist', 'album', 'album_artist', 'genre', 'cover_mime')
+
+_COVER_FIELDS = ('has_cover', 'cover_mime', 'cover_width', 'cover_height', 'cover_size')
+
+
+class TrackRecord(namedtuple('TrackRecord', ('path',) + RECORD_FIELDS)):
+    """
+    Displayed tag fields, stream info and flags for one file.
+
+    Records are plain tuples, so a loaded library costs a few hundred bytes per
+    track instead of a live mutagen object. Cover art is described by MIME
+    type, dimensions and byte length only; the image itself is read from the
+    file when it is shown. The inode and device let a renamed file be
+    matched back to its row. Open a MetadataHandler on demand when a file is edited or saved,
+    then build a fresh record from it.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, path, **values):
+        row = [path]
+        for field in RECORD_FIELDS:
+            value = values.get(field)
+            if field in _NUMERIC_FIELDS:
+                value = int(value or 0)
+            elif field == 'has_cover':
+                value = bool(value)
+            else:
+                value = str(value) if value else ''
+                if field in _INTERNED_FIELDS:
+                    value = sys.intern(value)
+            row.append(value)
+        return cls._make(row)
+
+    @classmethod
+    def from_handler(cls, path, md, st=None):
+        """Build a record from an open MetadataHandler; st is the file's stat result if already known."""
+        values = {field: getattr(md, field) for field in RECORD_FIELDS
+                  if field not in _STAT_FIELDS and field not in _COVER_FIELDS}
+        cover = md.cover_info
+        if cover:
+            values.update(
+                has_cover=True, cover_mime=cover['mime'], cover_width=cover['width'],
+                cover_height=cover['height'], cover_size=cover['size'],
+            )
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+        if st is not None:
+            values.update(size=st.st_size, inode=st.st_ino, device=st.st_dev)
+        return cls.create(path, **values)
+
+    @classmethod
+    def from_file(cls, path, st=None):
+        return cls.from_handler(path, MetadataHandler(path, scan=True), st)
+
+    @property
+    def missing_count(self):
+        """Number of critical fields (title, artist, album, cover) that are empty."""
+        return (not self.title) + (not self.artist) + (not self.album) + (not self.has_cover)
+
+    @property
+    def filesize(self):
+        return round(self.size / (1024 * 1024), 2)  # MB
+
+    def to_json(self):
+        return json.dumps(self[1:])
+
+    @classmethod
+    def from_json(cls, path, data):
+        values = json.loads(data)
+        return cls.create(path, **dict(zip(RECORD_FIELDS, values)))
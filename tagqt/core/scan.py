@@ -0,0 +1,145 @@
+"""Parallel tag scanning for folder loads.
+
+Files are parsed in chunks on a process pool, so mutagen parsing isn't bound
+to one core by the GIL. Paths on network mounts use a thread pool instead,
+where the cost is per-file latency rather than CPU. Chunks are yielded in
+submission order, so results always come back in the order paths were given.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+
+from tagqt.core.record import TrackRecord
+from tagqt.core.tags import MetadataHandler
+
+CHUNK_SIZE = 64
+# Below this many files a pool costs more to start than it saves
+MIN_PARALLEL_FILES = 128
+
+NETWORK_FILESYSTEMS = {
+    'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'sshfs', 'fuse.sshfs',
+    'afs', '9p', 'davfs', 'fuse.rclone', 'fuse.gvfsd-fuse', 'ncpfs',
+}
+
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+
+def is_network_path(path):
+    """Return True if path is a UNC path or lives on a network filesystem."""
+    if path.startswith(('\\\\', '//')):
+        return True
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+
+    path = os.path.realpath(path)
+    best, fstype = '', ''
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        if (path == mount_point or path.startswith(os.path.join(mount_point, ''))) and len(mount_point) > len(best):
+            best, fstype = mount_point, mount_type
+    return fstype in NETWORK_FILESYSTEMS
+
+
+def scan_file(path):
+    """
+    Parse one file for the index.
+    Returns (path, stat_result, TrackRecord, None), or (path, None, None, error).
+    """
+    try:
+        st = os.stat(path)
+        md = MetadataHandler(path, scan=True)
+        return path, st, TrackRecord.from_handler(path, md, st), None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+def scan_chunk(paths):
+    return [scan_file(path) for path in paths]
+
+
+class ScanEngine:
+    """
+    Fans a list of paths out over worker processes (or threads) in chunks.
+
+    workers: pool size, defaults to the CPU count.
+    use_threads: force a thread pool; by default threads are only used for
+    network paths.
+    """
+
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE, use_threads=None):
+        self.workers = max(1, workers or default_worker_count())
+        self.chunk_size = chunk_size
+        self.use_threads = use_threads
+
+    def _executor(self, paths):
+        use_threads = self.use_threads
+        if use_threads is None:
+            use_threads = is_network_path(os.path.commonpath(paths))
+        if use_threads:
+            return ThreadPoolExecutor(max_workers=self.workers)
+        # spawn rather than fork: the GUI process has Qt threads running
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def scan(self, paths, stop_event=None):
+        """
+        Yield lists of scan_file() results, in the same order as paths.
+        Pending chunks are cancelled once stop_event is set.
+        """
+        paths = list(paths)
+        if not paths:
+            return
+        chunks = [paths[i:i + self.chunk_size] for i in range(0, len(paths), self.chunk_size)]
+
+        if self.workers == 1 or len(paths) < MIN_PARALLEL_FILES:
+            yield from self._scan_serial(chunks, stop_event)
+            return
+
+        try:
+            executor = self._executor(paths)
+        except (OSError, ValueError, NotImplementedError) as e:
+            print(f"[TagQt] Warning: parallel scan unavailable, scanning serially: {e}")
+            yield from self._scan_serial(chunks, stop_event)
+            return
+
+        # Keep a bounded window in flight so early chunks come back first
+        window = self.workers * 2
+        pending = []
+        next_chunk = 0
+        try:
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < window:
+                    pending.append(executor.submit(scan_chunk, chunks[next_chunk]))
+                    next_chunk += 1
+                while True:
+                    if stop_event is not None and stop_event.is_set():
+                        return
+                    try:
+                        chunk_results = pending[0].result(timeout=0.1)
+                        break
+                    except TimeoutError:
+                        continue
+                    except BrokenExecutor as e:
+                        print(f"[TagQt] Warning: scan worker failed, scanning the rest serially: {e}")
+                        remaining = chunks[next_chunk - len(pending):]
+                        pending = []
+                        yield from self._scan_serial(remaining, stop_event)
+                        return
+                pending.pop(0)
+                yield chunk_results
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _scan_serial(chunks, stop_event):
+        for chunk in chunks:
+            if stop_event is not None and stop_event.is_set():
+                return
+            yield scan_chunk(chunk)
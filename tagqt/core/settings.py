@@ -60,3 +60,43 @@ class Settings:
     def set_last_folder(self, folder):
         self.settings.setValue("last_folder", folder)
 
+    def get_scan_workers(self):
+        """Worker processes used for folder scans; 0 means one per CPU core."""
+        try:
+            return int(self.settings.value("scan_workers", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def set_scan_workers(self, workers):
+        self.settings.setValue("scan_workers", int(workers))
+
+    def get_tag_padding(self):
+        """Bytes reserved after the tags when a save has to resize the file."""
+        try:
+            return int(self.settings.value("tag_padding", 64 * 1024))
+        except (TypeError, ValueError):
+            return 64 * 1024
+
+    def set_tag_padding(self, padding):
+        self.settings.setValue("tag_padding", int(padding))
+
+    def get_musicbrainz_source(self):
+        """Where auto-tag looks releases up: "web", "mirror" or "local"."""
+        return self.settings.value("musicbrainz_source", "web")
+
+    def set_musicbrainz_source(self, source):
+        self.settings.setValue("musicbrainz_source", source)
+
+    def get_musicbrainz_server(self):
+        """Base URL of a self-hosted MusicBrainz mirror."""
+        return self.settings.value("musicbrainz_server", "")
+
+    def set_musicbrainz_server(self, url):
+        self.settings.setValue("musicbrainz_server", url)
+
+    def get_musicbrainz_dataset(self):
+        """Path of a dataset imported with tagqt.core.mbdata."""
+        return self.settings.value("musicbrainz_dataset", "")
+
+    def set_musicbrainz_dataset(self, path):
+        self.settings.setValue("musicbrainz_dataset", path)
@@ -0,0 +1,116 @@
+"""Columnar in-memory storage for the tracks shown in the file list."""
+
+from tagqt.core.record import TrackRecord
+
+STORE_FIELDS = TrackRecord._fields
+# Computed from each record as it is stored, so views never recompute them
+DERIVED_FIELDS = ('missing',)
+
+
+class TrackStore:
+    """
+    Holds loaded tracks as one list per field instead of one object per row.
+
+    Rows are addressed by position; rows_by_path maps a file path back to
+    its row and rows_by_inode maps a (device, inode) pair back to its row,
+    which finds a file again after it was renamed on disk; inode numbers are
+    only unique within one filesystem. Derived columns (the missing
+    field count) are refreshed only for rows that are appended or replaced.
+    TrackRecords are only built on request, for the few callers
+    that want a whole row at once.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.columns = {field: [] for field in STORE_FIELDS + DERIVED_FIELDS}
+        self.rows_by_path = {}
+        self.rows_by_inode = {}
+
+    def __len__(self):
+        return len(self.columns['path'])
+
+    def __contains__(self, path):
+        return path in self.rows_by_path
+
+    @property
+    def paths(self):
+        return self.columns['path']
+
+    def row_of(self, path):
+        return self.rows_by_path.get(path)
+
+    def row_of_inode(self, device, inode):
+        return self.rows_by_inode.get((device, inode)) if inode else None
+
+    def get(self, path):
+        """Return the TrackRecord for path, or None if it isn't loaded."""
+        row = self.rows_by_path.get(path)
+        return None if row is None else self.record(row)
+
+    def value(self, row, field):
+        return self.columns[field][row]
+
+    def record(self, row):
+        return TrackRecord._make(self.columns[field][row] for field in STORE_FIELDS)
+
+    def records(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def append(self, records):
+        """Append TrackRecords and return the row range (first, last), or None if empty."""
+        first = len(self)
+        added = 0
+        for record in records:
+            if record.path in self.rows_by_path:
+                continue
+            for field, value in zip(STORE_FIELDS, record):
+                self.columns[field].append(value)
+            self.columns['missing'].append(record.missing_count)
+            self.rows_by_path[record.path] = first + added
+            if record.inode:
+                self.rows_by_inode[record.device, record.inode] = first + added
+            added += 1
+        if not added:
+            return None
+        return first, first + added - 1
+
+    def replace(self, row, record):
+        """Overwrite a row in place; the path may change (e.g. after a rename)."""
+        old_path = self.columns['path'][row]
+        old_key = (self.columns['device'][row], self.columns['inode'][row])
+        for field, value in zip(STORE_FIELDS, record):
+            self.columns[field][row] = value
+        self.columns['missing'][row] = record.missing_count
+        if record.path != old_path:
+            del self.rows_by_path[old_path]
+            self.rows_by_path[record.path] = row
+        if (record.device, record.inode) != old_key:
+            if self.rows_by_inode.get(old_key) == row:
+                del self.rows_by_inode[old_key]
+            if record.inode:
+                self.rows_by_inode[record.device, record.inode] = row
+
+    def row_ranges(self, paths):
+        """Return contiguous (first, last) row ranges for paths, last range first."""
+        rows = sorted({self.rows_by_path[p] for p in paths if p in self.rows_by_path}, reverse=True)
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1] = (row, ranges[-1][1])
+            else:
+                ranges.append((row, row))
+        return ranges
+
+    def remove_range(self, first, last):
+        """Delete rows first..last. Call reindex() once all ranges are removed."""
+        for column in self.columns.values():
+            del column[first:last + 1]
+
+    def reindex(self):
+        self.rows_by_path = {path: row for row, path in enumerate(self.columns['path'])}
+        self.rows_by_inode = {
+            key: row for row, key in enumerate(zip(self.columns['device'], self.columns['inode'])) if key[1]
+        }
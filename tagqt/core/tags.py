@@ -3,10 +3,12 @@ from mutagen import File
 from mutagen.easyid3 import EasyID3
 from mutagen.id3 import ID3, ID3NoHeaderError, USLT, APIC, COMM, TKEY
 from mutagen.flac import FLAC, Picture
+from mutagen.mp3 import MP3
 from mutagen.oggvorbis import OggVorbis
 from mutagen.mp4 import MP4, MP4Cover
 import os
 import base64
+import struct
 from PIL import Image
 import io
 
@@ -36,17 +38,149 @@ try:
 except Exception:
     pass
 
+# Enough of a cover to reach the size in its header, past any JPEG EXIF block
+PICTURE_HEADER_BYTES = 64 * 1024
+
+
+class _PictureHeader(Picture):
+    """
+    FLAC PICTURE block that keeps the header fields and seeks past the image
+    data, reading only its start when the header leaves the dimensions at 0.
+    """
+
+    def load(self, data):
+        self.type, length = struct.unpack('>2I', data.read(8))
+        self.mime = data.read(length).decode('UTF-8', 'replace')
+        length, = struct.unpack('>I', data.read(4))
+        self.desc = data.read(length).decode('UTF-8', 'replace')
+        (self.width, self.height, self.depth,
+         self.colors, self.data_length) = struct.unpack('>5I', data.read(20))
+        if self.width and self.height:
+            data.seek(self.data_length, 1)
+            return
+        # Some taggers leave the dimensions at 0; the image header has them
+        head = data.read(min(self.data_length, PICTURE_HEADER_BYTES))
+        data.seek(self.data_length - len(head), 1)
+        self.width, self.height = _image_size(head)
+
+
+def _wrapped_id3(easy):
+    """
+    The ID3 instance behind an EasyID3 view.
+
+    EasyID3 keeps it in a private (name-mangled) attribute with no public
+    accessor. It's used anyway because raw frames (APIC, USLT) have to be
+    edited in that same instance: opening the file again as ID3 would give
+    a second copy, and one of the two saves would undo the other.
+    """
+    id3 = getattr(easy, '_EasyID3__id3', None)
+    if not isinstance(id3, ID3):
+        raise RuntimeError(
+            f"mutagen {mutagen.version_string} no longer keeps EasyID3's tag where TagQt expects it"
+        )
+    return id3
+
+
+class _ScanFLAC(FLAC):
+    """Read-only FLAC view used while scanning; cover payloads are skipped."""
+
+    METADATA_BLOCKS = FLAC.METADATA_BLOCKS[:6] + [_PictureHeader]
+
+
+def _image_size(data):
+    """Return (width, height) from an image header without decoding the pixels."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+    except Exception:
+        return 0, 0
+
+
+def _cover_picture(data):
+    """A front-cover FLAC Picture for JPEG data, with its dimensions filled in."""
+    pic = Picture()
+    pic.type = 3
+    pic.mime = 'image/jpeg'
+    pic.desc = 'Cover'
+    pic.data = data
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            pic.width, pic.height = img.size
+            pic.depth = 8 * len(img.getbands())
+    except Exception:
+        pass
+    return pic
+
+
+class WriteReport:
+    """Tallies a batch's saves: files written in place vs. resized, and the bytes each took."""
+
+    def __init__(self):
+        self.in_place = 0
+        self.in_place_bytes = 0
+        self.rewritten = 0
+        self.rewritten_bytes = 0
+
+    def add(self, md):
+        """Count the last save() of a MetadataHandler, if it wrote anything."""
+        if not md.bytes_written:
+            return
+        if md.rewritten:
+            self.rewritten += 1
+            self.rewritten_bytes += md.bytes_written
+        else:
+            self.in_place += 1
+            self.in_place_bytes += md.bytes_written
+
+    @property
+    def files(self):
+        return self.in_place + self.rewritten
+
+    @property
+    def total_bytes(self):
+        return self.in_place_bytes + self.rewritten_bytes
+
+
+# Reserved after the tags whenever a save has to resize the file anyway,
+# so later edits (a cover, lyrics) fit in place instead of rewriting it again
+DEFAULT_PADDING = 64 * 1024
+
+
 class MetadataHandler:
-    """Reads and writes audio file metadata tags across MP3, FLAC, OGG, M4A formats."""
+    """
+    Reads and writes audio file metadata tags across MP3, FLAC, OGG, M4A formats.
 
-    def __init__(self, filepath):
+    Setters only touch a tag when the new value differs from what is there,
+    and record the tag as changed. save() writes nothing if no tag changed,
+    writes in place when the changed tags fit in the existing padding, and
+    otherwise resizes the file once with `padding` bytes to spare.
+    """
+
+    padding = DEFAULT_PADDING
+
+    def __init__(self, filepath, scan=False):
+        """
+        With scan=True the file is opened read-only for indexing: only cover
+        presence, MIME type, dimensions and byte length are kept. FLAC
+        picture payloads are skipped without being read; other formats read
+        them and drop them once the info is recorded. Scan handlers can't be
+        saved.
+        """
         self.filepath = filepath
         self.audio = None
-        self._lyrics_changed = False
+        self.scan = scan
+        self._cover_info = None
+        self._changed = set()
+        # Outcome of the last save(): bytes written and whether the file was resized
+        self.bytes_written = 0
+        self.rewritten = False
         self.load_file()
 
     def load_file(self):
         try:
+            if self.scan and self.filepath.lower().endswith('.flac'):
+                self.audio = _ScanFLAC(self.filepath)
+                return
             self.audio = mutagen.File(self.filepath, easy=True)
             if self.audio is None:
                 try:
@@ -56,32 +190,99 @@ class MetadataHandler:
                     self.audio.add_tags()
         except Exception as e:
             print(f"Error loading file {self.filepath}: {e}")
+        finally:
+            if self.scan:
+                self._cover_info = self._read_cover_info()
+                self._release_pictures()
 
     def get_tag(self, tag):
-        if self.audio and tag in self.audio:
+        if self.audio is not None and tag in self.audio:
             return self.audio[tag][0]
         return ""
 
     def set_tag(self, tag, value):
-        if self.audio:
+        if self.audio is not None:
             try:
                 if isinstance(value, list):
-                    deduped = list(dict.fromkeys(str(v) for v in value))
-                    self.audio[tag] = deduped
+                    values = list(dict.fromkeys(str(v) for v in value))
                 else:
-                    self.audio[tag] = [str(value)]
+                    values = [str(value)]
+                current = list(self.audio[tag]) if tag in self.audio else []
+                if values == current or (not current and not any(values)):
+                    return
+                self.audio[tag] = values
+                self._changed.add(tag)
             except Exception as e:
                 print(f"[TagQt] Warning: could not set tag '{tag}': {e}")
 
-    def save(self):
+    def delete_tag(self, tag):
+        if self.audio is not None and tag in self.audio:
+            del self.audio[tag]
+            self._changed.add(tag)
+
+    @property
+    def changed_fields(self):
+        """Tags set to a different value since the file was loaded or last saved."""
+        return set(self._changed)
+
+    @property
+    def is_dirty(self):
+        return bool(self._changed)
+
+    def save(self, padding=None):
+        """
+        Write changed tags to the file. Returns True if anything was written.
+        padding overrides the bytes reserved if the file has to be resized.
+        """
+        if self.scan:
+            print(f"[TagQt] Warning: {self.filepath} was opened for scanning and can't be saved")
+            return False
+        self.bytes_written = 0
+        self.rewritten = False
+        reserve = max(0, self.padding if padding is None else padding)
+        if self.audio is None or not self._changed:
+            return False
         try:
-            if self.audio:
-                self.audio.save()
-                if self._lyrics_changed and self.lyrics:
-                    self.save_lyrics_file()
-                    self._lyrics_changed = False
+            id3_obj = self._id3()
+            # ID3 reports sizes from the start of the tag, so note the region it occupies
+            layout = {'id3_size': getattr(id3_obj, 'size', 0) if id3_obj is not None else None}
+
+            def choose_padding(info):
+                # info.padding is what would be left over with the new tags in
+                # place; keep it whenever it isn't negative, so nothing moves
+                layout['trailing'] = info.size
+                layout['moved'] = info.padding < 0
+                return reserve if info.padding < 0 else info.padding
+
+            self.audio.save(padding=choose_padding)
+            self.rewritten = layout.get('moved', True)
+            self.bytes_written = self._bytes_written(layout)
+            if 'lyrics' in self._changed and self.lyrics:
+                self.save_lyrics_file()
+            self._changed.clear()
+            from tagqt.core.library import get_library_index
+            index = get_library_index()
+            if index:
+                index.update(self.filepath, self)
+            return True
         except Exception as e:
             print(f"[TagQt] Warning: save failed: {e}")
+            return False
+
+    def _bytes_written(self, layout):
+        """
+        Bytes the last save wrote: the tag region alone when it fit in place,
+        or the whole file when it had to be resized.
+        """
+        try:
+            size = os.path.getsize(self.filepath)
+        except OSError:
+            return 0
+        if 'trailing' not in layout or layout['moved']:
+            return size
+        if layout['id3_size']:
+            return layout['id3_size']
+        return min(size, max(0, size - layout['trailing']))
 
     def save_lyrics_file(self):
         """Saves lyrics to a .lrc file with the same name as the audio file."""
@@ -197,7 +398,7 @@ class MetadataHandler:
     def disc_number(self):
         try:
             val = self.get_tag('discnumber')
-            if self.audio and isinstance(self.audio, (FLAC, OggVorbis)):
+            if self.audio is not None and isinstance(self.audio, (FLAC, OggVorbis)):
                 if '/' not in str(val) and 'DISCTOTAL' in self.audio:
                     total = self.audio['DISCTOTAL'][0]
                     return f"{val}/{total}"
@@ -207,11 +408,11 @@ class MetadataHandler:
 
     @disc_number.setter
     def disc_number(self, value):
-        if self.audio and isinstance(self.audio, (FLAC, OggVorbis)) and value and '/' in str(value):
+        if self.audio is not None and isinstance(self.audio, (FLAC, OggVorbis)) and value and '/' in str(value):
             try:
                 num, total = str(value).split('/')
                 self.set_tag('discnumber', num)
-                self.audio['DISCTOTAL'] = [str(total)]
+                self.set_tag('DISCTOTAL', total)
                 return
             except ValueError:
                 pass
@@ -219,18 +420,18 @@ class MetadataHandler:
 
     @property
     def track_total(self):
-        if self.audio and isinstance(self.audio, (FLAC, OggVorbis)):
+        if self.audio is not None and isinstance(self.audio, (FLAC, OggVorbis)):
             if 'TRACKTOTAL' in self.audio:
                 return self.audio['TRACKTOTAL'][0]
         return ""
 
     @track_total.setter
     def track_total(self, value):
-        if self.audio and isinstance(self.audio, (FLAC, OggVorbis)):
+        if self.audio is not None and isinstance(self.audio, (FLAC, OggVorbis)):
             if value:
-                self.audio['TRACKTOTAL'] = [str(value)]
-            elif 'TRACKTOTAL' in self.audio:
-                del self.audio['TRACKTOTAL']
+                self.set_tag('TRACKTOTAL', value)
+            else:
+                self.delete_tag('TRACKTOTAL')
 
     @property
     def album_artist(self):
@@ -256,10 +457,9 @@ class MetadataHandler:
     def comment(self, value):
         if isinstance(self.audio, EasyID3):
             if value:
-                self.audio['comment'] = [str(value)]
+                self.set_tag('comment', value)
             else:
-                if 'comment' in self.audio:
-                    del self.audio['comment']
+                self.delete_tag('comment')
         else:
             self.set_tag('comment', value)
 
@@ -270,13 +470,11 @@ class MetadataHandler:
             return ""
             
         try:
-            if isinstance(self.audio, (ID3, EasyID3)) or (hasattr(self.audio, 'tags') and isinstance(self.audio.tags, (ID3, EasyID3))):
-                tags = self.audio if isinstance(self.audio, ID3) else self.audio.tags
-                if tags:
-                    for key in tags.keys():
-                        if key.startswith('USLT:'):
-                            return tags[key].text
-            
+            id3_obj = self._id3()
+            if id3_obj is not None:
+                frames = id3_obj.getall('USLT')
+                return frames[0].text if frames else ""
+
             elif isinstance(self.audio, (FLAC, OggVorbis)):
                 if 'LYRICS' in self.audio:
                     return self.audio['LYRICS'][0]
@@ -292,27 +490,21 @@ class MetadataHandler:
     @lyrics.setter
     def lyrics(self, value):
         """Sets lyrics to tags."""
-        if self.audio is None:
+        if self.audio is None or (value or '') == (self.lyrics or ''):
             return
 
-        self._lyrics_changed = True
-
         try:
-            # ID3 (MP3)
-            if isinstance(self.audio, (ID3, EasyID3)) or (hasattr(self.audio, 'tags') and isinstance(self.audio.tags, (ID3, EasyID3))):
-                tags = self.audio if isinstance(self.audio, ID3) else self.audio.tags
-                if tags is not None:
-                    to_del = [k for k in tags.keys() if k.startswith('USLT:')]
-                    for k in to_del:
-                        del tags[k]
-                    
-                    if value:
-                        tags.add(USLT(
-                            encoding=3,
-                            lang='eng', # Default to eng
-                            desc='',
-                            text=value
-                        ))
+            # ID3 (MP3), through the same tag the easy view edits
+            id3_obj = self._id3(create=True)
+            if id3_obj is not None:
+                id3_obj.delall('USLT')
+                if value:
+                    id3_obj.add(USLT(
+                        encoding=3,
+                        lang='eng', # Default to eng
+                        desc='',
+                        text=value
+                    ))
             
             # FLAC
             elif isinstance(self.audio, (FLAC, OggVorbis)):
@@ -327,7 +519,8 @@ class MetadataHandler:
                     self.audio['\xa9lyr'] = value
                 elif '\xa9lyr' in self.audio:
                     del self.audio['\xa9lyr']
-                
+
+            self._changed.add('lyrics')
         except Exception as e:
             print(f"Error setting lyrics: {e}")
 
@@ -379,10 +572,36 @@ class MetadataHandler:
     def publisher(self, value):
         self.set_tag('organization', value)
 
+    @property
+    def musicbrainz_album_id(self):
+        """MusicBrainz release ID (MBID) written by an earlier tagger, or ''."""
+        try:
+            val = self.get_tag('musicbrainz_albumid')
+            return val if val else ''
+        except Exception:
+            return ''
+
+    @musicbrainz_album_id.setter
+    def musicbrainz_album_id(self, value):
+        self.set_tag('musicbrainz_albumid', value)
+
+    @property
+    def musicbrainz_track_id(self):
+        """MusicBrainz recording ID (MBID), stored as "track ID" by Picard and others."""
+        try:
+            val = self.get_tag('musicbrainz_trackid')
+            return val if val else ''
+        except Exception:
+            return ''
+
+    @musicbrainz_track_id.setter
+    def musicbrainz_track_id(self, value):
+        self.set_tag('musicbrainz_trackid', value)
+
     @property
     def duration(self):
         try:
-            if self.audio and hasattr(self.audio, 'info') and self.audio.info:
+            if self.audio is not None and hasattr(self.audio, 'info') and self.audio.info:
                 return int(self.audio.info.length)
         except Exception:
             pass
@@ -391,7 +610,7 @@ class MetadataHandler:
     @property
     def bitrate(self):
         try:
-            if self.audio and hasattr(self.audio, 'info') and hasattr(self.audio.info, 'bitrate'):
+            if self.audio is not None and hasattr(self.audio, 'info') and hasattr(self.audio.info, 'bitrate'):
                 return int(self.audio.info.bitrate / 1000) # kbps
         except Exception:
             pass
@@ -400,7 +619,7 @@ class MetadataHandler:
     @property
     def sample_rate(self):
         try:
-            if self.audio and hasattr(self.audio, 'info') and hasattr(self.audio.info, 'sample_rate'):
+            if self.audio is not None and hasattr(self.audio, 'info') and hasattr(self.audio.info, 'sample_rate'):
                 return int(self.audio.info.sample_rate / 1000) # kHz
         except Exception:
             pass
@@ -415,10 +634,88 @@ class MetadataHandler:
             pass
         return 0.0
 
+    def _id3(self, create=False):
+        """
+        Return the raw ID3 tag behind an MP3's easy view, or None. Edits to it
+        and to the easy view land in the same tag and are written by one save().
+        With create=True an untagged MP3 gets an empty tag first.
+        """
+        if create and isinstance(self.audio, MP3) and self.audio.tags is None:
+            self.audio.add_tags()
+        tags = self.audio if isinstance(self.audio, EasyID3) else getattr(self.audio, 'tags', None)
+        if isinstance(tags, EasyID3):
+            return _wrapped_id3(tags)
+        if isinstance(tags, ID3):
+            return tags
+        return None
+
+    @property
+    def cover_info(self):
+        """Return {'mime', 'width', 'height', 'size'} for the front cover, or None."""
+        if self.scan:
+            return self._cover_info
+        return self._read_cover_info()
+
+    @property
+    def has_cover(self):
+        return self.cover_info is not None
+
+    def _read_cover_info(self):
+        try:
+            id3_obj = self._id3()
+            if id3_obj is not None:
+                frames = id3_obj.getall('APIC')
+                if frames:
+                    width, height = _image_size(frames[0].data)
+                    return {'mime': frames[0].mime, 'width': width, 'height': height, 'size': len(frames[0].data)}
+
+            elif isinstance(self.audio, FLAC):
+                pics = self.audio.pictures
+                if pics:
+                    pic = pics[0]
+                    size = getattr(pic, 'data_length', len(pic.data))
+                    width, height = pic.width, pic.height
+                    if not (width and height) and pic.data:
+                        width, height = _image_size(pic.data)
+                    return {'mime': pic.mime, 'width': width, 'height': height, 'size': size}
+
+            elif isinstance(self.audio, OggVorbis):
+                blocks = self.audio.get('metadata_block_picture', [])
+                if blocks:
+                    pic = Picture(base64.b64decode(blocks[0]))
+                    width, height = pic.width, pic.height
+                    if not (width and height):
+                        width, height = _image_size(pic.data)
+                    return {'mime': pic.mime, 'width': width, 'height': height, 'size': len(pic.data)}
+
+            elif isinstance(self.audio, MP4):
+                covers = self.audio.get('covr', [])
+                if covers:
+                    mime = 'image/png' if covers[0].imageformat == MP4Cover.FORMAT_PNG else 'image/jpeg'
+                    width, height = _image_size(bytes(covers[0]))
+                    return {'mime': mime, 'width': width, 'height': height, 'size': len(covers[0])}
+
+        except Exception as e:
+            print(f"[TagQt] Warning: could not read cover art: {e}")
+        return None
+
+    def _release_pictures(self):
+        """Drop in-memory cover payloads once a scan has recorded their info."""
+        try:
+            id3_obj = self._id3()
+            if id3_obj is not None:
+                id3_obj.delall('APIC')
+            elif isinstance(self.audio, OggVorbis):
+                self.audio.pop('metadata_block_picture', None)
+            elif isinstance(self.audio, MP4):
+                self.audio.pop('covr', None)
+        except Exception:
+            pass
+
     def get_cover(self):
         try:
-            if isinstance(self.audio, EasyID3):
-                id3_obj = ID3(self.audio.filename)
+            id3_obj = self._id3()
+            if id3_obj is not None:
                 frames = id3_obj.getall('APIC')
                 return frames[0].data if frames else None
 
@@ -444,14 +741,21 @@ class MetadataHandler:
     def set_cover(self, data, max_size=None):
         if max_size:
             img = Image.open(io.BytesIO(data))
-            img.thumbnail((max_size, max_size))
-            buf = io.BytesIO()
-            img.save(buf, format='JPEG')
-            data = buf.getvalue()
+            # A JPEG that already fits is kept as is rather than re-encoded
+            if img.format != 'JPEG' or max(img.size) > max_size:
+                img.thumbnail((max_size, max_size))
+                if img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+                buf = io.BytesIO()
+                img.save(buf, format='JPEG')
+                data = buf.getvalue()
+
+        if data == self.get_cover():
+            return
 
         try:
-            if isinstance(self.audio, EasyID3):
-                id3_obj = ID3(self.audio.filename)
+            id3_obj = self._id3(create=True)
+            if id3_obj is not None:
                 id3_obj.delall('APIC')
                 id3_obj.add(APIC(
                     encoding=3,
@@ -460,31 +764,26 @@ class MetadataHandler:
                     desc='Cover',
                     data=data
                 ))
-                id3_obj.save(self.audio.filename)
+                self._changed.add('cover')
 
             elif isinstance(self.audio, FLAC):
-                pic = Picture()
-                pic.type = 3
-                pic.mime = 'image/jpeg'
-                pic.desc = 'Cover'
-                pic.data = data
+                pic = _cover_picture(data)
                 self.audio.clear_pictures()
                 self.audio.add_picture(pic)
+                self._changed.add('cover')
 
             elif isinstance(self.audio, OggVorbis):
-                pic = Picture()
-                pic.type = 3
-                pic.mime = 'image/jpeg'
-                pic.desc = 'Cover'
-                pic.data = data
+                pic = _cover_picture(data)
                 self.audio['metadata_block_picture'] = [
                     base64.b64encode(pic.write()).decode('ascii')
                 ]
+                self._changed.add('cover')
 
             elif isinstance(self.audio, MP4):
                 self.audio['covr'] = [
                     MP4Cover(data, imageformat=MP4Cover.FORMAT_JPEG)
                 ]
+                self._changed.add('cover')
 
         except Exception as e:
             print(f"[TagQt] Warning: could not save cover art: {e}")
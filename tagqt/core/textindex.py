@@ -0,0 +1,92 @@
+"""Substring search index over the text fields shown in the file list."""
+
+GRAM = 3
+# Keeps trigrams from spanning two fields
+FIELD_SEPARATOR = '\x00'
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TrigramIndex:
+    """
+    Casefolded trigram posting lists keyed by an arbitrary key (a file path).
+
+    search() intersects the posting lists of the query's trigrams, then checks
+    the few surviving candidates with a plain substring test. Queries shorter
+    than a trigram fall back to scanning the stored texts, which is still
+    just string operations.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._texts = {}
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, key, fields):
+        text = FIELD_SEPARATOR.join(f.casefold() for f in fields if f)
+        old = self._texts.get(key)
+        if old == text:
+            return
+        if old is not None:
+            self.remove(key)
+        self._texts[key] = text
+        postings = self._postings
+        for gram in _grams(text):
+            bucket = postings.get(gram)
+            if bucket is None:
+                postings[gram] = {key}
+            else:
+                bucket.add(key)
+
+    def remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        postings = self._postings
+        for gram in _grams(text):
+            bucket = postings.get(gram)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del postings[gram]
+
+    def rename(self, old_key, new_key, fields):
+        self.remove(old_key)
+        self.add(new_key, fields)
+
+    @staticmethod
+    def normalize(query):
+        return query.strip().casefold()
+
+    def matches(self, key, query):
+        """True if the (normalized) query occurs in key's text."""
+        return not query or query in self._texts.get(key, '')
+
+    def search(self, query):
+        """Return the set of keys whose text contains the (normalized) query."""
+        texts = self._texts
+        if len(query) < GRAM:
+            return {key for key, text in texts.items() if query in text}
+
+        buckets = []
+        for gram in _grams(query):
+            bucket = self._postings.get(gram)
+            if not bucket:
+                return set()
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        candidates = set(buckets[0])
+        for bucket in buckets[1:]:
+            candidates &= bucket
+            if not candidates:
+                return candidates
+        if len(query) == GRAM:
+            return candidates
+        return {key for key in candidates if query in texts[key]}
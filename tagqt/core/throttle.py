@@ -0,0 +1,181 @@
+"""Shared scheduling for outgoing web requests.
+
+Every request TagQt makes goes through one RequestScheduler, which keeps a
+token bucket (requests per second, with a burst allowance) and a cap on
+requests in flight for each host. Different services don't wait on each
+other, so cover, iTunes and LRCLIB lookups can overlap while
+musicbrainz.org stays at the one request per second its policy allows.
+
+The scheduler also counts, per host, the requests made, how many are
+queued right now and how long they waited for their turn.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+HostPolicy = namedtuple('HostPolicy', 'rate burst max_in_flight')
+HostPolicy.__doc__ = """
+rate: requests per second, or None for no rate limit. burst: requests that
+may go out back to back after a quiet spell. max_in_flight: requests
+running at once.
+"""
+
+# Matched against the request's host and its parent domains
+HOST_POLICIES = {
+    'musicbrainz.org': HostPolicy(1.0, 1, 1),
+    'coverartarchive.org': HostPolicy(10.0, 10, 4),
+    # Cover Art Archive redirects to the Internet Archive for the images
+    'archive.org': HostPolicy(10.0, 10, 4),
+    'itunes.apple.com': HostPolicy(0.33, 3, 2),
+    'mzstatic.com': HostPolicy(10.0, 10, 4),
+    'lrclib.net': HostPolicy(10.0, 10, 8),
+    # syncedlyrics makes its own requests; each search is scheduled as a whole
+    'syncedlyrics': HostPolicy(2.0, 2, 2),
+}
+DEFAULT_POLICY = HostPolicy(5.0, 5, 4)
+
+HostStats = namedtuple('HostStats', 'requests queued in_flight total_wait max_wait')
+# How often a queued request checks whether it was cancelled
+CANCEL_POLL = 0.1
+
+
+class RequestCancelled(Exception):
+    """A queued request was cancelled before its turn came."""
+
+
+def host_of(url):
+    """The host a URL is scheduled under; bare names like "syncedlyrics" are kept as is."""
+    if '://' not in url:
+        return url.lower()
+    return (urlparse(url).hostname or '').lower()
+
+
+class _Host:
+    def __init__(self, policy):
+        self.policy = policy
+        self.tokens = float(policy.burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.queued = 0
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def refill(self, now):
+        if self.policy.rate:
+            self.tokens = min(self.policy.burst, self.tokens + (now - self.updated) * self.policy.rate)
+        self.updated = now
+
+    def ready_in(self, now):
+        """Seconds until this host may start another request."""
+        if self.in_flight >= self.policy.max_in_flight:
+            return None     # wait for a running request to finish
+        if not self.policy.rate or self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.policy.rate
+
+
+class RequestScheduler:
+    """Per-host token buckets and in-flight limits shared by every web client."""
+
+    def __init__(self, policies=None):
+        self._policies = dict(HOST_POLICIES if policies is None else policies)
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def _policy_for(self, host):
+        parts = host.split('.')
+        for i in range(len(parts)):
+            policy = self._policies.get('.'.join(parts[i:]))
+            if policy is not None:
+                return policy
+        return DEFAULT_POLICY
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _Host(self._policy_for(host))
+        return state
+
+    def set_policy(self, host, policy):
+        """Change a host's limits, e.g. when a MusicBrainz mirror is configured."""
+        with self._cond:
+            self._policies[host] = policy
+            for name, state in self._hosts.items():
+                if name == host or name.endswith('.' + host):
+                    state.policy = self._policy_for(name)
+                    state.tokens = min(state.tokens, policy.burst)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url, cancel=None):
+        """
+        Block until url's host may start a request, and hold its place while
+        it runs. If the threading.Event cancel is set while waiting, raises
+        RequestCancelled instead.
+        """
+        host = host_of(url)
+        start = time.monotonic()
+        with self._cond:
+            state = self._host(host)
+            state.queued += 1
+            try:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        raise RequestCancelled(url)
+                    now = time.monotonic()
+                    state.refill(now)
+                    delay = state.ready_in(now)
+                    if delay == 0:
+                        break
+                    if cancel is not None:
+                        delay = CANCEL_POLL if delay is None else min(delay, CANCEL_POLL)
+                    self._cond.wait(delay)
+            finally:
+                state.queued -= 1
+            if state.policy.rate:
+                state.tokens -= 1
+            state.in_flight += 1
+            waited = time.monotonic() - start
+            state.requests += 1
+            state.total_wait += waited
+            state.max_wait = max(state.max_wait, waited)
+        try:
+            yield
+        finally:
+            with self._cond:
+                state.in_flight -= 1
+                self._cond.notify_all()
+
+    def get(self, url, session=None, cancel=None, **kwargs):
+        """requests.get (or session.get) through url's host slot."""
+        with self.slot(url, cancel):
+            return (session or requests).get(url, **kwargs)
+
+    def stats(self):
+        """HostStats per host seen so far."""
+        with self._cond:
+            return {
+                host: HostStats(s.requests, s.queued, s.in_flight, s.total_wait, s.max_wait)
+                for host, s in self._hosts.items()
+            }
+
+    def totals(self):
+        """(requests, seconds spent waiting, requests queued now) across all hosts."""
+        with self._cond:
+            hosts = self._hosts.values()
+            return (sum(s.requests for s in hosts), sum(s.total_wait for s in hosts),
+                    sum(s.queued for s in hosts))
+
+
+_scheduler = RequestScheduler()
+
+
+def get_scheduler():
+    """Return the process-wide RequestScheduler."""
+    return _scheduler
@@ -1,12 +1,13 @@
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QTreeWidget, QTreeWidgetItem, 
+    QDialog, QVBoxLayout, QTableView, QAbstractItemView,
     QHeaderView, QProgressBar, QLabel, QHBoxLayout,
     QPushButton
 )
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QColor
 from tagqt.ui.theme import Theme
 from tagqt.ui.side import ClickableLabel
+from collections import Counter
 import os
 
 class ClickableProgressBar(QProgressBar):
@@ -16,6 +17,90 @@ class ClickableProgressBar(QProgressBar):
         self.clicked.emit()
         super().mousePressEvent(event)
 
+class BatchResultModel(QAbstractTableModel):
+    """
+    Batch results, one row per path. A later result for a path already
+    listed replaces its row; new paths are appended in bulk. Per-status
+    counts are kept as rows change.
+    """
+    HEADERS = ("File", "Status", "Details")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []      # [path, status, details]
+        self._row_of = {}    # path -> row
+        self.counts = Counter()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path, status, details = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return os.path.basename(path)
+            return status if column == 1 else details
+        if role == Qt.ToolTipRole and column == 0:
+            return path
+        if role == Qt.ForegroundRole and column == 1:
+            if status in ("Success", "Found", "Updated"):
+                return QColor(Theme.SUCCESS)
+            if status in ("Error", "Missing"):
+                return QColor(Theme.RED)
+            return QColor(Theme.SUBTEXT0)
+        return None
+
+    def add_results(self, results):
+        """Apply a list of (path, status, details) in order."""
+        rows = self._rows
+        existing = len(rows)
+        appended = []
+        first_changed = last_changed = None
+        counts = self.counts
+        for path, status, details in results:
+            row = self._row_of.get(path)
+            if row is None:
+                self._row_of[path] = existing + len(appended)
+                appended.append([path, status, details])
+            else:
+                entry = rows[row] if row < existing else appended[row - existing]
+                counts[entry[1]] -= 1
+                entry[1], entry[2] = status, details
+                if row < existing:
+                    first_changed = row if first_changed is None else min(first_changed, row)
+                    last_changed = row if last_changed is None else max(last_changed, row)
+            counts[status] += 1
+
+        if first_changed is not None:
+            self.dataChanged.emit(self.index(first_changed, 1), self.index(last_changed, 2))
+        if appended:
+            self.beginInsertRows(QModelIndex(), existing, existing + len(appended) - 1)
+            rows.extend(appended)
+            self.endInsertRows()
+
+    def results(self):
+        return [{'file': path, 'status': status, 'details': details}
+                for path, status, details in self._rows]
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._row_of = {}
+        self.counts = Counter()
+        self.endResetModel()
+
+
 class BatchStatusDialog(QDialog):
     def __init__(self, parent=None, title="Batch Operation"):
         super().__init__(parent)
@@ -54,15 +139,23 @@ class BatchStatusDialog(QDialog):
         layout.addWidget(self.progress_bar)
         
         # Results Tree (Matching UnifiedSearchDialog style)
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["File", "Status", "Details"])
+        self.model = BatchResultModel(self)
+        # A flat table: a tree view re-lays out every row on each append
+        self.tree = QTableView()
+        self.tree.setModel(self.model)
+        self.tree.verticalHeader().setVisible(False)
+        self.tree.verticalHeader().setDefaultSectionSize(28)
+        self.tree.setShowGrid(False)
+        self.tree.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tree.setWordWrap(False)
+        self.tree.horizontalHeader().setDefaultAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         
-        self.tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.tree.header().setSectionResizeMode(2, QHeaderView.Stretch)
-        self.tree.setRootIsDecorated(False)
+        # Sizing columns to contents would measure every row of a large batch
+        self.tree.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tree.horizontalHeader().setSectionResizeMode(1, QHeaderView.Fixed)
+        self.tree.horizontalHeader().resizeSection(1, 110)
+        self.tree.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
         self.tree.setAlternatingRowColors(True)
-        self.tree.setUniformRowHeights(True)
         
         layout.addWidget(self.tree)
         
@@ -76,52 +169,36 @@ class BatchStatusDialog(QDialog):
         footer.addWidget(self.close_btn)
         layout.addLayout(footer)
         
-        self.results = [] 
+    @property
+    def results(self):
+        return self.model.results()
+
+    @property
+    def counts(self):
+        return self.model.counts
+
+    def result_count(self):
+        return self.model.rowCount()
 
     def update_progress(self, current, total):
-        self.progress_bar.setRange(0, total)
-        self.progress_bar.setValue(current)
+        if total != self.progress_bar.maximum():
+            self.progress_bar.setRange(0, total)
+        if current != self.progress_bar.value():
+            self.progress_bar.setValue(current)
         percent = int((current / total) * 100) if total > 0 else 0
         self.status_label.setText(f"{current} of {total} \u00b7 {percent}%")
-    def set_finished(self):
-        self.status_label.setText("All done.")
+
+    def set_finished(self, detail=None):
+        self.status_label.setText(f"All done. {detail}" if detail else "All done.")
         self.progress_bar.setValue(self.progress_bar.maximum())
 
     def add_result(self, filepath, status, details):
-        filename = os.path.basename(filepath)
-        
-        existing_item = None
-        for i in range(self.tree.topLevelItemCount()):
-            item = self.tree.topLevelItem(i)
-            if item.text(0) == filename:
-                existing_item = item
-                break
-        
-        if existing_item:
-            existing_item.setText(1, status)
-            existing_item.setText(2, details)
-            item = existing_item
-        else:
-            item = QTreeWidgetItem([filename, status, details])
-            self.tree.addTopLevelItem(item)
-        
-        if status == "Success" or status == "Found" or status == "Updated":
-            item.setForeground(1, QColor(Theme.SUCCESS))
-        elif status == "Error" or status == "Missing":
-            item.setForeground(1, QColor(Theme.RED))
-        elif status == "Skipped":
-            item.setForeground(1, QColor(Theme.SUBTEXT0))
-        else:
-            item.setForeground(1, QColor(Theme.SUBTEXT0))
-        
-        for i, r in enumerate(self.results):
-            if r['file'] == filepath:
-                self.results[i] = {'file': filepath, 'status': status, 'details': details}
-                return
-        self.results.append({'file': filepath, 'status': status, 'details': details})
+        self.model.add_results([(filepath, status, details)])
+
+    def add_results(self, results):
+        self.model.add_results(results)
 
     def clear(self):
-        self.tree.clear()
-        self.results = []
+        self.model.clear()
         self.progress_bar.setValue(0)
         self.status_label.setText("Ready")
@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QMessageBox, QProgressDialog
+from PySide6.QtWidgets import QMessageBox, QProgressDialog, QInputDialog, QLineEdit
 from PySide6.QtCore import Qt
 from tagqt.ui.theme import Theme
 
@@ -40,6 +40,19 @@ def show_question(parent, title, message):
     return msg.exec() == QMessageBox.Yes
 
 
+def get_text(parent, title, label, text=""):
+    """Ask for a line of text; returns None if cancelled."""
+    dialog = QInputDialog(parent)
+    dialog.setWindowTitle(title)
+    dialog.setLabelText(label)
+    dialog.setTextEchoMode(QLineEdit.Normal)
+    dialog.setTextValue(text)
+    dialog.setStyleSheet(Theme.current_stylesheet())
+    if dialog.exec() != QInputDialog.Accepted:
+        return None
+    return dialog.textValue()
+
+
 def create_progress(parent, title, message, max_value):
     progress = QProgressDialog(message, "Cancel", 0, max_value, parent)
     progress.setWindowTitle(title)
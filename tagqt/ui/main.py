@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QMainWindow, QHBoxLayout, QVBoxLayout, QWidget, QPushButton, QFileDialog, QLabel, QComboBox, QMenuBar, QMenu, QTreeWidgetItemIterator, QDialog, QProgressBar, QSizePolicy, QLineEdit, QSlider, QAbstractItemView
+from PySide6.QtWidgets import QMainWindow, QHBoxLayout, QVBoxLayout, QWidget, QPushButton, QFileDialog, QLabel, QComboBox, QMenuBar, QMenu, QDialog, QProgressBar, QSizePolicy, QLineEdit, QSlider, QAbstractItemView, QToolTip
 from PySide6.QtGui import QPixmap, QAction, QShortcut, QKeySequence, QFont, QTextCursor, QTextCharFormat, QColor, QPainter
 from PySide6.QtCore import Qt, QTimer, QThread, QPropertyAnimation, QEasingCurve
 from PySide6.QtSvg import QSvgRenderer
@@ -11,13 +11,18 @@ from tagqt.core.roman import Romanizer
 from tagqt.core.art import CoverArtManager
 from tagqt.core.flac import DependencyChecker
 from tagqt.core.settings import Settings
+from tagqt.core.library import get_library_index
+from tagqt.core.httpcache import get_http_cache
+from tagqt.core.musicbrainz import MusicBrainzClient
+from tagqt.core.throttle import get_scheduler
+from tagqt.core.query import QueryError
 from tagqt.ui import dialogs
 from tagqt.ui.batch_status import ClickableProgressBar, BatchStatusDialog, ClickableLabel
 from tagqt.ui.workers import (
     LyricsWorker, AutoTagWorker, FolderLoaderWorker, RenameWorker,
     CoverFetchWorker, CoverResizeWorker, RomanizeWorker, CaseConvertWorker,
     FlacReencodeWorker, CsvImportWorker, SaveWorker, DuplicateScanWorker,
-    BpmDetectWorker, UndoBatchWorker, LIBROSA_AVAILABLE
+    BpmDetectWorker, TagLayoutWorker, UndoBatchWorker, LIBROSA_AVAILABLE
 )
 from tagqt.core.lyric import SYNCEDLYRICS_AVAILABLE
 from tagqt.core.snapshot import BatchSnapshot
@@ -26,6 +31,33 @@ import os
 import sys
 import base64
 
+
+def _format_bytes(size):
+    for unit in ("bytes", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _write_summary(report):
+    parts = []
+    if report.in_place:
+        parts.append(f"{report.in_place} in place ({_format_bytes(report.in_place_bytes)})")
+    if report.rewritten:
+        parts.append(f"{report.rewritten} rewritten ({_format_bytes(report.rewritten_bytes)})")
+    return ", ".join(parts)
+
+
+def _layout_summary(report):
+    parts = []
+    if report.optimized:
+        saved = report.bytes_saved
+        parts.append(f"{_format_bytes(abs(saved))} {'saved' if saved >= 0 else 'added as padding'}")
+    parts.append(f"{report.in_place_rate:.0%} ready for in-place edits")
+    return ", ".join(parts)
+
+
 class MainWindow(QMainWindow):
     AUDIO_EXTENSIONS = ('.mp3', '.flac', '.ogg', '.wav', '.m4a', '.aac', '.wma', '.opus')
 
@@ -43,9 +75,19 @@ class MainWindow(QMainWindow):
         self.romanizer = Romanizer()
         self.cover_manager = CoverArtManager()
         self.settings = Settings()
+        MetadataHandler.padding = self.settings.get_tag_padding()
+        self._mb_source = MusicBrainzClient.configure(
+            self.settings.get_musicbrainz_source(),
+            server=self.settings.get_musicbrainz_server(),
+            dataset=self.settings.get_musicbrainz_dataset(),
+        )
         
         self.batch_dialog = None
         self.batch_running = False
+        self._batch_write_report = None
+        self._batch_layout_report = None
+        self._batch_cache_stats = None
+        self._batch_net_stats = None
         self._status_is_batch = False
         self._persistent_toast = None # (message, is_batch)
         self.thread = None
@@ -204,7 +246,7 @@ class MainWindow(QMainWindow):
         left_panel.setSpacing(10)
         
         self.filter_input = QLineEdit()
-        self.filter_input.setPlaceholderText("Search by name, title, artist, album...")
+        self.filter_input.setPlaceholderText("Search… e.g. jazz genre:rock year:1990..1999 -has:cover bitrate<256")
         self.filter_input.setClearButtonEnabled(True)
         self.filter_input.textChanged.connect(self.on_filter_changed)
         self.filter_input.setStyleSheet(f"""
@@ -226,6 +268,14 @@ class MainWindow(QMainWindow):
         self.filter_timer.setSingleShot(True)
         self.filter_timer.setInterval(200)
         self.filter_timer.timeout.connect(self._apply_filter)
+
+        # Batch results are applied to the list in bulk rather than one row per signal
+        self._pending_updates = []
+        self._pending_renames = []
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(100)
+        self.update_timer.timeout.connect(self._flush_pending_updates)
         
         self.file_list = FileList()
         self.file_list.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -233,8 +283,8 @@ class MainWindow(QMainWindow):
         self.file_list.files_dropped.connect(self.on_files_dropped)
         self.file_list.setAcceptDrops(False)
         self.file_list.setDragDropMode(QAbstractItemView.NoDragDrop)
-        self.file_list.itemSelectionChanged.connect(self.on_selection_changed)
-        self.file_list.itemDoubleClicked.connect(self._on_tree_double_click)
+        self.file_list.selection_changed.connect(self.on_selection_changed)
+        self.file_list.doubleClicked.connect(self._on_tree_double_click)
         left_panel.addWidget(self.file_list)
         
         content_layout.addLayout(left_panel, stretch=2)
@@ -262,7 +312,6 @@ class MainWindow(QMainWindow):
         self.player.track_changed.connect(self._on_player_track_changed)
         self.player.position_changed.connect(self._on_player_position_changed)
         self.player.lyric_line_changed.connect(self._on_lyric_line_changed)
-        self._now_playing_item = None  # track the bolded row
         self._player_follow_paused = False  # pause list+editor+lyrics sync while user edits
         
         player_bar = QWidget()
@@ -412,6 +461,7 @@ class MainWindow(QMainWindow):
             {"name": "Rename files", "shortcut": "", "callback": self.rename_all_files},
             {"name": "Auto-tag (all)", "shortcut": "", "callback": self.autotag_all},
             {"name": "Re-encode FLAC", "shortcut": "", "callback": self.reencode_flac_selected},
+            {"name": "Optimize tag layout", "shortcut": "", "callback": self.optimize_layout_selected},
             {"name": "Romanize lyrics", "shortcut": "", "callback": self.romanize_all},
             {"name": "Resize covers", "shortcut": "", "callback": self.resize_all_covers},
             {"name": "Theme: Latte", "shortcut": "", "callback": lambda: self.set_theme_flavor("latte")},
@@ -522,6 +572,11 @@ class MainWindow(QMainWindow):
             self.batch_dialog.clear()
             
         self.batch_running = True
+        self._batch_write_report = None
+        self._batch_layout_report = None
+        cache = get_http_cache()
+        self._batch_cache_stats = cache.stats() if cache is not None else None
+        self._batch_net_stats = get_scheduler().totals()
         self._status_is_batch = True
         self._persistent_toast = None
         self.batch_container.setVisible(True)
@@ -541,8 +596,12 @@ class MainWindow(QMainWindow):
         self.thread.finished.connect(self.thread.deleteLater)
         
         self.worker.progress.connect(self.on_batch_progress)
-        self.worker.result.connect(result_handler or self.on_batch_result)
+        self.worker.results.connect(result_handler or self.on_batch_results)
         self.worker.finished.connect(self.on_batch_finished)
+        if hasattr(self.worker, 'written'):
+            self.worker.written.connect(self._on_batch_written)
+        if hasattr(self.worker, 'report'):
+            self.worker.report.connect(self._on_layout_report)
         if connect_log and hasattr(self.worker, 'log'):
             self.worker.log.connect(self.on_batch_log)
         
@@ -672,6 +731,14 @@ class MainWindow(QMainWindow):
         reencode_all_action.triggered.connect(self.reencode_flac_all)
         file_actions_menu.addAction(reencode_all_action)
 
+        layout_action = QAction("Optimize Tag Layout (selected)", self)
+        layout_action.triggered.connect(self.optimize_layout_selected)
+        file_actions_menu.addAction(layout_action)
+
+        layout_all_action = QAction("Optimize Tag Layout (all visible)", self)
+        layout_all_action.triggered.connect(self.optimize_layout_all)
+        file_actions_menu.addAction(layout_all_action)
+
         tools_menu.addSeparator()
         find_dupes_action = QAction("Find Duplicates", self)
         find_dupes_action.triggered.connect(self.find_duplicates)
@@ -702,6 +769,51 @@ class MainWindow(QMainWindow):
                 action.setChecked(key in enabled_providers)
                 action.toggled.connect(lambda checked, k=key: self._on_provider_toggled(k, checked))
             self._provider_actions[key] = action
+
+        from PySide6.QtGui import QActionGroup
+        scan_menu = tools_menu.addMenu("Scan Workers")
+        scan_group = QActionGroup(self)
+        scan_group.setExclusive(True)
+        scan_workers = self.settings.get_scan_workers()
+        for count in (0, 1, 2, 4, 8, 16):
+            action = QAction("Auto (one per core)" if count == 0 else str(count), self)
+            action.setCheckable(True)
+            action.setChecked(count == scan_workers)
+            action.triggered.connect(lambda checked, c=count: self.settings.set_scan_workers(c))
+            scan_group.addAction(action)
+            scan_menu.addAction(action)
+
+        padding_menu = tools_menu.addMenu("Tag Padding")
+        padding_group = QActionGroup(self)
+        padding_group.setExclusive(True)
+        tag_padding = self.settings.get_tag_padding()
+        for size, label in ((0, "None"), (16 * 1024, "16 KB"), (64 * 1024, "64 KB"),
+                            (256 * 1024, "256 KB"), (1024 * 1024, "1 MB")):
+            action = QAction(label, self)
+            action.setToolTip("Space reserved when a save has to rewrite the whole file")
+            action.setCheckable(True)
+            action.setChecked(size == tag_padding)
+            action.triggered.connect(lambda checked, s=size: self._set_tag_padding(s))
+            padding_group.addAction(action)
+            padding_menu.addAction(action)
+
+        source_menu = tools_menu.addMenu("MusicBrainz Source")
+        source_group = QActionGroup(self)
+        source_group.setExclusive(True)
+        self._mb_source_actions = {}
+        for source, label, tip in (
+            ("web", "musicbrainz.org", "The public server, one request per second"),
+            ("mirror", "Mirror Server…", "A self-hosted MusicBrainz server, without the rate limit"),
+            ("local", "Local Dataset…", "A dataset imported with: python -m tagqt.core.mbdata"),
+        ):
+            action = QAction(label, self)
+            action.setToolTip(tip)
+            action.setCheckable(True)
+            action.triggered.connect(lambda checked, s=source: self._set_musicbrainz_source(s))
+            source_group.addAction(action)
+            source_menu.addAction(action)
+            self._mb_source_actions[source] = action
+        self._mb_source_actions[self._mb_source].setChecked(True)
         
         view_menu = menu_bar.addMenu("View")
         
@@ -807,6 +919,11 @@ class MainWindow(QMainWindow):
         reencode_action.triggered.connect(self.reencode_flac_selected)
         reencode_action.setEnabled(has_selection)
         menu.addAction(reencode_action)
+
+        layout_action = QAction("Optimize Tag Layout", self)
+        layout_action.triggered.connect(self.optimize_layout_selected)
+        layout_action.setEnabled(has_selection)
+        menu.addAction(layout_action)
         
         menu.addSeparator()
         
@@ -891,10 +1008,14 @@ class MainWindow(QMainWindow):
         if not deleted:
             return
 
+        index = get_library_index()
+        if index:
+            index.remove(deleted)
+
         # Stop player if the playing track was deleted
         if playing_path and playing_path in deleted:
             self.player.stop()
-            self._now_playing_item = None
+            self.file_list.set_now_playing(None)
             self.now_playing_label.setText("")
 
         # Clear editor if the current file was deleted
@@ -903,24 +1024,12 @@ class MainWindow(QMainWindow):
             self.metadata = None
 
         self.file_list.remove_files(deleted)
-        self.file_list.update_missing_indicators()
 
         self.show_toast(f"Deleted {len(deleted)} file{'s' if len(deleted) != 1 else ''}.")
 
     def enter_global_mode(self):
         # Select all VISIBLE files
-        # First clear selection
-        self.file_list.clearSelection()
-        
-        # Iterate and select visible
-        iterator = QTreeWidgetItemIterator(self.file_list)
-        has_visible = False
-        while iterator.value():
-            item = iterator.value()
-            if not item.isHidden():
-                item.setSelected(True)
-                has_visible = True
-            iterator += 1
+        has_visible = self.file_list.select_all_visible()
             
         if not has_visible:
             self.show_toast("No visible files to edit. Open a folder first.")
@@ -939,19 +1048,7 @@ class MainWindow(QMainWindow):
         if files:
             first_file = files[0]
             
-            iterator = QTreeWidgetItemIterator(self.file_list)
-            found = False
-            while iterator.value():
-                item = iterator.value()
-                if item.data(0, Qt.UserRole) == first_file:
-                    self.file_list.clearSelection()
-                    self.file_list.setCurrentItem(item)
-                    item.setSelected(True)
-                    found = True
-                    break
-                iterator += 1
-            
-            if found:
+            if self.file_list.set_current_path(first_file):
                 self.load_file(first_file)
             else:
                 self.file_list.clearSelection()
@@ -961,39 +1058,12 @@ class MainWindow(QMainWindow):
         self.show_toast("Exited global edit.")
 
     def get_selected_files(self):
-        # Helper to get selected files from FileList
-        # Currently FileList is single selection mostly, but we should support multi-selection for tools
-        # For now, let's just use the current file if single, or all files if we implement multi-select later.
-        # But wait, FileList is a QTreeWidget.
-        selected_items = self.file_list.selectedItems()
-        files = []
-        for item in selected_items:
-            filepath = item.data(0, Qt.UserRole)
-            if filepath:
-                files.append(filepath)
-            else:
-                # It's a group, maybe add children?
-                for i in range(item.childCount()):
-                    child = item.child(i)
-                    fp = child.data(0, Qt.UserRole)
-                    if fp:
-                        files.append(fp)
-        return list(dict.fromkeys(files)) # Unique
+        # Selected groups expand to every file in the group
+        return self.file_list.selected_paths()
         
     def get_all_files(self):
-        # Helper to get all files in the list
-        # MODIFIED: Only return VISIBLE files to support scoped bulk operations
-        files = []
-        iterator = QTreeWidgetItemIterator(self.file_list)
-        while iterator.value():
-            item = iterator.value()
-            # Check if item is hidden
-            if not item.isHidden():
-                filepath = item.data(0, Qt.UserRole)
-                if filepath:
-                    files.append(filepath)
-            iterator += 1
-        return list(dict.fromkeys(files))
+        # Only VISIBLE files, to support scoped bulk operations
+        return self.file_list.visible_paths()
 
 
 
@@ -1052,11 +1122,60 @@ class MainWindow(QMainWindow):
                 self.progress_label.setText(f"{op}… {target_value}%")
         self.batch_dialog.update_progress(current, total)
         
-    def on_batch_result(self, filepath, status, message):
-        self.batch_dialog.add_result(filepath, status, message)
-        if status in ["Updated", "Success", "Found"]:
-            self.file_list.update_file(filepath)
-        
+    def on_batch_results(self, results):
+        self.batch_dialog.add_results(results)
+        for filepath, status, message in results:
+            if status in ("Updated", "Success", "Found"):
+                self._queue_update(filepath)
+
+    def _queue_update(self, filepath):
+        self._pending_updates.append(filepath)
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    def _flush_pending_updates(self):
+        self.update_timer.stop()
+        paths, self._pending_updates = self._pending_updates, []
+        renames, self._pending_renames = self._pending_renames, []
+        if paths or renames:
+            self.file_list.apply_updates(paths, renames)
+        
+    def _set_tag_padding(self, size):
+        self.settings.set_tag_padding(size)
+        MetadataHandler.padding = size
+
+    def _set_musicbrainz_source(self, source):
+        server = self.settings.get_musicbrainz_server()
+        dataset = self.settings.get_musicbrainz_dataset()
+        if source == "mirror":
+            server = dialogs.get_text(self, "MusicBrainz Mirror", "Server URL:", server or "http://localhost:5000")
+            if not server:
+                self._mb_source_actions[self._mb_source].setChecked(True)
+                return
+            server = server.strip()
+        elif source == "local":
+            dataset, _ = QFileDialog.getOpenFileName(
+                self, "Choose MusicBrainz dataset", os.path.dirname(dataset), "SQLite Datasets (*.db *.sqlite)")
+            if not dataset:
+                self._mb_source_actions[self._mb_source].setChecked(True)
+                return
+
+        active = MusicBrainzClient.configure(source, server=server, dataset=dataset)
+        if active != source:
+            dialogs.show_warning(self, "MusicBrainz Source",
+                                 "That source couldn't be used; auto-tag will use musicbrainz.org.")
+        self._mb_source = active
+        self.settings.set_musicbrainz_source(active)
+        self.settings.set_musicbrainz_server(server)
+        self.settings.set_musicbrainz_dataset(dataset)
+        self._mb_source_actions[active].setChecked(True)
+
+    def _on_batch_written(self, report):
+        self._batch_write_report = report
+
+    def _on_layout_report(self, report):
+        self._batch_layout_report = report
+
     def on_batch_log(self, message):
         logging.getLogger(__name__).debug(message)
     
@@ -1073,6 +1192,7 @@ class MainWindow(QMainWindow):
             self._on_cancel_complete()
 
     def _on_cancel_complete(self):
+        self._flush_pending_updates()
         self.batch_running = False
         self.batch_container.setVisible(False)
         self.batch_cancel_btn.setVisible(False)
@@ -1107,6 +1227,7 @@ class MainWindow(QMainWindow):
         self._start_batch_worker(UndoBatchWorker(snapshot))
 
     def on_batch_finished(self):
+        self._flush_pending_updates()
         self.batch_running = False
         self.batch_dialog.set_finished()
         self.batch_cancel_btn.setVisible(False)
@@ -1119,18 +1240,19 @@ class MainWindow(QMainWindow):
             self.exit_global_mode()
         
         # Generate detailed summary
-        results = self.batch_dialog.results
-        total = len(results)
+        counts = self.batch_dialog.counts
+        total = self.batch_dialog.result_count()
         
         if total == 0:
             self.show_toast("Nothing to process.", is_batch=True)
             return
 
-        success_count = len([r for r in results if r['status'] in ['Success', 'Updated', 'Found', 'Renamed']])
-        skipped_count = len([r for r in results if r['status'] == 'Skipped'])
-        error_count = len([r for r in results if r['status'] in ['Error', 'Missing', 'Failed']])
+        success_count = sum(counts[s] for s in ('Success', 'Updated', 'Found', 'Renamed'))
+        skipped_count = counts['Skipped']
+        unchanged_count = counts['Unchanged']
+        error_count = sum(counts[s] for s in ('Error', 'Missing', 'Failed'))
         
-        if skipped_count == total:
+        if skipped_count + unchanged_count == total:
             msg = f"All {total} files already up to date."
         elif success_count == total:
             msg = f"All done — updated {total} files."
@@ -1140,18 +1262,37 @@ class MainWindow(QMainWindow):
             parts = []
             if success_count > 0: parts.append(f"Updated {success_count}")
             if skipped_count > 0: parts.append(f"Skipped {skipped_count}")
+            if unchanged_count > 0: parts.append(f"Unchanged {unchanged_count}")
             if error_count > 0: parts.append(f"Failed {error_count}")
             msg = "Done — " + ", ".join(parts).lower()
+
+        notes = []
+        details = []
+        report = self._batch_write_report
+        if report and report.files:
+            notes.append(_write_summary(report))
+            details.append(f"Files written: {_write_summary(report)}.")
+        report = self._batch_layout_report
+        if report and report.files:
+            summary = _layout_summary(report)
+            notes.append(summary)
+            details.append(f"{summary[0].upper()}{summary[1:]}.")
+        cache = get_http_cache() if self._batch_cache_stats is not None else None
+        if cache is not None:
+            hits, misses = (now - then for now, then in zip(cache.stats(), self._batch_cache_stats))
+            if hits or misses:
+                notes.append(f"web cache {hits} hits, {misses} misses")
+                details.append(f"Web cache: {hits} hits, {misses} misses.")
+        if self._batch_net_stats is not None:
+            requests_made, waited, _ = (now - then for now, then in zip(get_scheduler().totals(), self._batch_net_stats))
+            if requests_made:
+                details.append(f"Network: {requests_made} requests, {waited:.1f} s waiting on rate limits.")
+        if notes:
+            msg = f"{msg.rstrip('.')} · {' · '.join(notes)}."
+            self.batch_dialog.set_finished(" ".join(details))
             
         self.show_toast(msg, is_batch=True)
         
-        # If we are in a grouped mode, we need a full refresh at the end
-        # to ensure items are in the correct groups if their tags changed.
-        if self.file_list.current_mode != "File":
-            self.file_list.refresh_view()
-
-        self.file_list.update_missing_indicators()
-            
         if self.current_file:
              self.load_file(self.current_file)
 
@@ -1247,11 +1388,9 @@ class MainWindow(QMainWindow):
         self._show_rename_dialog(files)
 
     def _show_rename_dialog(self, files):
-        # We need metadata for preview
-        file_data = []
-        for f in files:
-            md = MetadataHandler(f)
-            file_data.append((f, md))
+        # The loaded records carry every tag the rename patterns use
+        store = self.file_list.store
+        file_data = [(f, store.get(f)) for f in files]
             
         from tagqt.ui.rename import RenamerDialog
         dialog = RenamerDialog(file_data, self)
@@ -1267,17 +1406,21 @@ class MainWindow(QMainWindow):
             self._batch_op_label = "Renaming files"
             self.progress_label.setText("Renaming files… 0%")
             
-            self._start_batch_worker(RenameWorker(rename_data), result_handler=self.on_rename_result)
+            self._start_batch_worker(RenameWorker(rename_data), result_handler=self.on_rename_results)
 
-    def on_rename_result(self, old_path, status, message):
-        self.batch_dialog.add_result(old_path, status, message)
-        if status == "Success":
+    def on_rename_results(self, results):
+        self.batch_dialog.add_results(results)
+        for old_path, status, message in results:
+            if status != "Success":
+                continue
             # Extract new path from message "Renamed to ..."
             new_name = message.replace("Renamed to ", "")
             dir_path = os.path.dirname(old_path)
             new_path = os.path.join(dir_path, new_name)
             
-            self.file_list.rename_file(old_path, new_path)
+            self._pending_renames.append((old_path, new_path))
+            if not self.update_timer.isActive():
+                self.update_timer.start()
             
             if self.current_file == old_path:
                 self.current_file = new_path
@@ -1335,13 +1478,39 @@ class MainWindow(QMainWindow):
         
         self._start_batch_worker(FlacReencodeWorker(flac_files))
 
-    def find_duplicates(self):
-        files = self.file_list.all_files
+    def optimize_layout_selected(self):
+        files = self.get_selected_files()
+        if not files:
+            dialogs.show_warning(self, "No Selection", "Select the files whose tag layout you want to optimize.")
+            return
+        self._optimize_layout_files(files)
+
+    def optimize_layout_all(self):
+        files = self.get_all_files()
         if not files:
+            dialogs.show_warning(self, "No Files", "Open a folder to load audio files first.")
+            return
+        self._optimize_layout_files(files)
+
+    def _optimize_layout_files(self, files):
+        if not self._prepare_batch("Optimize Tag Layout Status"):
+            return
+
+        self.progress_bar.setRange(0, len(files))
+        self._batch_op_label = "Optimizing tag layout"
+        self.progress_label.setText("Optimizing tag layout… 0%")
+
+        worker = TagLayoutWorker(files, MetadataHandler.padding, workers=self.settings.get_scan_workers() or None)
+        self._start_batch_worker(worker, connect_log=True)
+
+    def find_duplicates(self):
+        store = self.file_list.store
+        if not len(store):
             dialogs.show_warning(self, "No Files", "Load some audio files first.")
             return
 
-        data = [(path, meta.title or '', meta.artist or '') for path, meta in files]
+        columns = store.columns
+        data = list(zip(store.paths, columns['title'], columns['artist']))
         self._dup_thread = QThread()
         self._dup_worker = DuplicateScanWorker(data)
         self._dup_worker.moveToThread(self._dup_thread)
@@ -1552,27 +1721,21 @@ class MainWindow(QMainWindow):
         parent_dialog.accept()
 
     def _select_all_duplicates(self, paths, dialog):
-        self.file_list.clearSelection()
-        for p in paths:
-            item = self.file_list.path_to_item.get(p)
-            if item:
-                item.setSelected(True)
+        self.file_list.select_paths(paths)
         dialog.accept()
 
     def _on_dupe_tree_clicked(self, item, dialog):
         path = item.data(0, Qt.ItemDataRole.UserRole)
         if not path:
             return
-        file_item = self.file_list.path_to_item.get(path)
-        if file_item:
-            self.file_list.clearSelection()
-            file_item.setSelected(True)
-            self.file_list.scrollToItem(file_item)
+        if path in self.file_list.store:
+            self.file_list.select_paths([path])
+            self.file_list.scroll_to_path(path)
         dialog.accept()
 
     def export_to_csv(self):
-        files = self.file_list.all_files
-        if not files:
+        paths = list(self.file_list.store.paths)
+        if not paths:
             dialogs.show_warning(self, "No Files", "Load some audio files before exporting.")
             return
         
@@ -1582,9 +1745,12 @@ class MainWindow(QMainWindow):
             return
         
         from tagqt.core.csv_io import export_metadata_to_csv
-        success, error = export_metadata_to_csv(files, filepath)
+        # Loaded rows only carry the columns shown in the list; open each file
+        # as the export reaches it for comment and lyrics.
+        rows = ((path, MetadataHandler(path)) for path in paths)
+        success, error = export_metadata_to_csv(rows, filepath)
         if success:
-            self.show_toast(f"Exported {len(files)} files to CSV.")
+            self.show_toast(f"Exported {len(paths)} files to CSV.")
         else:
             dialogs.show_warning(self, "Couldn't Export", error)
 
@@ -1670,11 +1836,12 @@ class MainWindow(QMainWindow):
             
         self._batch_op_label = "Scanning folder"
         self.progress_label.setText("Scanning folder…")
-        self.progress_bar.setRange(0, 0) # Indeterminate
+        self.progress_bar.setRange(0, 0) # Indeterminate until the file count is known
+        self.file_list.clear_files()
         
         # Create Thread and Worker
         self.thread = QThread()
-        self.worker = FolderLoaderWorker(folder_path)
+        self.worker = FolderLoaderWorker(folder_path, workers=self.settings.get_scan_workers() or None)
         self.worker.moveToThread(self.thread)
         
         # Connect signals
@@ -1683,19 +1850,23 @@ class MainWindow(QMainWindow):
         self.worker.finished.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
         
+        self.worker.progress.connect(self.on_batch_progress)
+        self.worker.batch.connect(self.on_folder_batch)
         self.worker.finished.connect(self.on_folder_loaded)
         self.thread.finished.connect(self._cleanup_thread)
         
         # Start
         self.thread.start()
 
+    def on_folder_batch(self, records):
+        """Show rows while the rest of the folder is still being scanned."""
+        self.file_list.append_records(records)
+
     def on_folder_loaded(self, results, folder_path):
+        # Rows already arrived through on_folder_batch; results is the complete list
         self.batch_container.setVisible(False)
-        self.file_list.clear_files()
         if results:
-            self.file_list.add_files(results)
             self.settings.set_last_folder(folder_path)
-            self.file_list.update_missing_indicators()
         
         self.settings.add_recent_folder(folder_path)
         self.update_recent_menu()
@@ -1704,8 +1875,11 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(100)
         self.batch_running = False
         
+        partial = len(self.file_list.store)
         if results:
             self.batch_dialog.add_result(folder_path, "Success", f"Loaded {len(results)} files.")
+        elif partial:
+            self.batch_dialog.add_result(folder_path, "Skipped", f"Stopped after {partial} files.")
         else:
             self.batch_dialog.add_result(folder_path, "Skipped", "No audio files found.")
         self.batch_dialog.set_finished()
@@ -1713,7 +1887,7 @@ class MainWindow(QMainWindow):
         
         if results:
             self.show_toast(f"{len(results)} files loaded from {os.path.basename(folder_path)}.", is_batch=True)
-        else:
+        elif not partial:
              self.show_toast(f"No audio files in {os.path.basename(folder_path)}.", is_batch=False)
 
     def update_recent_menu(self):
@@ -2025,7 +2199,6 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
     def on_files_dropped(self, files):
         if files:
             self.file_list.add_files(files)
-            self.file_list.update_missing_indicators()
             self.load_file(files[0])
 
     def dragEnterEvent(self, event):
@@ -2079,8 +2252,15 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
         self.filter_timer.start()
 
     def _apply_filter(self):
-        """Apply the current filter text to the file list."""
-        self.file_list.set_filter(self.filter_input.text())
+        """Apply the current filter query to the file list."""
+        try:
+            self.file_list.set_filter(self.filter_input.text())
+        except QueryError as e:
+            # Keep the previous results and point at the problem
+            pos = self.filter_input.mapToGlobal(self.filter_input.rect().bottomLeft())
+            QToolTip.showText(pos, str(e), self.filter_input)
+            return
+        QToolTip.hideText()
 
     def on_selection_changed(self):
         # Restart timer (debounce) - waits for selection to stabilize
@@ -2206,7 +2386,13 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
             self.metadata.isrc = self.sidebar.isrc_edit.text()
             self.metadata.publisher = self.sidebar.publisher_edit.text()
             
-            self.metadata.save()
+            if not self.metadata.is_dirty:
+                self.show_toast("Nothing changed.")
+                return
+            if not self.metadata.save():
+                dialogs.show_error(self, "Couldn't Save",
+                                   f"Couldn't write tags to {os.path.basename(self.metadata.filepath)}.")
+                return
             
             # Save cover.jpg if we have cover data (always overwrite on manual save)
             if self.metadata.get_cover():
@@ -2222,7 +2408,6 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
             
             # Refresh the item in the list
             self.file_list.update_file(self.current_file)
-            self.file_list.update_missing_indicators()
 
     def detect_bpm(self):
         if not LIBROSA_AVAILABLE:
@@ -2357,21 +2542,12 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
                 dialogs.show_error(self, "Couldn't Load Lyrics", f"Something went wrong reading that file. {e}")
 
     def _build_play_queue(self) -> list[str]:
-        """Return filepaths in the exact visual order of the QTreeWidget."""
-        paths = []
-        iterator = QTreeWidgetItemIterator(self.file_list)
-        while iterator.value():
-            item = iterator.value()
-            if not item.isHidden():
-                filepath = item.data(0, Qt.UserRole)
-                if filepath and isinstance(filepath, str):
-                    paths.append(filepath)
-            iterator += 1
-        return paths
-
-    def _on_tree_double_click(self, item, column):
+        """Return filepaths in the exact visual order of the file list."""
+        return self.file_list.visible_paths()
+
+    def _on_tree_double_click(self, index):
         """Start playback from the double-clicked track."""
-        filepath = item.data(0, Qt.UserRole)
+        filepath = self.file_list.path_at(index)
         if not filepath:
             return
         queue = self._build_play_queue()
@@ -2390,11 +2566,11 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
             if not queue:
                 return
             # Use selected item if there is one, otherwise start from top
-            selected = self.file_list.selectedItems()
+            selected = self.file_list.selected_paths()
             start = 0
             if selected:
-                fp = selected[0].data(0, Qt.UserRole)
-                if fp and fp in queue:
+                fp = selected[0]
+                if fp in queue:
                     start = queue.index(fp)
             self.player.set_queue(queue, start)
             self._on_player_track_changed(start)
@@ -2426,25 +2602,8 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
         self.now_playing_label.setText(name)
         self.now_playing_label.setToolTip(basename)
 
-        # Remove bold from previous item
-        if self._now_playing_item:
-            try:
-                font = self._now_playing_item.font(0)
-                font.setBold(False)
-                for col in range(self._now_playing_item.columnCount()):
-                    self._now_playing_item.setFont(col, font)
-            except RuntimeError:
-                pass
-            self._now_playing_item = None
-
-        # Bold the new now-playing row
-        if filepath in self.file_list.path_to_item:
-            item = self.file_list.path_to_item[filepath]
-            font = item.font(0)
-            font.setBold(True)
-            for col in range(item.columnCount()):
-                item.setFont(col, font)
-            self._now_playing_item = item
+        # Bold the now-playing row (the previous one is un-bolded)
+        self.file_list.set_now_playing(filepath)
 
         # Always load lyrics into the player for sync
         try:
@@ -2478,12 +2637,11 @@ auto-tag from MusicBrainz, batch rename files — all in one place.</p>
 
     def _highlight_playing_row(self, filepath):
         """Select and scroll to the row matching filepath."""
-        if filepath in self.file_list.path_to_item:
-            item = self.file_list.path_to_item[filepath]
+        if filepath in self.file_list.store:
             self.file_list.blockSignals(True)
-            self.file_list.setCurrentItem(item)
-            self.file_list.scrollToItem(
-                item, QAbstractItemView.ScrollHint.PositionAtCenter
+            self.file_list.set_current_path(filepath)
+            self.file_list.scroll_to_path(
+                filepath, QAbstractItemView.ScrollHint.PositionAtCenter
             )
             self.file_list.blockSignals(False)
 
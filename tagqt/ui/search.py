@@ -7,7 +7,7 @@ from PySide6.QtCore import Qt, QThread, Signal, QObject
 from PySide6.QtGui import QPixmap
 from tagqt.ui.theme import Theme
 from tagqt.ui import dialogs
-import requests
+from tagqt.core.throttle import get_scheduler
 
 
 class ImageLoaderWorker(QObject):
@@ -19,7 +19,7 @@ class ImageLoaderWorker(QObject):
     
     def run(self):
         try:
-            response = requests.get(self.url, timeout=10)
+            response = get_scheduler().get(self.url, timeout=10)
             response.raise_for_status()
             self.finished.emit(response.content)
         except Exception:
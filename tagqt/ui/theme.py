@@ -303,7 +303,7 @@ class Theme:
 
             /* ═══ Tree Widget (File List) ════════════ */
 
-            QTreeWidget {{
+            QTreeWidget, FileList, QTableView {{
                 background-color: {Theme.BASE};
                 alternate-background-color: {Theme.MANTLE};
                 border: 1px solid {Theme.SURFACE1};
@@ -311,21 +311,21 @@ class Theme:
                 padding: 4px;
                 outline: none;
             }}
-            QTreeWidget::item {{
+            QTreeWidget::item, FileList::item, QTableView::item {{
                 padding: 3px 6px;
                 min-height: 22px;
                 border-radius: 0px;
                 color: {Theme.TEXT};
             }}
-            QTreeWidget::item:alternate {{
+            QTreeWidget::item:alternate, FileList::item:alternate, QTableView::item:alternate {{
                 background-color: {Theme.MANTLE};
             }}
-            QTreeWidget::item:selected {{
+            QTreeWidget::item:selected, FileList::item:selected, QTableView::item:selected {{
                 background-color: {Theme.SURFACE1};
                 color: {Theme.TEXT};
                 border-left: 2px solid {Theme.MAUVE};
             }}
-            QTreeWidget::item:hover {{
+            QTreeWidget::item:hover, FileList::item:hover, QTableView::item:hover {{
                 background-color: {Theme.SURFACE0};
             }}
             QHeaderView::section {{
@@ -0,0 +1,572 @@
+"""Item models behind the file list: a flat table over TrackStore and a grouping proxy."""
+
+import bisect
+import os
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QItemSelection, QModelIndex
+from PySide6.QtGui import QFont
+
+from tagqt.core.store import TrackStore
+
+MISSING_ROLE = Qt.UserRole + 1
+
+COLUMN_NAMES = ["Filename", "Title", "Artist", "Album", "Album Artist", "Year", "Genre", "Disc", "Track"]
+COLUMN_FIELDS = ('path', 'title', 'artist', 'album', 'album_artist', 'year', 'genre', 'disc_number', 'track_number')
+CENTERED_COLUMNS = (5, 7, 8)  # Year, Disc, Track
+
+GROUP_MODES = ("Album", "Artist", "Album Artist")
+
+# Views ask for flags on every row during layout; keep the answer constant
+FILE_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemNeverHasChildren
+GROUP_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+# A filter change touching more row ranges than this resets the view instead
+MAX_INCREMENTAL_RUNS = 64
+
+
+class TrackModel(QAbstractTableModel):
+    """One row per loaded file; cell text is produced from the store on demand."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = TrackStore()
+        self.now_playing = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_FIELDS)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self.store) and 0 <= column < len(COLUMN_FIELDS)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def flags(self, index):
+        return FILE_FLAGS if index.isValid() else Qt.NoItemFlags
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(COLUMN_NAMES):
+            return COLUMN_NAMES[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        store = self.store
+        if role == Qt.DisplayRole:
+            value = store.value(row, COLUMN_FIELDS[col])
+            return os.path.basename(value) if col == 0 else value
+        if role == Qt.UserRole:
+            return store.value(row, 'path') if col == 0 else None
+        if role == MISSING_ROLE:
+            return self.missing_count(row) if col == 0 else None
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter) if col in CENTERED_COLUMNS else None
+        if role == Qt.FontRole:
+            if self.now_playing is not None and store.value(row, 'path') == self.now_playing:
+                font = QFont()
+                font.setBold(True)
+                return font
+        return None
+
+    def missing_count(self, row):
+        """Return count of missing critical fields (title, artist, album, cover)."""
+        return self.store.columns['missing'][row]
+
+    def group_key(self, row, mode):
+        columns = self.store.columns
+        if mode == "Album":
+            return columns['album'][row] or "Unknown Album"
+        elif mode == "Artist":
+            return columns['artist'][row] or "Unknown Artist"
+        elif mode == "Album Artist":
+            return columns['album_artist'][row] or columns['artist'][row] or "Unknown Artist"
+        return "Unknown"
+
+    def append_records(self, records):
+        records = [r for r in records if r.path not in self.store]
+        if not records:
+            return
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        self.store.append(records)
+        self.endInsertRows()
+
+    def replace_record(self, row, record):
+        self.replace_records([(row, record)])
+
+    def replace_records(self, updates):
+        """Overwrite (row, record) pairs, with one dataChanged per run of adjacent rows."""
+        rows = []
+        for row, record in updates:
+            self.store.replace(row, record)
+            rows.append(row)
+        last_col = len(COLUMN_FIELDS) - 1
+        for first, last in _runs(sorted(set(rows))):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, last_col))
+
+    def remove_paths(self, paths):
+        ranges = self.store.row_ranges(paths)
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.store.remove_range(first, last)
+            self.endRemoveRows()
+        if ranges:
+            self.store.reindex()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+    def set_now_playing(self, path):
+        previous, self.now_playing = self.now_playing, path
+        for p in (previous, path):
+            row = self.store.row_of(p) if p else None
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMN_FIELDS) - 1), [Qt.FontRole])
+
+
+class GroupProxyModel(QAbstractProxyModel):
+    """
+    Presents TrackModel either flat ("File" mode) or grouped under Album,
+    Artist or Album Artist headers, showing only rows the filter accepts.
+
+    Top-level indexes carry internal id 0; a file row inside a group carries
+    the group's id, which stays stable while other groups come and go.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mode = "File"
+        self.grouped = False
+        self._accepts = None
+        self._rows = []        # File mode: visible source rows, ascending
+        self._groups = {}      # group id -> [key, visible source rows ascending]
+        self._order = []       # group ids sorted by key
+        self._keys = []        # keys in the same order, for bisect
+        self._positions = {}   # group id -> position in _order
+        self._gid_for_key = {}
+        self._src_gid = []     # source row -> group id, 0 when not shown
+        self._next_gid = 1
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self._on_rows_removed)
+        model.dataChanged.connect(self._on_data_changed)
+        model.modelReset.connect(self.rebuild)
+        self.rebuild()
+
+    # --- Configuration ---
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.grouped = mode in GROUP_MODES
+        self.rebuild()
+
+    def set_filter(self, accepts, shown=None):
+        """
+        accepts: callable(source_row) -> bool, or None to show every row. It also
+        decides rows appended later.
+        shown: ascending source rows accepts lets through, if the caller already
+        knows them (e.g. from a search index).
+
+        Only rows whose visibility changes are inserted or removed; a change
+        scattered over many ranges falls back to a single reset.
+        """
+        self._accepts = accepts
+        count = self.sourceModel().rowCount()
+        if shown is None:
+            shown = range(count) if accepts is None else [r for r in range(count) if accepts(r)]
+        shown_set = set(shown)
+        current = self.visible_rows()
+        current_set = set(current)
+        to_hide = sorted(r for r in current if r not in shown_set)
+        to_show = sorted(shown_set - current_set)
+        if self._signal_estimate(to_hide, to_show) > MAX_INCREMENTAL_RUNS:
+            self.beginResetModel()
+            self._build(sorted(shown_set))
+            self.endResetModel()
+            return
+        self._hide_rows(to_hide)
+        self._show_rows(to_show)
+
+    def _signal_estimate(self, to_hide, to_show):
+        """Rough count of insert/remove signals applying the change would emit."""
+        if not self.grouped:
+            return _run_count(to_hide) + _run_count(to_show)
+        source = self.sourceModel()
+        groups = {self._src_gid[row] for row in to_hide}
+        for row in to_show:
+            groups.add(source.group_key(row, self.mode))
+            if len(groups) > MAX_INCREMENTAL_RUNS:
+                break
+        return len(groups)
+
+    def refilter_rows(self, rows):
+        """Re-run the filter and grouping on source rows whose data changed."""
+        accepts = self._accepts
+        source = self.sourceModel()
+        to_show, to_hide = [], []
+        for row in sorted(rows):
+            wanted = accepts is None or accepts(row)
+            shown = self._is_shown(row)
+            if wanted != shown:
+                (to_show if wanted else to_hide).append(row)
+            elif shown and self.grouped and source.group_key(row, self.mode) != self._groups[self._src_gid[row]][0]:
+                # Still shown, but its tags now put it in another group
+                to_hide.append(row)
+                to_show.append(row)
+        self._hide_rows(to_hide)
+        self._show_rows(to_show)
+
+    def rebuild(self):
+        self.beginResetModel()
+        self._build()
+        self.endResetModel()
+
+    def _build(self, visible=None):
+        source = self.sourceModel()
+        count = source.rowCount() if source else 0
+        accepts = self._accepts
+        if visible is None:
+            visible = [r for r in range(count) if accepts is None or accepts(r)]
+
+        self._rows = []
+        self._groups = {}
+        self._order = []
+        self._keys = []
+        self._positions = {}
+        self._gid_for_key = {}
+        self._src_gid = [0] * count
+
+        if not self.grouped:
+            self._rows = list(visible)
+            return
+
+        buckets = {}
+        for row in visible:
+            buckets.setdefault(source.group_key(row, self.mode), []).append(row)
+        for key in sorted(buckets):
+            gid = self._new_group(key, buckets[key])
+            self._positions[gid] = len(self._order)
+            self._order.append(gid)
+            self._keys.append(key)
+
+    def _new_group(self, key, rows):
+        gid = self._next_gid
+        self._next_gid += 1
+        self._groups[gid] = [key, rows]
+        self._gid_for_key[key] = gid
+        for row in rows:
+            self._src_gid[row] = gid
+        return gid
+
+    def _group_index(self, gid):
+        return self.createIndex(self._positions[gid], 0, 0)
+
+    # --- Structure ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        if row < 0 or not 0 <= column < len(COLUMN_FIELDS):
+            return QModelIndex()
+        if not parent.isValid():
+            if row >= (len(self._order) if self.grouped else len(self._rows)):
+                return QModelIndex()
+            return self.createIndex(row, column, 0)
+        if not self.grouped or parent.internalId() != 0 or row >= len(self._groups[self._order[parent.row()]][1]):
+            return QModelIndex()
+        return self.createIndex(row, column, self._order[parent.row()])
+
+    def parent(self, child=None):
+        if child is None:
+            return super().parent()
+        if not child.isValid() or child.internalId() == 0:
+            return QModelIndex()
+        return self._group_index(child.internalId())
+
+    def sibling(self, row, column, idx):
+        return self.index(row, column, self.parent(idx))
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._order) if self.grouped else len(self._rows)
+        if self.grouped and parent.internalId() == 0 and parent.column() == 0:
+            return len(self._groups[self._order[parent.row()]][1])
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(COLUMN_FIELDS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        return self.rowCount(parent) > 0
+
+    def is_group(self, index):
+        return index.isValid() and self.grouped and index.internalId() == 0
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        gid = proxy_index.internalId()
+        if not self.grouped:
+            row = self._rows[proxy_index.row()]
+        elif gid == 0:
+            return QModelIndex()
+        else:
+            row = self._groups[gid][1][proxy_index.row()]
+        return self.sourceModel().index(row, proxy_index.column())
+
+    def source_row(self, proxy_index):
+        """Source row for a file index, or None for group headers."""
+        if not self.grouped:
+            return self._rows[proxy_index.row()]
+        gid = proxy_index.internalId()
+        return self._groups[gid][1][proxy_index.row()] if gid else None
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row()
+        if not self.grouped:
+            pos = bisect.bisect_left(self._rows, row)
+            if pos < len(self._rows) and self._rows[pos] == row:
+                return self.createIndex(pos, source_index.column(), 0)
+            return QModelIndex()
+        gid = self._src_gid[row] if row < len(self._src_gid) else 0
+        if not gid:
+            return QModelIndex()
+        rows = self._groups[gid][1]
+        return self.createIndex(bisect.bisect_left(rows, row), source_index.column(), gid)
+
+    def visible_rows(self):
+        """Source rows in display order."""
+        if not self.grouped:
+            return list(self._rows)
+        rows = []
+        for gid in self._order:
+            rows.extend(self._groups[gid][1])
+        return rows
+
+    def rows_in_selection(self, selection, expand_groups=True):
+        """Source rows covered by a QItemSelection; selected group headers stand for their rows."""
+        rows = []
+        for rng in selection:
+            top, bottom = rng.top(), rng.bottom() + 1
+            parent = rng.parent()
+            if parent.isValid():
+                rows.extend(self._groups[self._order[parent.row()]][1][top:bottom])
+            elif not self.grouped:
+                rows.extend(self._rows[top:bottom])
+            elif expand_groups:
+                for gid in self._order[top:bottom]:
+                    rows.extend(self._groups[gid][1])
+        return rows
+
+    def selection_for_rows(self, source_rows):
+        """Build a QItemSelection covering source_rows, merged into contiguous ranges."""
+        by_parent = {}
+        for row in source_rows:
+            if not self.grouped:
+                pos = bisect.bisect_left(self._rows, row)
+                if pos < len(self._rows) and self._rows[pos] == row:
+                    by_parent.setdefault(0, []).append(pos)
+            else:
+                gid = self._src_gid[row] if row < len(self._src_gid) else 0
+                if gid:
+                    by_parent.setdefault(gid, []).append(bisect.bisect_left(self._groups[gid][1], row))
+
+        last_col = len(COLUMN_FIELDS) - 1
+        selection = QItemSelection()
+        for gid, positions in by_parent.items():
+            parent = self._group_index(gid) if gid else QModelIndex()
+            positions.sort()
+            start = prev = positions[0]
+            for pos in positions[1:] + [None]:
+                if pos is not None and pos <= prev + 1:
+                    prev = pos
+                    continue
+                selection.select(self.index(start, 0, parent), self.index(prev, last_col, parent))
+                if pos is not None:
+                    start = prev = pos
+        return selection
+
+    # --- Data ---
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.is_group(index):
+            if role == Qt.DisplayRole and index.column() == 0:
+                return self._keys[index.row()]
+            return None
+        return self.sourceModel().data(self.mapToSource(index), role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if self.grouped and index.internalId() == 0:
+            return GROUP_FLAGS
+        return FILE_FLAGS
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and section == 0 and role == Qt.DisplayRole:
+            return self.mode if self.grouped else "Filename"
+        return self.sourceModel().headerData(section, orientation, role)
+
+    # --- Incremental show/hide ---
+
+    def _is_shown(self, row):
+        if not self.grouped:
+            pos = bisect.bisect_left(self._rows, row)
+            return pos < len(self._rows) and self._rows[pos] == row
+        return bool(self._src_gid[row])
+
+    def _show_rows(self, rows):
+        """Insert ascending source rows that are currently hidden."""
+        if not rows:
+            return
+        if not self.grouped:
+            self._insert_sorted(QModelIndex(), self._rows, rows)
+            return
+
+        source = self.sourceModel()
+        buckets = {}
+        for row in rows:
+            buckets.setdefault(source.group_key(row, self.mode), []).append(row)
+        for key, group_rows in buckets.items():
+            gid = self._gid_for_key.get(key)
+            if gid is not None:
+                self._insert_sorted(self._group_index(gid), self._groups[gid][1], group_rows)
+                for row in group_rows:
+                    self._src_gid[row] = gid
+            else:
+                pos = bisect.bisect_left(self._keys, key)
+                self.beginInsertRows(QModelIndex(), pos, pos)
+                gid = self._new_group(key, group_rows)
+                self._order.insert(pos, gid)
+                self._keys.insert(pos, key)
+                self._renumber_groups(pos)
+                self.endInsertRows()
+
+    def _hide_rows(self, rows):
+        """Remove ascending source rows that are currently shown."""
+        if not rows:
+            return
+        if not self.grouped:
+            self._remove_sorted(QModelIndex(), self._rows, rows)
+            return
+
+        by_gid = {}
+        for row in rows:
+            by_gid.setdefault(self._src_gid[row], []).append(row)
+            self._src_gid[row] = 0
+        for gid, group_rows in by_gid.items():
+            key, target = self._groups[gid]
+            if len(group_rows) < len(target):
+                self._remove_sorted(self._group_index(gid), target, group_rows)
+                continue
+            pos = self._positions[gid]
+            self.beginRemoveRows(QModelIndex(), pos, pos)
+            del self._order[pos]
+            del self._keys[pos]
+            del self._groups[gid]
+            del self._positions[gid]
+            del self._gid_for_key[key]
+            self._renumber_groups(pos)
+            self.endRemoveRows()
+
+    def _renumber_groups(self, start):
+        for i in range(start, len(self._order)):
+            self._positions[self._order[i]] = i
+
+    def _insert_sorted(self, parent, target, rows):
+        """Merge ascending rows into the ascending list target, one signal per run."""
+        runs = []
+        for row in rows:
+            pos = bisect.bisect_left(target, row)
+            if runs and runs[-1][0] == pos:
+                runs[-1][1].append(row)
+            else:
+                runs.append((pos, [row]))
+        for pos, run in reversed(runs):
+            self.beginInsertRows(parent, pos, pos + len(run) - 1)
+            target[pos:pos] = run
+            self.endInsertRows()
+
+    def _remove_sorted(self, parent, target, rows):
+        """Remove ascending rows from the ascending list target, one signal per run."""
+        runs = []
+        for row in rows:
+            pos = bisect.bisect_left(target, row)
+            if runs and runs[-1][1] == pos - 1:
+                runs[-1][1] = pos
+            else:
+                runs.append([pos, pos])
+        for first, last in reversed(runs):
+            self.beginRemoveRows(parent, first, last)
+            del target[first:last + 1]
+            self.endRemoveRows()
+
+    # --- Source changes ---
+
+    def _on_rows_inserted(self, parent, first, last):
+        # TrackModel only ever appends, so new rows sort after every existing one
+        self._src_gid.extend([0] * (last - first + 1))
+        accepts = self._accepts
+        self._show_rows([r for r in range(first, last + 1) if accepts is None or accepts(r)])
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        if not self.grouped:
+            lo = bisect.bisect_left(self._rows, first)
+            hi = bisect.bisect_right(self._rows, last)
+            self._hide_rows(self._rows[lo:hi])
+        else:
+            self._hide_rows([r for r in range(first, last + 1) if self._src_gid[r]])
+
+    def _on_rows_removed(self, parent, first, last):
+        # Rows after the removed range move up; renumber without touching the view
+        count = last - first + 1
+        del self._src_gid[first:last + 1]
+        if not self.grouped:
+            pos = bisect.bisect_left(self._rows, first)
+            self._rows[pos:] = [r - count for r in self._rows[pos:]]
+            return
+        for group in self._groups.values():
+            rows = group[1]
+            pos = bisect.bisect_left(rows, first)
+            if pos < len(rows):
+                rows[pos:] = [r - count for r in rows[pos:]]
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        source = self.sourceModel()
+        positions = {}  # parent gid (0 for top level) -> proxy rows
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.mapFromSource(source.index(row, 0))
+            if index.isValid():
+                positions.setdefault(index.internalId(), []).append(index.row())
+        last_col = self.columnCount() - 1
+        for gid, rows in positions.items():
+            parent = self._group_index(gid) if gid else QModelIndex()
+            for first, last in _runs(sorted(rows)):
+                self.dataChanged.emit(self.index(first, 0, parent), self.index(last, last_col, parent), roles)
+
+
+def _runs(rows):
+    """Split an ascending list of ints into (first, last) runs of consecutive values."""
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return runs
+
+
+def _run_count(rows):
+    """Number of runs of consecutive integers in an ascending list."""
+    return sum(1 for i, row in enumerate(rows) if i == 0 or rows[i - 1] != row - 1)
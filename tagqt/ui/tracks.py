@@ -1,11 +1,13 @@
-from PySide6.QtWidgets import QTreeWidget, QAbstractItemView, QTreeWidgetItem, QHeaderView, QTreeWidgetItemIterator, QMenu, QStyledItemDelegate
-from PySide6.QtCore import Qt, Signal, QRect
+from PySide6.QtWidgets import QTreeView, QAbstractItemView, QHeaderView, QMenu, QStyledItemDelegate
+from PySide6.QtCore import Qt, Signal, QRect, QItemSelectionModel
 from PySide6.QtGui import QAction, QPainter, QColor, QBrush
 import os
-from tagqt.core.tags import MetadataHandler
+from contextlib import contextmanager
+from tagqt.core.record import TrackRecord
+from tagqt.core.textindex import TrigramIndex
+from tagqt.core.query import compile_query
 from tagqt.ui.theme import Theme
-
-MISSING_ROLE = Qt.UserRole + 1
+from tagqt.ui.track_model import TrackModel, GroupProxyModel, COLUMN_NAMES, MISSING_ROLE
 TEXT_OFFSET = 20  # px offset for filename text to make room for dot
 
 
@@ -42,8 +44,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-class FileList(QTreeWidget):
+class FileList(QTreeView):
     files_dropped = Signal(list)
+    selection_changed = Signal()
 
     def __init__(self):
         super().__init__()
@@ -52,9 +55,18 @@ class FileList(QTreeWidget):
         self.setDragDropMode(QAbstractItemView.DropOnly)
         self.setAlternatingRowColors(True)
         self.setRootIsDecorated(False)
+        self.setUniformRowHeights(True)
+
+        self.track_model = TrackModel(self)
+        self.proxy = GroupProxyModel(self)
+        self.proxy.setSourceModel(self.track_model)
+        self.setModel(self.proxy)
+        self.selectionModel().selectionChanged.connect(self._on_selection_changed)
+        # Groups open expanded, including ones that appear while a folder streams in
+        self.proxy.modelReset.connect(self._expand_groups)
+        self.proxy.rowsInserted.connect(self._expand_new_groups)
         
-        self.column_names = ["Filename", "Title", "Artist", "Album", "Album Artist", "Year", "Genre", "Disc", "Track"]
-        self.setHeaderLabels(self.column_names)
+        self.column_names = list(COLUMN_NAMES)
         
         header = self.header()
         header.setStretchLastSection(False)
@@ -69,13 +81,28 @@ class FileList(QTreeWidget):
         header.setSectionResizeMode(1, QHeaderView.Stretch) # Title stretches
         header.resizeSection(0, 200) # Filename default width
 
-        self.all_files = []
-        self.path_to_item = {} # filepath -> QTreeWidgetItem
-        self.current_mode = "File"
+        self.filter_query = None
+        # Selected paths the filter hides; they are selected again once they show
+        self._hidden_selection = []
+        self._keeping_selection = False
+        self.search_index = TrigramIndex() # filename/title/artist/album, keyed by path
 
         self._missing_delegate = MissingFieldDelegate(self)
         self.setItemDelegateForColumn(0, self._missing_delegate)
 
+    @property
+    def store(self):
+        return self.track_model.store
+
+    @property
+    def all_files(self):
+        """TrackRecords in load order, built from the store on each access."""
+        return list(self.store.records())
+
+    @property
+    def current_mode(self):
+        return self.proxy.mode
+
     def show_header_menu(self, pos):
         menu = QMenu(self)
         for i, name in enumerate(self.column_names):
@@ -112,200 +139,234 @@ class FileList(QTreeWidget):
 
     def add_file(self, path):
         try:
-            meta = MetadataHandler(path)
-            self.all_files.append((path, meta))
-            self.refresh_view()
+            self.append_records([TrackRecord.from_file(path)])
         except Exception as e:
             logger.warning("Error adding file %s: %s", path, e)
 
     def add_files(self, data):
-        """Accepts either a list of paths or a list of (path, metadata) tuples/lists."""
+        """Accepts either a list of paths or a list of TrackRecords."""
+        records = []
         for item in data:
             try:
-                if isinstance(item, (list, tuple)) and len(item) == 2:
-                    path, meta = item
+                if isinstance(item, TrackRecord):
+                    records.append(item)
                 else:
-                    path = item
-                    meta = MetadataHandler(path)
-                self.all_files.append((path, meta))
+                    records.append(TrackRecord.from_file(item))
             except Exception as e:
                 logger.warning("Error adding file: %s", e)
-        self.refresh_view()
+        self.append_records(records)
+
+    def append_records(self, records):
+        """Append TrackRecords; existing rows and the selection are left alone."""
+        for record in records:
+            if record.path not in self.store:
+                self.search_index.add(record.path, _search_fields(record))
+        self.track_model.append_records(records)
 
     def clear_files(self):
-        self.all_files = []
-        self.path_to_item = {}
-        self.clear()
+        self._hidden_selection = []
+        self.search_index.clear()
+        self.track_model.clear()
 
     def set_display_mode(self, mode):
-        self.current_mode = mode
-        self.refresh_view()
+        with self._selection_kept():
+            self.setRootIsDecorated(mode in ("Album", "Artist", "Album Artist"))
+            self.proxy.set_mode(mode)
+
+    def _expand_groups(self):
+        if self.proxy.grouped:
+            self.expandAll()
+
+    def _expand_new_groups(self, parent, first, last):
+        if self.proxy.grouped and not parent.isValid():
+            for row in range(first, last + 1):
+                self.expand(self.proxy.index(row, 0))
 
     def set_filter(self, text):
-        text = text.lower().strip()
-        iterator = QTreeWidgetItemIterator(self)
-        while iterator.value():
-            item = iterator.value()
-            if item.data(0, Qt.UserRole):  # Only filter actual file items
-                filename = item.text(0).lower()
-                title = item.text(1).lower()
-                artist = item.text(2).lower()
-                album = item.text(3).lower()
-                match = (not text or 
-                         text in filename or 
-                         text in title or 
-                         text in artist or 
-                         text in album)
-                item.setHidden(not match)
-            iterator += 1
-
-    def _update_item_columns(self, item, path, meta):
-        """Updates the text of a QTreeWidgetItem in-place."""
-        item.setText(0, os.path.basename(path))
-        item.setText(1, meta.title or "")
-        item.setText(2, meta.artist or "")
-        item.setText(3, meta.album or "")
-        item.setText(4, meta.album_artist or "")
-        item.setText(5, meta.year or "")
-        item.setText(6, meta.genre or "")
-        item.setText(7, meta.disc_number or "")
-        item.setText(8, meta.track_number or "")
-        item.setData(0, Qt.UserRole, path)
-        item.setData(0, MISSING_ROLE, self._calc_missing(meta))
-        
-        item.setTextAlignment(5, Qt.AlignCenter)  # Year
-        item.setTextAlignment(7, Qt.AlignCenter)  # Disc
-        item.setTextAlignment(8, Qt.AlignCenter)  # Track
+        """Filter by a query (see tagqt.core.query); raises QueryError if it doesn't compile."""
+        query = compile_query(text, self.search_index)
+        self.filter_query = query or None
+        with self._selection_kept():
+            if not query:
+                self.proxy.set_filter(None)
+                return
+            self.proxy.set_filter(self._filter_accepts, query.rows(self.store))
+
+    def _filter_accepts(self, row):
+        return self.filter_query.test(self.store, row)
 
     def refresh_view(self):
-        """Rebuild the tree view from internal data using current display mode."""
-        self.setUpdatesEnabled(False)
+        """Regroup and refilter every row, e.g. after tags changed in a grouped view."""
+        with self._selection_kept():
+            self.proxy.rebuild()
+
+    def _on_selection_changed(self, *_):
+        if not self._keeping_selection:
+            # The user picked something else; forget the rows the filter hid
+            self._hidden_selection = []
+        self.selection_changed.emit()
+
+    @contextmanager
+    def _selection_kept(self):
+        """
+        Restore the selected and current paths after the proxy is rebuilt.
+        Selected rows the filter now hides are remembered by path and selected
+        again when a later filter shows them.
+        """
+        store = self.store
+        selected = [store.paths[r] for r in self.proxy.rows_in_selection(self.selectionModel().selection(), expand_groups=False)]
+        selected += [p for p in self._hidden_selection if p in store]
+        current = self.path_at(self.selectionModel().currentIndex())
+        self._keeping_selection = True
         try:
-            self._do_refresh_view()
+            yield
+            if selected:
+                self.select_paths(selected)
+            self._hidden_selection = [p for p in selected if self.index_for_path(p) is None]
+            index = self.index_for_path(current) if current else None
+            if index is not None:
+                self.selectionModel().setCurrentIndex(index, QItemSelectionModel.NoUpdate)
         finally:
-            self.setUpdatesEnabled(True)
-
-    def _do_refresh_view(self):
-        """Internal refresh without update guard."""
-        self.clear()
-        self.path_to_item = {}
-        
-        if self.current_mode == "File":
-            self.headerItem().setText(0, "Filename")
-            self.setRootIsDecorated(False)
-            for path, meta in self.all_files:
-                item = QTreeWidgetItem()
-                self._update_item_columns(item, path, meta)
-                self.addTopLevelItem(item)
-                self.path_to_item[path] = item
-                
-        elif self.current_mode in ["Album", "Artist", "Album Artist"]:
-            self.headerItem().setText(0, self.current_mode)
-            self.setRootIsDecorated(True)
-            groups = {}
-            
-            for path, meta in self.all_files:
-                key = "Unknown"
-                if self.current_mode == "Album":
-                    key = meta.album or "Unknown Album"
-                elif self.current_mode == "Artist":
-                    key = meta.artist or "Unknown Artist"
-                elif self.current_mode == "Album Artist":
-                    key = meta.album_artist or meta.artist or "Unknown Artist"
-                
-                if key not in groups:
-                    groups[key] = []
-                groups[key].append((path, meta))
-            
-            for key in sorted(groups.keys()):
-                group_item = QTreeWidgetItem([key])
-                group_item.setExpanded(True)
-                self.addTopLevelItem(group_item)
-                
-                for path, meta in groups[key]:
-                    item = QTreeWidgetItem()
-                    self._update_item_columns(item, path, meta)
-                    group_item.addChild(item)
-                    self.path_to_item[path] = item
+            self._keeping_selection = False
 
     def update_file(self, path):
-        # Update internal data
-        for i, (fpath, meta) in enumerate(self.all_files):
-            if fpath == path:
-                try:
-                    new_meta = MetadataHandler(path)
-                    self.all_files[i] = (path, new_meta)
-                    
-                    # Update UI in-place if possible
-                    if path in self.path_to_item:
-                        item = self.path_to_item[path]
-                        self._update_item_columns(item, path, new_meta)
-                        
-                        # If in grouped mode, we might need a full refresh if the grouping key changed
-                        # but for simple tag updates, in-place is fine for now.
-                        # MainWindow will trigger a full refresh if needed.
-                    else:
-                        self.refresh_view()
-                except Exception as e:
-                    logger.warning("Error updating file %s: %s", path, e)
-                break
-
-    @staticmethod
-    def _calc_missing(meta):
-        """Return count of missing critical fields (title, artist, album, cover)."""
-        count = 0
-        if not meta.title:
-            count += 1
-        if not meta.artist:
-            count += 1
-        if not meta.album:
-            count += 1
-        try:
-            if not meta.get_cover():
-                count += 1
-        except Exception:
-            count += 1
-        return count
-
-    def update_missing_indicators(self):
-        """Recalculate missing-field dots for all visible rows."""
-        for path, meta in self.all_files:
-            item = self.path_to_item.get(path)
-            if item:
-                item.setData(0, MISSING_ROLE, self._calc_missing(meta))
-        self.viewport().update()
+        self.apply_updates([path])
+
+    def apply_updates(self, paths=(), renames=()):
+        """
+        Bring a batch of changed files up to date in one pass.
+
+        renames: (old_path, new_path) pairs, applied in order, so a chain like
+        b -> c then a -> b resolves the way it happened on disk.
+        paths: files to re-read; listed paths that no longer exist are removed.
+        A path that isn't listed but shares its device and inode with a listed
+        file whose old path is gone is taken as that file after a rename.
+
+        Rows are replaced together and refiltered once for the whole batch;
+        only those rows are repainted, and the missing-field counts of other
+        rows aren't recomputed.
+        """
+        store = self.store
+        updates, gone = [], []
+        renamed = {}  # new path -> row, for rows renamed earlier in this batch
+        for old_path, new_path in renames:
+            row = renamed.pop(old_path, None)
+            if row is None:
+                row = store.row_of(old_path)
+            if row is None:
+                continue
+            # A rename leaves the tags untouched, so only the path changes
+            updates.append((row, store.record(row)._replace(path=new_path)))
+            renamed[new_path] = row
+
+        for path in dict.fromkeys(paths):
+            row = renamed.get(path)
+            if row is None:
+                row = store.row_of(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                if row is not None:
+                    gone.append(path)
+                continue
+            if row is None:
+                row = store.row_of_inode(st.st_dev, st.st_ino)
+                if row is None or os.path.exists(store.paths[row]):
+                    continue
+                updates.append((row, store.record(row)._replace(path=path)))
+                continue
+            try:
+                updates.append((row, TrackRecord.from_file(path, st)))
+            except Exception as e:
+                logger.warning("Error updating file %s: %s", path, e)
+
+        if updates:
+            current = {}  # row -> path as of this point in the batch
+            for row, record in updates:
+                path = current.get(row, store.paths[row])
+                if path != record.path:
+                    self.search_index.rename(path, record.path, _search_fields(record))
+                else:
+                    self.search_index.add(path, _search_fields(record))
+                current[row] = record.path
+            self.track_model.replace_records(updates)
+            if self.proxy.grouped:
+                # Rows may move to another group
+                with self._selection_kept():
+                    self.proxy.refilter_rows(current)
+            else:
+                self.proxy.refilter_rows(current)
+        if gone:
+            self.remove_files(gone)
 
     def rename_file(self, old_path, new_path):
-        # Update internal data
-        for i, (fpath, meta) in enumerate(self.all_files):
-            if fpath == old_path:
-                try:
-                    new_meta = MetadataHandler(new_path)
-                    self.all_files[i] = (new_path, new_meta)
-                    
-                    # Update UI in-place
-                    if old_path in self.path_to_item:
-                        item = self.path_to_item[old_path]
-                        del self.path_to_item[old_path]
-                        self._update_item_columns(item, new_path, new_meta)
-                        self.path_to_item[new_path] = item
-                    else:
-                        self.refresh_view()
-                except Exception as e:
-                    logger.warning("Error loading renamed file %s: %s", new_path, e)
-                break
+        self.apply_updates(renames=[(old_path, new_path)])
 
     def remove_files(self, paths):
-        """Remove files from internal data and UI without full refresh."""
-        path_set = set(paths)
-        self.all_files = [(p, m) for p, m in self.all_files if p not in path_set]
+        """Remove files from the store; other rows keep their selection."""
         for path in paths:
-            item = self.path_to_item.pop(path, None)
-            if item:
-                parent = item.parent()
-                if parent:
-                    parent.removeChild(item)
-                else:
-                    idx = self.indexOfTopLevelItem(item)
-                    if idx >= 0:
-                        self.takeTopLevelItem(idx)
+            self.search_index.remove(path)
+        self.track_model.remove_paths(paths)
+
+    # --- Lookups and selection by path ---
+
+    def path_at(self, index):
+        """Return the file path for a view index, or None for group headers."""
+        if not index.isValid():
+            return None
+        row = self.proxy.source_row(index)
+        return None if row is None else self.store.paths[row]
+
+    def index_for_path(self, path):
+        row = self.store.row_of(path)
+        if row is None:
+            return None
+        index = self.proxy.mapFromSource(self.track_model.index(row, 0))
+        return index if index.isValid() else None
+
+    def visible_paths(self):
+        """Paths of rows passing the filter, in display order."""
+        paths = self.store.paths
+        return [paths[row] for row in self.proxy.visible_rows()]
+
+    def selected_paths(self):
+        """Selected file paths; a selected group header stands for all of its rows."""
+        paths = self.store.paths
+        rows = self.proxy.rows_in_selection(self.selectionModel().selection())
+        return list(dict.fromkeys(paths[row] for row in rows)) # Unique
+
+    def select_paths(self, paths):
+        """Replace the selection with the rows for paths, in as few ranges as possible."""
+        rows = [self.store.row_of(p) for p in paths]
+        self.select_rows([r for r in rows if r is not None])
+
+    def select_rows(self, rows):
+        selection = self.proxy.selection_for_rows(rows)
+        self.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+
+    def select_all_visible(self):
+        """Select every visible file row; returns False if there is none."""
+        rows = self.proxy.visible_rows()
+        self.select_rows(rows)
+        return bool(rows)
+
+    def set_current_path(self, path):
+        """Make path the current, sole selected row."""
+        index = self.index_for_path(path)
+        if index is None:
+            return False
+        self.selectionModel().setCurrentIndex(index, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+        return True
+
+    def scroll_to_path(self, path, hint=QAbstractItemView.EnsureVisible):
+        index = self.index_for_path(path)
+        if index is not None:
+            self.scrollTo(index, hint)
+
+    def set_now_playing(self, path):
+        """Bold the row for path (None clears it)."""
+        self.track_model.set_now_playing(path)
+
+
+def _search_fields(record):
+    return (os.path.basename(record.path), record.title, record.artist, record.album)
@@ -1,8 +1,15 @@
-from PySide6.QtCore import QObject, Signal, QThread
-from tagqt.core.tags import MetadataHandler
+from PySide6.QtCore import QObject, Signal, QThread, QLocale
+from tagqt.core.tags import MetadataHandler, WriteReport
+from tagqt.core.library import LibraryIndex, get_library_index
+from tagqt.core.record import TrackRecord
+from tagqt.core.scan import ScanEngine
 from tagqt.core.musicbrainz import MusicBrainzClient
+from tagqt.core.matching import facts_for
 from tagqt.core.case import CaseConverter
 from tagqt.core.flac import FlacEncoder
+from tagqt.core.layout import SUPPORTED_EXTENSIONS as LAYOUT_EXTENSIONS, LayoutReport, describe, optimize_file
+from tagqt.core.executor import BatchExecutor
+from tagqt.core.throttle import RequestCancelled
 import os
 import re
 import time
@@ -14,21 +21,136 @@ try:
 except ImportError:
     LIBROSA_AVAILABLE = False
 
-class LyricsWorker(QObject):
+class BatchWorker(QObject):
+    """
+    Base for batch workers. Per-file results and progress are buffered and
+    sent as one `results` list at most every RESULT_INTERVAL seconds, so a
+    long batch doesn't queue a signal per file on the GUI thread. Whatever
+    is buffered goes out within RESULT_INTERVAL even if no further result
+    arrives, so slow files don't leave the dialog and progress bar stale.
+    """
     progress = Signal(int, int)
-    result = Signal(str, str, str)
+    results = Signal(list)  # [(path, status, message), ...]
     finished = Signal()
     log = Signal(str)
 
-    def __init__(self, files, lyrics_fetcher):
+    RESULT_INTERVAL = 1 / 30
+
+    def __init__(self):
         super().__init__()
-        self.files = files
-        self.lyrics_fetcher = lyrics_fetcher
         self._stop_event = threading.Event()
+        self._pending_results = []
+        self._pending_progress = None
+        self._last_flush = 0.0
+        # run() blocks this worker's thread, so the deferred flush runs on a timer thread
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
 
     def stop(self):
         self._stop_event.set()
 
+    def emit_result(self, path, status, message):
+        with self._flush_lock:
+            self._pending_results.append((path, status, message))
+        self._flush_soon()
+
+    def emit_progress(self, current, total):
+        with self._flush_lock:
+            self._pending_progress = (current, total)
+        self._flush_soon()
+
+    def _flush_soon(self):
+        with self._flush_lock:
+            wait = self.RESULT_INTERVAL - (time.monotonic() - self._last_flush)
+            if wait > 0:
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(wait, self.flush_results)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                return
+        self.flush_results()
+
+    def flush_results(self):
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._last_flush = time.monotonic()
+            # Emitted under the lock so results and progress keep their order
+            if self._pending_results:
+                results, self._pending_results = self._pending_results, []
+                self.results.emit(results)
+            if self._pending_progress is not None:
+                self.progress.emit(*self._pending_progress)
+                self._pending_progress = None
+
+class FileBatchWorker(BatchWorker):
+    """
+    Base for batch workers whose files are independent of each other.
+
+    Subclasses implement process(item), which runs on a BatchExecutor thread
+    and returns (status, message, md); md is the MetadataHandler it saved, or
+    None. Results and progress are emitted in item order from this thread.
+    """
+    written = Signal(object)
+
+    def __init__(self, files, workers=None):
+        super().__init__()
+        self.files = files
+        self.workers = workers
+        self.write_report = WriteReport()
+
+    def path_of(self, item):
+        return item
+
+    def device_path(self, item):
+        """Path whose storage device caps how many items run at once; None for no cap."""
+        return self.path_of(item)
+
+    def process(self, item):
+        raise NotImplementedError
+
+    def collect(self, md):
+        """Fold one process() outcome into the batch report."""
+        if md is not None:
+            self.write_report.add(md)
+
+    def report_done(self):
+        self.written.emit(self.write_report)
+
+    def run(self):
+        total = len(self.files)
+        executor = BatchExecutor(self.workers, path_of=self.device_path)
+        try:
+            for done, (item, outcome, error) in enumerate(
+                    executor.map(self.process, self.files, self._stop_event), 1):
+                path = self.path_of(item) or "Unknown"
+                if error is not None:
+                    self.emit_result(path, "Error", str(error))
+                else:
+                    status, message, md = outcome
+                    self.collect(md)
+                    self.emit_result(path, status, message)
+                self.emit_progress(done, total)
+        finally:
+            self.flush_results()
+            self.report_done()
+            self.finished.emit()
+
+class LyricsWorker(FileBatchWorker):
+    # Lookups in flight at once; the request scheduler still holds each
+    # lyrics service to its own limit
+    WORKERS = 8
+
+    def __init__(self, files, lyrics_fetcher, workers=None):
+        super().__init__(files, workers or self.WORKERS)
+        self.lyrics_fetcher = lyrics_fetcher
+        self._start_time = time.time()
+
+    def device_path(self, item):
+        # Waiting on the network, not the disk: no per-device cap
+        return None
+
     def _is_synced(self, lyrics):
         if not lyrics:
             return False
@@ -60,89 +182,79 @@ class LyricsWorker(QObject):
         
         return None, False
 
+    def report_done(self):
+        self.log.emit(f"[DEBUG] Batch lyrics finished in {time.time() - self._start_time:.2f}s")
+        super().report_done()
+
     def run(self):
+        self._start_time = time.time()
+        self.log.emit(f"[DEBUG] Starting batch lyrics fetch for {len(self.files)} files "
+                      f"({self.workers} at a time)")
+        super().run()
+
+    def process(self, f):
+        # Each file is read, looked up and written on one pool thread, so
+        # its tags are never touched by two threads at once
+        md = MetadataHandler(f)
+        base_path = os.path.splitext(f)[0]
+        lrc_path = base_path + ".lrc"
+        
+        existing_lyrics = md.lyrics
+        existing_is_synced = self._is_synced(existing_lyrics)
+        
+        if existing_lyrics and existing_is_synced:
+            if not os.path.exists(lrc_path):
+                md.save_lyrics_file()
+                return "Skipped", "Already has synced lyrics, saved .lrc", None
+            return "Skipped", "Already has synced lyrics", None
+        
         try:
-            start_time = time.time()
-            self.log.emit(f"[DEBUG] Starting batch lyrics fetch for {len(self.files)} files")
-            
-            for i, f in enumerate(self.files):
-                if self._stop_event.is_set():
-                    break
-
-                self.progress.emit(i, len(self.files))
-                self.result.emit(f, "Checking", "Checking for synced lyrics…")
-                
-                try:
-                    md = MetadataHandler(f)
-                    base_path = os.path.splitext(f)[0]
-                    lrc_path = base_path + ".lrc"
-                    
-                    existing_lyrics = md.lyrics
-                    existing_is_synced = self._is_synced(existing_lyrics)
-                    
-                    if existing_lyrics and existing_is_synced:
-                        if not os.path.exists(lrc_path):
-                            md.save_lyrics_file()
-                            self.result.emit(f, "Skipped", "Already has synced lyrics, saved .lrc")
-                        else:
-                            self.result.emit(f, "Skipped", "Already has synced lyrics")
-                        continue
-                        
-                    candidates = self.lyrics_fetcher.search_lyrics(md.artist, md.title, md.album)
-                    best, is_synced = self._find_best_match(candidates, md.duration)
-                    
-                    if best and is_synced:
-                        lyrics = best.get("syncedLyrics")
-                        md.lyrics = lyrics
-                        md.save()
-                        
-                        if existing_lyrics:
-                            self.result.emit(f, "Updated", "Replaced with synced lyrics")
-                        else:
-                            self.result.emit(f, "Found", "Got synced lyrics")
-                    elif best and not is_synced:
-                        if existing_lyrics:
-                            if not os.path.exists(lrc_path):
-                                md.save_lyrics_file()
-                                self.result.emit(f, "Skipped", "No synced version found, kept existing, saved .lrc")
-                            else:
-                                self.result.emit(f, "Skipped", "No synced version found, kept existing")
-                        else:
-                            md.lyrics = best.get("plainLyrics")
-                            md.save()
-                            self.result.emit(f, "Found", "Got plain lyrics (no synced version)")
-                    else:
-                        if existing_lyrics:
-                            if not os.path.exists(lrc_path):
-                                md.save_lyrics_file()
-                                self.result.emit(f, "Skipped", "No results, kept existing, saved .lrc")
-                            else:
-                                self.result.emit(f, "Skipped", "No results, kept existing")
-                        else:
-                            self.result.emit(f, "Missing", "No results found")
-                except Exception as e:
-                    self.log.emit(f"[DEBUG] Error fetching lyrics for {f}: {e}")
-                    self.result.emit(f, "Error", str(e))
-                    
-            self.log.emit(f"[DEBUG] Batch lyrics finished in {time.time() - start_time:.2f}s")
-            self.progress.emit(len(self.files), len(self.files))
-        finally:
-            self.finished.emit()
-
-class AutoTagWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
+            candidates = self.lyrics_fetcher.search_lyrics(md.artist, md.title, md.album,
+                                                           cancel=self._stop_event)
+        except RequestCancelled:
+            return "Skipped", "Batch stopped before the lookup", None
+        best, is_synced = self._find_best_match(candidates, md.duration)
+        
+        if best and is_synced:
+            md.lyrics = best.get("syncedLyrics")
+            if not md.is_dirty:
+                return "Unchanged", "Already has these lyrics", None
+            if not md.save():
+                return "Error", "Couldn't write tags", None
+            if existing_lyrics:
+                return "Updated", "Replaced with synced lyrics", md
+            return "Found", "Got synced lyrics", md
+        elif best and not is_synced:
+            if existing_lyrics:
+                if not os.path.exists(lrc_path):
+                    md.save_lyrics_file()
+                    return "Skipped", "No synced version found, kept existing, saved .lrc", None
+                return "Skipped", "No synced version found, kept existing", None
+            md.lyrics = best.get("plainLyrics")
+            if not md.is_dirty:
+                return "Unchanged", "Already has these lyrics", None
+            if not md.save():
+                return "Error", "Couldn't write tags", None
+            return "Found", "Got plain lyrics (no synced version)", md
+        else:
+            if existing_lyrics:
+                if not os.path.exists(lrc_path):
+                    md.save_lyrics_file()
+                    return "Skipped", "No results, kept existing, saved .lrc", None
+                return "Skipped", "No results, kept existing", None
+            return "Missing", "No results found", None
+
+class AutoTagWorker(BatchWorker):
+    written = Signal(object)
 
     def __init__(self, files, skip_existing=True):
         super().__init__()
         self.files = files
         self.skip_existing = skip_existing
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
+        self.write_report = WriteReport()
+        # Editions released in the user's own country are preferred
+        locale = QLocale.system().name()
+        self.country = locale.split("_")[1].upper() if "_" in locale else None
 
     @staticmethod
     def is_generic(val):
@@ -165,6 +277,11 @@ class AutoTagWorker(QObject):
             return not val
         return False
 
+    @staticmethod
+    def describe_release(release):
+        return (f"{release.get('title')} ({release.get('country') or '??'}, "
+                f"{release.get('date') or 'no date'}, {release.get('release_track_count') or '?'} tracks)")
+
     @staticmethod
     def extract_title_from_filename(filepath):
         basename = os.path.splitext(os.path.basename(filepath))[0]
@@ -176,6 +293,8 @@ class AutoTagWorker(QObject):
     def run(self):
         try:
             groups = {}
+            labels = {}
+            facts = {}
             skipped_early = 0
             
             for f in self.files:
@@ -196,37 +315,75 @@ class AutoTagWorker(QObject):
                     else:
                         needs_tagging = True
                     
-                    if artist and album and needs_tagging:
-                        key = (artist, album)
+                    # Files already tagged with a release MBID are grouped by it
+                    # and skip the search; the rest are grouped by artist and album
+                    album_id = md.musicbrainz_album_id
+                    if needs_tagging and (album_id or (artist and album)):
+                        key = album_id or (artist, album)
                         if key not in groups:
                             groups[key] = []
+                            labels[key] = (artist, album)
                         groups[key].append(f)
+                        facts[f] = facts_for(f, md, self.extract_title_from_filename(f))
                     elif not artist or not album:
-                        self.result.emit(f, "Skipped", "Needs artist and album tags")
+                        self.emit_result(f, "Skipped", "Needs artist and album tags")
                         skipped_early += 1
                     elif not needs_tagging:
-                        self.result.emit(f, "Skipped", "All tags already present")
+                        self.emit_result(f, "Skipped", "All tags already present")
                         skipped_early += 1
                 except Exception as e:
-                    self.result.emit(f, "Error", str(e))
+                    self.emit_result(f, "Error", str(e))
                     skipped_early += 1
 
             processed_count = skipped_early
             total_files = len(self.files)
-            self.progress.emit(processed_count, total_files)
+            self.emit_progress(processed_count, total_files)
             
-            for (artist, album), group_files in groups.items():
+            for key, group_files in groups.items():
                 if self._stop_event.is_set():
                     break
                 
-                self.log.emit(f"Looking up: {artist} - {album}")
-                release = MusicBrainzClient.search_release(artist, album)
+                artist, album = labels[key]
+                release = release_data = None
+                not_found = f"'{album}' by '{artist}' not on MusicBrainz"
+                
+                if isinstance(key, str):
+                    # One request for the whole tracklist, no search needed
+                    self.log.emit(f"Looking up release ID: {key}")
+                    release_data = MusicBrainzClient.fetch_release(key)
+                    if release_data:
+                        release = MusicBrainzClient.summarize_release(release_data)
+                        self.log.emit(f"Using tagged release: {self.describe_release(release)}")
+                    elif artist and album:
+                        self.log.emit(f"Release {key} not found, searching by name instead")
+                    else:
+                        not_found = f"Release {key} not on MusicBrainz"
+                
+                if release is None and artist and album:
+                    self.log.emit(f"Looking up: {artist} - {album}")
+                    durations = [facts[f].duration for f in group_files]
+                    release = MusicBrainzClient.search_release(
+                        artist, album,
+                        file_count=len(group_files),
+                        duration=sum(durations) if all(durations) else None,
+                        country=self.country,
+                    )
+                    if release:
+                        self.log.emit(
+                            f"Chose release: {self.describe_release(release)} - score {release['score']:.2f}"
+                        )
+                        # One request for the whole tracklist, unless choosing the release
+                        # already made it; the album's files are then assigned to its
+                        # tracks together, so two files can't claim one track
+                        release_data = release.get("tracklist")
+                        if release_data is None and release.get("id"):
+                            release_data = MusicBrainzClient.fetch_release(release["id"])
                 
                 if not release:
                     for f in group_files:
-                        self.result.emit(f, "Not Found", f"'{album}' by '{artist}' not on MusicBrainz")
+                        self.emit_result(f, "Not Found", not_found)
                         processed_count += 1
-                        self.progress.emit(processed_count, total_files)
+                        self.emit_progress(processed_count, total_files)
                     continue
                     
                 release_id = release.get("id")
@@ -234,14 +391,18 @@ class AutoTagWorker(QObject):
                 album_year = release.get("year")
                 album_genres = release.get("genres", [])
                 
-                release_details = MusicBrainzClient.lookup_release(release_id, None) if release_id else None
+                release_details = MusicBrainzClient.match_track(release_data) if release_data else None
                 disc_count = release_details.get("disc_count", 1) if release_details else 1
+                matches = {}
+                if release_data:
+                    matched = MusicBrainzClient.match_tracks(release_data, [facts[f] for f in group_files])
+                    matches = dict(zip(group_files, matched))
                 
                 for f in group_files:
                     if self._stop_event.is_set():
                         break
                     processed_count += 1
-                    self.progress.emit(processed_count, total_files)
+                    self.emit_progress(processed_count, total_files)
                     
                     try:
                         md = MetadataHandler(f)
@@ -252,30 +413,22 @@ class AutoTagWorker(QObject):
                                 return True
                             return self.is_empty(current_val)
                         
-                        title_to_match = md.title
-                        match_source = "title"
-                        
-                        if self.is_empty(title_to_match):
-                            title_to_match = self.extract_title_from_filename(f)
-                            match_source = "filename"
+                        def apply(label, **values):
+                            # Only listed if a tag actually changed, not just because it was set
+                            before = md.changed_fields
+                            for field, value in values.items():
+                                setattr(md, field, value)
+                            if md.changed_fields != before:
+                                changes.append(label)
                         
-                        track_details = MusicBrainzClient.lookup_release(release_id, title_to_match)
+                        track_details = matches.get(f)
                         track_matched = track_details and track_details.get("track_position")
                         
-                        if not track_matched and match_source == "title":
-                            fallback_title = self.extract_title_from_filename(f)
-                            if fallback_title != title_to_match:
-                                track_details = MusicBrainzClient.lookup_release(release_id, fallback_title)
-                                if track_details and track_details.get("track_position"):
-                                    track_matched = True
-                        
                         if album_year and should_update(md.year):
-                            md.year = album_year
-                            changes.append("year")
+                            apply("year", year=album_year)
                             
                         if release.get("artist") and should_update(md.album_artist):
-                            md.album_artist = release["artist"]
-                            changes.append("album_artist")
+                            apply("album_artist", album_artist=release["artist"])
                         
                         genres_to_use = []
                         if track_details and track_details.get("genres"):
@@ -286,48 +439,60 @@ class AutoTagWorker(QObject):
                             genres_to_use = album_genres
                             
                         if genres_to_use and should_update(md.genre):
-                            md.genre = [g.title() for g in genres_to_use]
-                            changes.append("genre")
+                            apply("genre", genre=[g.title() for g in genres_to_use])
 
                         if track_matched:
                             if track_details.get("track_disc") and should_update(md.disc_number):
                                 disc = str(track_details["track_disc"])
                                 if disc_count > 1:
                                     disc = f"{disc}/{disc_count}"
-                                md.disc_number = disc
-                                changes.append("disc")
+                                apply("disc", disc_number=disc)
                             
                             if track_details.get("track_position") and should_update(md.track_number):
-                                md.track_number = str(track_details["track_position"])
-                                changes.append("track")
+                                apply("track", track_number=str(track_details["track_position"]))
                                 
                             if track_details.get("track_count") and should_update(md.track_total):
-                                md.track_total = str(track_details["track_count"])
-                                changes.append("track_total")
+                                apply("track_total", track_total=str(track_details["track_count"]))
+                            
+                            # Remembered so the next run can skip the search
+                            if release_id and track_details.get("recording_id") and should_update(md.musicbrainz_track_id):
+                                apply("musicbrainz ids", musicbrainz_album_id=release_id,
+                                      musicbrainz_track_id=track_details["recording_id"])
                         
                         if changes:
-                            md.save()
-                            self.result.emit(f, "Updated", f"Added: {', '.join(changes)}")
+                            if not md.save():
+                                self.emit_result(f, "Error", "Couldn't write tags")
+                                continue
+                            self.write_report.add(md)
+                            self.emit_result(f, "Updated", f"Added: {', '.join(changes)}")
                         elif not track_matched:
-                            self.result.emit(f, "Not Matched", "Couldn't match this track in the release")
+                            self.emit_result(f, "Not Matched", "Couldn't match this track in the release")
                         else:
-                            self.result.emit(f, "Skipped", "All tags already present")
+                            self.emit_result(f, "Skipped", "All tags already present")
                             
                     except Exception as e:
-                        self.result.emit(f, "Error", str(e))
+                        self.emit_result(f, "Error", str(e))
             
-            self.progress.emit(total_files, total_files)
+            self.emit_progress(total_files, total_files)
         finally:
+            self.flush_results()
+            self.written.emit(self.write_report)
             self.finished.emit()
 
 class FolderLoaderWorker(QObject):
     progress = Signal(int, int)
+    batch = Signal(list)
     finished = Signal(list, str)
     log = Signal(str)
 
-    def __init__(self, folder_path):
+    # Rows are streamed to the UI every BATCH_SIZE records or BATCH_INTERVAL seconds
+    BATCH_SIZE = 250
+    BATCH_INTERVAL = 0.1
+
+    def __init__(self, folder_path, workers=None):
         super().__init__()
         self.folder_path = folder_path
+        self.workers = workers
         self._stop_event = threading.Event()
 
     def stop(self):
@@ -347,34 +512,84 @@ class FolderLoaderWorker(QObject):
             if self._stop_event.is_set():
                 return
 
-            results = []
-            total = len(paths)
+            index = get_library_index()
+            known = index.lookup_folder(self.folder_path) if index else {}
+            fresh = []
+
+            # Index hits are filled in place; everything else goes to the scan engine
+            records = [None] * len(paths)
+            ready = [False] * len(paths)
+            stale = []
             for i, path in enumerate(paths):
-                if self._stop_event.is_set():
-                    break
+                entry = known.get(path)
                 try:
-                    md = MetadataHandler(path)
-                    results.append((path, md))
-                except Exception as e:
-                    self.log.emit(f"Error reading {path}: {e}")
-                
-                if i % 10 == 0: # Update progress every 10 files to avoid signal overhead
-                    self.progress.emit(i, total)
-            
+                    if entry and LibraryIndex.is_current(entry, os.stat(path)):
+                        records[i] = TrackRecord.from_json(path, entry[3])
+                        ready[i] = True
+                        continue
+                except (OSError, ValueError):
+                    pass
+                stale.append(i)
+
+            total = len(paths)
+            done = total - len(stale)
+            self.progress.emit(done, total)
+
+            # Rows are emitted in path order, as soon as every earlier path is resolved
+            emitted = 0
+            last_emit = time.monotonic()
+
+            def flush(force=False):
+                nonlocal emitted, last_emit
+                end = emitted
+                while end < total and ready[end]:
+                    end += 1
+                if end - emitted < self.BATCH_SIZE and not force and \
+                        time.monotonic() - last_emit < self.BATCH_INTERVAL:
+                    return
+                rows = [r for r in records[emitted:end] if r is not None]
+                emitted = end
+                last_emit = time.monotonic()
+                for start in range(0, len(rows), self.BATCH_SIZE):
+                    self.batch.emit(rows[start:start + self.BATCH_SIZE])
+
+            flush()
+            engine = ScanEngine(workers=self.workers)
+            positions = iter(stale)
+            for chunk in engine.scan([paths[i] for i in stale], self._stop_event):
+                for path, st, record, error in chunk:
+                    i = next(positions)
+                    ready[i] = True
+                    if error:
+                        self.log.emit(f"Error reading {path}: {error}")
+                        continue
+                    records[i] = record
+                    fresh.append((path, st, record))
+                done += len(chunk)
+                self.progress.emit(done, total)
+                flush()
+
+            if not self._stop_event.is_set():
+                flush(force=True)
+
+            results = [record for record in records if record is not None]
+
+            if index:
+                index.store(fresh)
+
             if self._stop_event.is_set():
                 return
 
+            if index:
+                index.prune(self.folder_path, paths)
+
             self.finished.emit(results, self.folder_path)
             finished_emitted = True
         finally:
             if not finished_emitted:
                 self.finished.emit([], self.folder_path)
 
-class RenameWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
+class RenameWorker(BatchWorker):
 
     def __init__(self, rename_data):
         """
@@ -382,19 +597,16 @@ class RenameWorker(QObject):
         """
         super().__init__()
         self.rename_data = rename_data
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
 
     def run(self):
         try:
+            index = get_library_index()
             total = len(self.rename_data)
             for i, (old_path, new_name) in enumerate(self.rename_data.items()):
                 if self._stop_event.is_set():
                     break
                 
-                self.progress.emit(i, total)
+                self.emit_progress(i, total)
                 
                 try:
                     dir_path = os.path.dirname(old_path)
@@ -402,33 +614,30 @@ class RenameWorker(QObject):
                     
                     if old_path != new_path:
                         if os.path.exists(new_path):
-                            self.result.emit(old_path, "Error", f"File already exists: {new_name}")
+                            self.emit_result(old_path, "Error", f"File already exists: {new_name}")
                         else:
                             os.rename(old_path, new_path)
-                            self.result.emit(old_path, "Success", f"Renamed to {new_name}")
+                            if index:
+                                index.rename(old_path, new_path)
+                            self.emit_result(old_path, "Success", f"Renamed to {new_name}")
                     else:
-                        self.result.emit(old_path, "Skipped", "Name unchanged")
+                        self.emit_result(old_path, "Skipped", "Name unchanged")
                 except Exception as e:
-                    self.result.emit(old_path, "Error", str(e))
+                    self.emit_result(old_path, "Error", str(e))
                     
-            self.progress.emit(total, total)
+            self.emit_progress(total, total)
         finally:
+            self.flush_results()
             self.finished.emit()
 
-class CoverFetchWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
+class CoverFetchWorker(BatchWorker):
+    written = Signal(object)
 
     def __init__(self, files, cover_manager):
         super().__init__()
         self.files = files
         self.cover_manager = cover_manager
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
+        self.write_report = WriteReport()
 
     def run(self):
         try:
@@ -437,7 +646,7 @@ class CoverFetchWorker(QObject):
             
             for i, f in enumerate(self.files):
                 if self._stop_event.is_set(): break
-                self.progress.emit(i, total)
+                self.emit_progress(i, total)
                 
                 try:
                     md = MetadataHandler(f)
@@ -448,230 +657,162 @@ class CoverFetchWorker(QObject):
                         data = self.cover_manager.download_and_process_cover(url)
                         if data:
                             md.set_cover(data, max_size=500)
-                            md.save()
+                            if not md.is_dirty:
+                                self.emit_result(f, "Unchanged", "Already has this cover")
+                                continue
+                            if not md.save():
+                                self.emit_result(f, "Error", "Couldn't write tags")
+                                continue
+                            self.write_report.add(md)
                             
                             folder = os.path.dirname(f)
                             if folder not in processed_folders:
                                 md.save_cover_file(data, overwrite=True)
                                 processed_folders.add(folder)
                                 
-                            self.result.emit(f, "Found", "Cover downloaded")
+                            self.emit_result(f, "Found", "Cover downloaded")
                         else:
-                            self.result.emit(f, "Missing", "Download failed")
+                            self.emit_result(f, "Missing", "Download failed")
                     else:
-                        self.result.emit(f, "Missing", "No candidates found")
+                        self.emit_result(f, "Missing", "No candidates found")
                 except Exception as e:
-                    self.result.emit(f, "Error", str(e))
+                    self.emit_result(f, "Error", str(e))
                     
-            self.progress.emit(total, total)
+            self.emit_progress(total, total)
         finally:
+            self.flush_results()
+            self.written.emit(self.write_report)
             self.finished.emit()
 
-class CoverResizeWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
-
-    def __init__(self, files):
-        super().__init__()
-        self.files = files
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
-
-    def run(self):
-        try:
-            total = len(self.files)
-            for i, f in enumerate(self.files):
-                if self._stop_event.is_set(): break
-                self.progress.emit(i, total)
-                
-                try:
-                    md = MetadataHandler(f)
-                    cover = md.get_cover()
-                    if cover:
-                        md.set_cover(cover, max_size=500)
-                        md.save()
-                        self.result.emit(f, "Success", "Cover resized")
-                    else:
-                        self.result.emit(f, "Skipped", "No cover found")
-                except Exception as e:
-                    self.result.emit(f, "Error", str(e))
-                    
-            self.progress.emit(total, total)
-        finally:
-            self.finished.emit()
-
-class RomanizeWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
-
+class CoverResizeWorker(FileBatchWorker):
+    def process(self, f):
+        md = MetadataHandler(f)
+        cover = md.get_cover()
+        if not cover:
+            return "Skipped", "No cover found", None
+        md.set_cover(cover, max_size=500)
+        if not md.is_dirty:
+            return "Unchanged", "Cover already fits", None
+        if not md.save():
+            return "Error", "Couldn't write tags", None
+        return "Success", "Cover resized", md
+
+class RomanizeWorker(FileBatchWorker):
     def __init__(self, files, romanizer):
-        super().__init__()
-        self.files = files
+        super().__init__(files)
         self.romanizer = romanizer
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
 
-    def run(self):
-        try:
-            total = len(self.files)
-            for i, f in enumerate(self.files):
-                if self._stop_event.is_set(): break
-                self.progress.emit(i, total)
-                
-                try:
-                    md = MetadataHandler(f)
-                    val = md.lyrics
-                    if val:
-                        new_val = self.romanizer.romanize_text(val)
-                        if new_val != val:
-                            md.lyrics = new_val
-                            md.save()
-                            self.result.emit(f, "Success", "Lyrics romanized")
-                        else:
-                            self.result.emit(f, "Skipped", "No change needed")
-                    else:
-                        self.result.emit(f, "Skipped", "No lyrics found")
-                except Exception as e:
-                    self.result.emit(f, "Error", str(e))
-                    
-            self.progress.emit(total, total)
-        finally:
-            self.finished.emit()
-
-class CaseConvertWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
+    def process(self, f):
+        md = MetadataHandler(f)
+        val = md.lyrics
+        if not val:
+            return "Skipped", "No lyrics found", None
+        new_val = self.romanizer.romanize_text(val)
+        if new_val == val:
+            return "Skipped", "No change needed", None
+        md.lyrics = new_val
+        if not md.save():
+            return "Error", "Couldn't write tags", None
+        return "Success", "Lyrics romanized", md
+
+class CaseConvertWorker(FileBatchWorker):
+    FIELDS = ['title', 'artist', 'album', 'genre', 'album_artist', 'comment', 'publisher']
 
     def __init__(self, files, mode):
-        super().__init__()
-        self.files = files
+        super().__init__(files)
         self.mode = mode
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
-
-    def run(self):
-        try:
-            total = len(self.files)
-            fields = ['title', 'artist', 'album', 'genre', 'album_artist', 'comment', 'publisher']
-            
-            for i, f in enumerate(self.files):
-                if self._stop_event.is_set(): break
-                self.progress.emit(i, total)
-                
-                try:
-                    md = MetadataHandler(f)
-                    changed = False
-                    for field in fields:
-                        val = getattr(md, field)
-                        if val:
-                            new_val = val
-                            if self.mode == "title": new_val = CaseConverter.to_title_case(val)
-                            elif self.mode == "sentence": new_val = CaseConverter.to_sentence_case(val)
-                            elif self.mode == "upper": new_val = CaseConverter.to_upper_case(val)
-                            elif self.mode == "lower": new_val = CaseConverter.to_lower_case(val)
-                            
-                            if new_val != val:
-                                setattr(md, field, new_val)
-                                changed = True
-                    if changed:
-                        md.save()
-                        self.result.emit(f, "Success", "Case converted")
-                    else:
-                        self.result.emit(f, "Skipped", "No change")
-                except Exception as e:
-                    self.result.emit(f, "Error", str(e))
-                    
-            self.progress.emit(total, total)
-        finally:
-            self.finished.emit()
 
-class FlacReencodeWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
+    def process(self, f):
+        md = MetadataHandler(f)
+        changed = False
+        for field in self.FIELDS:
+            val = getattr(md, field)
+            if val:
+                new_val = val
+                if self.mode == "title": new_val = CaseConverter.to_title_case(val)
+                elif self.mode == "sentence": new_val = CaseConverter.to_sentence_case(val)
+                elif self.mode == "upper": new_val = CaseConverter.to_upper_case(val)
+                elif self.mode == "lower": new_val = CaseConverter.to_lower_case(val)
+
+                if new_val != val:
+                    setattr(md, field, new_val)
+                    changed = True
+        if not changed:
+            return "Skipped", "No change", None
+        if not md.save():
+            return "Error", "Couldn't write tags", None
+        return "Success", "Case converted", md
+
+class FlacReencodeWorker(BatchWorker):
 
     def __init__(self, files):
         super().__init__()
         self.files = files
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
 
     def run(self):
         try:
             total = len(self.files)
             for i, f in enumerate(self.files):
                 if self._stop_event.is_set(): break
-                self.progress.emit(i, total)
+                self.emit_progress(i, total)
                 
                 success, error = FlacEncoder.reencode_flac(f)
                 if success:
-                    self.result.emit(f, "Success", "Re-encoded to 24-bit 48kHz")
+                    self.emit_result(f, "Success", "Re-encoded to 24-bit 48kHz")
                 else:
-                    self.result.emit(f, "Error", error)
+                    self.emit_result(f, "Error", error)
                     
-            self.progress.emit(total, total)
+            self.emit_progress(total, total)
         finally:
+            self.flush_results()
             self.finished.emit()
 
-class CsvImportWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
-
-    def __init__(self, rows):
-        super().__init__()
-        self.rows = rows
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
-
-    def run(self):
-        try:
-            total = len(self.rows)
-            for i, row in enumerate(self.rows):
-                if self._stop_event.is_set(): break
-                self.progress.emit(i, total)
-                
-                fpath = row.get('filepath')
-                if not fpath or not os.path.exists(fpath):
-                    self.result.emit(fpath or "Unknown", "Error", "File not found")
-                    continue
-                try:
-                    md = MetadataHandler(fpath)
-                    changed = False
-                    fields = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 'track_number', 'bpm', 'initial_key', 'comment', 'lyrics']
-                    for field in fields:
-                        if row.get(field):
-                            setattr(md, field, row[field])
-                            changed = True
-                    if changed:
-                        md.save()
-                        self.result.emit(fpath, "Success", "Metadata imported")
-                    else:
-                        self.result.emit(fpath, "Skipped", "No changes in CSV")
-                except Exception as e:
-                    self.result.emit(fpath, "Error", str(e))
-                    
-            self.progress.emit(total, total)
-        finally:
-            self.finished.emit()
+class TagLayoutWorker(FileBatchWorker):
+    report = Signal(object)
+
+    def __init__(self, files, padding, workers=None):
+        super().__init__(files, workers)
+        self.padding = padding
+        self.layout_report = LayoutReport()
+
+    def process(self, f):
+        if not f.lower().endswith(LAYOUT_EXTENSIONS):
+            return "Skipped", "Format not supported", None
+        res = optimize_file(f, self.padding)
+        if not res.changes:
+            return "Unchanged", "Layout already optimal", res
+        return "Success", describe(res), res
+
+    def collect(self, res):
+        if res is not None:
+            self.layout_report.add(res)
+
+    def report_done(self):
+        self.report.emit(self.layout_report)
+
+class CsvImportWorker(FileBatchWorker):
+    FIELDS = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 'track_number', 'bpm', 'initial_key', 'comment', 'lyrics']
+
+    def path_of(self, row):
+        return row.get('filepath')
+
+    def process(self, row):
+        fpath = row.get('filepath')
+        if not fpath or not os.path.exists(fpath):
+            return "Error", "File not found", None
+        md = MetadataHandler(fpath)
+        changed = False
+        for field in self.FIELDS:
+            if row.get(field):
+                setattr(md, field, row[field])
+                changed = True
+        if not changed:
+            return "Skipped", "No changes in CSV", None
+        if not md.is_dirty:
+            return "Unchanged", "Tags already match the CSV", None
+        if not md.save():
+            return "Error", "Couldn't write tags", None
+        return "Success", "Metadata imported", md
 
 class DuplicateScanWorker(QObject):
     """Scans loaded files for duplicate title+artist pairs."""
@@ -692,41 +833,20 @@ class DuplicateScanWorker(QObject):
         self.finished.emit(dupes)
 
 
-class SaveWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-    log = Signal(str)
-
+class SaveWorker(FileBatchWorker):
     def __init__(self, files, changes):
-        super().__init__()
-        self.files = files
+        super().__init__(files)
         self.changes = changes
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
-
-    def run(self):
-        try:
-            total = len(self.files)
-            for i, f in enumerate(self.files):
-                if self._stop_event.is_set(): break
-                self.progress.emit(i, total)
-                
-                try:
-                    md = MetadataHandler(f)
-                    for key, value in self.changes.items():
-                        setattr(md, key, value)
-                    md.save()
-                    self.result.emit(f, "Success", "Metadata updated")
-                except Exception as e:
-                    self.result.emit(f, "Error", str(e))
-                    
-            self.progress.emit(total, total)
-        finally:
-            self.finished.emit()
 
+    def process(self, f):
+        md = MetadataHandler(f)
+        for key, value in self.changes.items():
+            setattr(md, key, value)
+        if not md.is_dirty:
+            return "Unchanged", "Already up to date", None
+        if not md.save():
+            return "Error", "Couldn't write tags", None
+        return "Success", "Metadata updated", md
 
 class BpmDetectWorker(QThread):
     finished = Signal(int)
@@ -747,34 +867,20 @@ class BpmDetectWorker(QThread):
             self.failed.emit(str(e))
 
 
-class UndoBatchWorker(QObject):
-    progress = Signal(int, int)
-    result = Signal(str, str, str)
-    finished = Signal()
-
+class UndoBatchWorker(FileBatchWorker):
     def __init__(self, snapshot):
-        super().__init__()
-        self.snapshot = snapshot
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
-
-    def run(self):
-        items = list(self.snapshot.snapshots.items())
-        total = len(items)
-        try:
-            for i, (filepath, tags) in enumerate(items):
-                if self._stop_event.is_set():
-                    break
-                try:
-                    md = MetadataHandler(filepath)
-                    for field, value in tags.items():
-                        setattr(md, field, value)
-                    md.save()
-                    self.result.emit(filepath, "Success", "Tags restored")
-                except Exception as e:
-                    self.result.emit(filepath, "Error", str(e))
-                self.progress.emit(i + 1, total)
-        finally:
-            self.finished.emit()
+        super().__init__(list(snapshot.snapshots.items()))
+
+    def path_of(self, item):
+        return item[0]
+
+    def process(self, item):
+        filepath, tags = item
+        md = MetadataHandler(filepath)
+        for field, value in tags.items():
+            setattr(md, field, value)
+        if not md.is_dirty:
+            return "Unchanged", "Tags already match", None
+        if not md.save():
+            return "Error", "Couldn't write tags", None
+        return "Success", "Tags restored", md
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(autouse=True)
+def library_index(tmp_path):
+    """Saves update a throwaway library index instead of the user's ~/.config/TagQt one."""
+    from tagqt.core.library import LibraryIndex, set_library_index
+    index = LibraryIndex(str(tmp_path / 'library.db'))
+    set_library_index(index)
+    yield index
+    set_library_index(None)
+
+
+@pytest.fixture(autouse=True)
+def http_cache(tmp_path):
+    """Web lookups are cached in a throwaway database instead of the user's one."""
+    from tagqt.core.httpcache import HttpCache, set_http_cache
+    cache = HttpCache(str(tmp_path / 'http_cache.db'))
+    set_http_cache(cache)
+    yield cache
+    set_http_cache(None)
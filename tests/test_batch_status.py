@@ -0,0 +1,53 @@
+import pytest
+from PySide6.QtCore import Qt
+from PySide6.QtTest import QAbstractItemModelTester
+
+
+@pytest.fixture
+def model(qapp):
+    from tagqt.ui.batch_status import BatchResultModel
+    model = BatchResultModel()
+    model.tester = QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+    return model
+
+
+def _signals(model):
+    seen = []
+    model.rowsInserted.connect(lambda parent, first, last: seen.append(('inserted', first, last)))
+    model.dataChanged.connect(lambda top, bottom: seen.append(('changed', top.row(), bottom.row())))
+    return seen
+
+
+def test_new_paths_are_appended_in_one_insert(model):
+    seen = _signals(model)
+    model.add_results([('/a/1.mp3', 'Success', 'Saved'), ('/a/2.mp3', 'Error', 'Locked')])
+    model.add_results([('/a/3.mp3', 'Skipped', '')])
+    assert seen == [('inserted', 0, 1), ('inserted', 2, 2)]
+    assert model.index(0, 0).data() == '1.mp3'
+    assert model.index(0, 0).data(Qt.ToolTipRole) == '/a/1.mp3'
+    assert [model.index(1, c).data() for c in (1, 2)] == ['Error', 'Locked']
+
+
+def test_later_result_replaces_the_row_and_count(model):
+    model.add_results([('/a/1.mp3', 'Error', 'Locked'), ('/a/2.mp3', 'Error', 'Locked'), ('/a/3.mp3', 'Error', '')])
+    seen = _signals(model)
+    model.add_results([('/a/3.mp3', 'Success', 'Retried'), ('/a/1.mp3', 'Success', 'Retried'), ('/a/4.mp3', 'Found', '')])
+    assert seen == [('changed', 0, 2), ('inserted', 3, 3)]
+    assert model.rowCount() == 4
+    assert model.counts == {'Success': 2, 'Error': 1, 'Found': 1}
+    assert model.results()[0] == {'file': '/a/1.mp3', 'status': 'Success', 'details': 'Retried'}
+
+
+def test_repeated_path_within_one_batch_keeps_one_row(model):
+    model.add_results([('/a/1.mp3', 'Working', ''), ('/a/1.mp3', 'Updated', 'Done')])
+    assert model.rowCount() == 1
+    assert +model.counts == {'Updated': 1}
+    assert model.index(0, 1).data() == 'Updated'
+
+
+def test_clear(model):
+    model.add_results([('/a/1.mp3', 'Success', '')])
+    model.clear()
+    assert model.rowCount() == 0 and not model.counts
+    model.add_results([('/a/1.mp3', 'Error', '')])
+    assert model.results() == [{'file': '/a/1.mp3', 'status': 'Error', 'details': ''}]
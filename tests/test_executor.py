@@ -0,0 +1,91 @@
+import random
+import threading
+import time
+
+from tagqt.core.executor import BatchExecutor
+
+
+class Tracker:
+    """func for BatchExecutor.map that records how many calls overlap, per device."""
+
+    def __init__(self, delay=0.005):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+        self.started = []
+
+    def __call__(self, item):
+        dev, n = item
+        with self.lock:
+            self.started.append(item)
+            self.running[dev] = self.running.get(dev, 0) + 1
+            self.peak[dev] = max(self.peak.get(dev, 0), self.running[dev])
+        time.sleep(random.uniform(0, self.delay))
+        with self.lock:
+            self.running[dev] -= 1
+        if n % 7 == 3:
+            raise ValueError(n)
+        return n * 2
+
+
+def device_executor(workers, limits):
+    executor = BatchExecutor(workers=workers)
+    executor._device = lambda item: (item[0], limits[item[0]])
+    return executor
+
+
+def test_results_come_back_in_order_with_errors():
+    items = [('ssd', n) for n in range(60)]
+    out = list(device_executor(6, {'ssd': 6}).map(Tracker(), items))
+    assert [item for item, _, _ in out] == items
+    for (_, n), result, error in out:
+        if n % 7 == 3:
+            assert result is None and isinstance(error, ValueError)
+        else:
+            assert result == n * 2 and error is None
+
+
+def test_pool_and_device_limits():
+    tracker = Tracker()
+    items = [('hdd' if n % 3 == 0 else 'ssd', n) for n in range(90)]
+    out = list(device_executor(4, {'hdd': 1, 'ssd': 4}).map(tracker, items))
+    assert [item for item, _, _ in out] == items
+    assert tracker.peak['hdd'] == 1
+    assert tracker.peak['ssd'] <= 4
+
+
+def test_stop_starts_nothing_new():
+    stop = threading.Event()
+    tracker = Tracker()
+    items = [('ssd', n) for n in range(200)]
+    out = []
+    for entry in device_executor(4, {'ssd': 4}).map(tracker, items, stop_event=stop):
+        out.append(entry)
+        if len(out) == 10:
+            stop.set()
+    started = len(tracker.started)
+    assert started < len(items)
+    # Everything that ran is handed back, still in order
+    assert [item for item, _, _ in out] == sorted(tracker.started, key=lambda item: item[1])
+    assert len(out) == started
+
+
+def test_single_worker_runs_in_order():
+    tracker = Tracker(delay=0)
+    items = [('ssd', n) for n in range(5)]
+    out = list(BatchExecutor(workers=1).map(tracker, items))
+    assert tracker.started == items
+    assert [result for _, result, _ in out] == [0, 2, 4, None, 8]
+
+
+def test_real_paths_share_a_device_limit(tmp_path):
+    paths = []
+    for n in range(8):
+        path = tmp_path / f'{n}.txt'
+        path.write_text(str(n))
+        paths.append(str(path))
+    executor = BatchExecutor(workers=3)
+    out = list(executor.map(lambda p: open(p).read(), paths))
+    assert [result for _, result, _ in out] == [str(n) for n in range(8)]
+    assert len(executor._limits) == 1
@@ -0,0 +1,52 @@
+import pytest
+
+from tagqt.core.record import TrackRecord
+
+
+@pytest.fixture
+def file_list(qapp):
+    from tagqt.ui.tracks import FileList
+    view = FileList()
+    yield view
+    view.deleteLater()
+
+
+def _record(name, album, title=''):
+    return TrackRecord.create(f'/music/{name}.mp3', album=album, title=title or name)
+
+
+def _groups(view):
+    proxy = view.proxy
+    return [proxy.index(row, 0) for row in range(proxy.rowCount())]
+
+
+def test_grouped_view_opens_groups_expanded(file_list):
+    file_list.append_records([_record('a', 'One'), _record('b', 'Two')])
+    file_list.set_display_mode("Album")
+    assert [file_list.isExpanded(i) for i in _groups(file_list)] == [True, True]
+
+
+def test_groups_added_while_loading_open_expanded(file_list):
+    file_list.set_display_mode("Album")
+    file_list.append_records([_record('a', 'One')])
+    file_list.append_records([_record('b', 'Two'), _record('c', 'One')])
+    assert [file_list.isExpanded(i) for i in _groups(file_list)] == [True, True]
+
+
+def test_selection_hidden_by_filter_comes_back(file_list):
+    file_list.append_records([_record(name, 'One') for name in ('alpha', 'beta', 'gamma', 'delta')])
+    file_list.select_paths(['/music/alpha.mp3', '/music/beta.mp3', '/music/gamma.mp3'])
+    file_list.set_filter('alpha')
+    assert file_list.selected_paths() == ['/music/alpha.mp3']
+    file_list.set_filter('a')
+    file_list.set_filter('')
+    assert file_list.selected_paths() == ['/music/alpha.mp3', '/music/beta.mp3', '/music/gamma.mp3']
+
+
+def test_new_selection_under_filter_forgets_hidden_rows(file_list):
+    file_list.append_records([_record(name, 'One') for name in ('alpha', 'beta', 'gamma')])
+    file_list.select_paths(['/music/alpha.mp3', '/music/beta.mp3'])
+    file_list.set_filter('gamma')
+    file_list.select_paths(['/music/gamma.mp3'])
+    file_list.set_filter('')
+    assert file_list.selected_paths() == ['/music/gamma.mp3']
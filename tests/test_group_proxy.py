@@ -0,0 +1,119 @@
+import pytest
+from PySide6.QtCore import QItemSelection, QModelIndex, qInstallMessageHandler
+from PySide6.QtTest import QAbstractItemModelTester
+
+from tagqt.core.record import TrackRecord
+from tagqt.ui.track_model import GroupProxyModel, TrackModel
+
+ALBUMS = ['Blue', 'Red', 'Green', 'Blue', 'Red', 'Blue', '', 'Green']
+
+
+@pytest.fixture
+def models(qapp):
+    source = TrackModel()
+    source.append_records([
+        TrackRecord.create(f'/music/{i}.mp3', title=f'Song {i}', album=album, artist=f'Artist {i % 2}')
+        for i, album in enumerate(ALBUMS)
+    ])
+    proxy = GroupProxyModel()
+    proxy.setSourceModel(source)
+
+    # Qt's own consistency checks run on every signal the proxy emits
+    problems = []
+    previous = qInstallMessageHandler(lambda mode, context, message: problems.append(message))
+    tester = QAbstractItemModelTester(proxy, QAbstractItemModelTester.FailureReportingMode.Warning)
+    signals = []
+    for name in ('rowsInserted', 'rowsRemoved', 'modelReset'):
+        getattr(proxy, name).connect(lambda *args, name=name: signals.append(name))
+    yield source, proxy, signals
+    qInstallMessageHandler(previous)
+    del tester
+    assert problems == []
+
+
+def layout(proxy):
+    """Group keys and their source rows as shown, or the flat row list."""
+    if not proxy.grouped:
+        return [proxy.source_row(proxy.index(r, 0)) for r in range(proxy.rowCount())]
+    groups = []
+    for g in range(proxy.rowCount()):
+        parent = proxy.index(g, 0)
+        rows = [proxy.source_row(proxy.index(r, 0, parent)) for r in range(proxy.rowCount(parent))]
+        groups.append((proxy.data(parent), rows))
+    return groups
+
+
+def fresh_layout(source, mode, accepts):
+    proxy = GroupProxyModel()
+    proxy.setSourceModel(source)
+    proxy.set_mode(mode)
+    proxy.set_filter(accepts)
+    return layout(proxy)
+
+
+def test_grouping_sorts_groups_and_keeps_row_order(models):
+    source, proxy, _ = models
+    proxy.set_mode("Album")
+    assert layout(proxy) == [
+        ('Blue', [0, 3, 5]), ('Green', [2, 7]), ('Red', [1, 4]), ('Unknown Album', [6]),
+    ]
+    assert proxy.visible_rows() == [0, 3, 5, 2, 7, 1, 4, 6]
+
+
+@pytest.mark.parametrize('mode', ["File", "Album"])
+def test_filter_changes_are_incremental(models, mode):
+    source, proxy, signals = models
+    proxy.set_mode(mode)
+    signals.clear()
+    steps = [lambda r: r % 2 == 0, lambda r: r in (1, 2, 3), None, lambda r: False, lambda r: r == 5]
+    for accepts in steps:
+        proxy.set_filter(accepts)
+        assert layout(proxy) == fresh_layout(source, mode, accepts)
+    assert 'modelReset' not in signals and signals
+
+
+def test_rows_appended_later_join_their_groups(models):
+    source, proxy, _ = models
+    proxy.set_mode("Album")
+    proxy.set_filter(lambda r: source.store.value(r, 'title') != 'Hidden')
+    source.append_records([
+        TrackRecord.create('/music/new1.mp3', album='Red'),
+        TrackRecord.create('/music/new2.mp3', album='Amber'),
+        TrackRecord.create('/music/new3.mp3', album='Red', title='Hidden'),
+    ])
+    assert layout(proxy)[0] == ('Amber', [9])
+    assert ('Red', [1, 4, 8]) in layout(proxy)
+    assert layout(proxy) == fresh_layout(source, "Album", proxy._accepts)
+
+
+def test_removed_rows_renumber_the_rest(models):
+    source, proxy, _ = models
+    proxy.set_mode("Album")
+    source.remove_paths(['/music/1.mp3', '/music/2.mp3', '/music/4.mp3'])
+    # Red lost both rows; later rows moved up by up to three
+    assert layout(proxy) == [('Blue', [0, 1, 2]), ('Green', [4]), ('Unknown Album', [3])]
+
+
+def test_changed_tags_move_a_row_to_another_group(models):
+    source, proxy, _ = models
+    proxy.set_mode("Album")
+    source.replace_record(6, TrackRecord.create('/music/6.mp3', album='Red'))
+    proxy.refilter_rows([6])
+    assert layout(proxy) == [('Blue', [0, 3, 5]), ('Green', [2, 7]), ('Red', [1, 4, 6])]
+
+
+def test_selection_round_trip(models):
+    source, proxy, _ = models
+    for mode in ("File", "Album"):
+        proxy.set_mode(mode)
+        selection = proxy.selection_for_rows([7, 0, 3, 1])
+        assert sorted(proxy.rows_in_selection(selection)) == [0, 1, 3, 7]
+
+
+def test_selected_group_header_stands_for_its_rows(models):
+    source, proxy, _ = models
+    proxy.set_mode("Album")
+    selection = QItemSelection(proxy.index(1, 0), proxy.index(1, 0))
+    assert proxy.rows_in_selection(selection) == [2, 7]
+    assert proxy.rows_in_selection(selection, expand_groups=False) == []
+    assert proxy.mapToSource(proxy.index(1, 0)) == QModelIndex()
@@ -0,0 +1,90 @@
+import pytest
+
+from tagqt.core import httpcache
+from tagqt.core.httpcache import DAY, HttpCache, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable time.time() for the cache module."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(httpcache.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.db'))
+    yield cache
+    cache.close()
+
+
+def test_cache_key_ignores_parameter_order():
+    assert cache_key('https://x/search', {'a': 1, 'b': 'two'}) == cache_key('https://x/search', {'b': 'two', 'a': 1})
+    assert cache_key('https://x/search', {'a': 1}) != cache_key('https://x/search', {'a': 2})
+    assert cache_key('https://x/search', {}) == 'https://x/search'
+
+
+def test_hit_and_miss_counts(cache):
+    assert cache.get('itunes', 'k') == (False, None)
+    cache.put('itunes', 'k', b'body')
+    assert cache.get('itunes', 'k') == (True, b'body')
+    assert cache.stats() == (1, 1)
+    assert cache.hits['itunes'] == 1
+
+
+def test_entries_expire_per_endpoint(cache, clock):
+    cache.put('itunes', 'k', b'body')
+    cache.put('coverart', 'k', b'body')
+    clock[0] += 15 * DAY
+    assert cache.get('itunes', 'k') == (False, None)
+    assert cache.get('coverart', 'k') == (True, b'body')
+    assert cache.total_bytes == len('k') + len(b'body')
+
+
+def test_not_found_is_cached_for_a_shorter_time(cache, clock):
+    cache.put('musicbrainz', 'gone', None)
+    cache.put('musicbrainz', 'there', b'{}')
+    clock[0] += 2 * DAY
+    assert cache.get('musicbrainz', 'gone') == (True, None)
+    clock[0] += 2 * DAY
+    assert cache.get('musicbrainz', 'gone') == (False, None)
+    assert cache.get('musicbrainz', 'there') == (True, b'{}')
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = HttpCache(str(tmp_path / 'cache.db'), max_bytes=1000)
+    for name in 'abcd':
+        cache.put('lrclib', name, bytes(200))
+        clock[0] += 1
+    cache.get('lrclib', 'a')  # now the most recently used
+    clock[0] += 1
+    cache.put('lrclib', 'e', bytes(200))  # 1005 bytes: over the cap
+    assert cache.total_bytes <= 900
+    kept = [name for name in 'abcde' if cache.get('lrclib', name)[0]]
+    assert kept == ['a', 'c', 'd', 'e']
+    cache.close()
+
+
+def test_replacing_an_entry_keeps_the_size_total(cache):
+    cache.put('itunes', 'k', bytes(100))
+    cache.put('itunes', 'k', bytes(10))
+    assert cache.total_bytes == 11
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = HttpCache(path)
+    cache.put('coverart', 'k', b'image')
+    cache.close()
+
+    cache = HttpCache(path)
+    assert cache.total_bytes == len('k') + len(b'image')
+    assert cache.get('coverart', 'k') == (True, b'image')
+    cache.close()
+
+
+def test_shared_cache_can_be_replaced_or_turned_off(http_cache):
+    assert httpcache.get_http_cache() is http_cache
+    httpcache.set_http_cache(None)
+    assert httpcache.get_http_cache() is None
@@ -0,0 +1,179 @@
+import struct
+
+import pytest
+from mutagen.flac import FLAC, Padding, Picture, StreamInfo, VCFLACDict
+from mutagen.id3 import ID3, TIT2
+from mutagen.mp4 import MP4
+
+from tagqt.core.layout import LayoutError, optimize_file
+
+PADDING = 8 * 1024
+FLAC_AUDIO = b'\xff\xf8' + bytes(range(256)) * 4
+
+
+def atom(name, body):
+    return struct.pack('>I4s', 8 + len(body), name) + body
+
+
+def full_atom(name, body, version=0):
+    return atom(name, struct.pack('>I', version << 24) + body)
+
+
+# -- FLAC -------------------------------------------------------------------
+
+@pytest.fixture
+def flac_path(tmp_path):
+    info = struct.pack('>HH', 4096, 4096) + bytes(6)
+    info += ((44100 << 44) | (1 << 41) | (15 << 36) | 441000).to_bytes(8, 'big') + bytes(16)
+    path = tmp_path / 'track.flac'
+    path.write_bytes(b'fLaC' + bytes([0x80]) + len(info).to_bytes(3, 'big') + info + FLAC_AUDIO)
+
+    audio = FLAC(str(path))
+    audio['title'] = 'Song'
+    picture = Picture()
+    picture.type, picture.mime, picture.data = 3, 'image/jpeg', b'jpeg-bytes'
+    audio.add_picture(picture)
+    audio.add_picture(picture)
+    # Pictures ahead of the comments, and padding in the middle
+    blocks = audio.metadata_blocks
+    comments = next(b for b in blocks if isinstance(b, VCFLACDict))
+    blocks.remove(comments)
+    blocks.append(comments)
+    audio.save(padding=lambda info: 100)
+    return str(path)
+
+
+def block_types(path):
+    return [type(b) for b in FLAC(path).metadata_blocks]
+
+
+def test_flac_blocks_reordered_and_padded(flac_path):
+    result = optimize_file(flac_path, padding=PADDING)
+    assert "moved comments ahead of pictures" in result.changes
+    assert "dropped 1 duplicate picture" in result.changes
+    assert block_types(flac_path) == [StreamInfo, VCFLACDict, Picture, Padding]
+    audio = FLAC(flac_path)
+    assert audio['title'] == ['Song']
+    assert audio.metadata_blocks[-1].length == PADDING == result.padding
+    with open(flac_path, 'rb') as f:
+        assert f.read().endswith(FLAC_AUDIO)
+
+
+def test_flac_left_alone_once_laid_out(flac_path):
+    optimize_file(flac_path, padding=PADDING)
+    with open(flac_path, 'rb') as f:
+        before = f.read()
+    result = optimize_file(flac_path, padding=PADDING)
+    assert result.changes == [] and result.old_size == result.new_size
+    with open(flac_path, 'rb') as f:
+        assert f.read() == before
+
+
+# -- MP3 --------------------------------------------------------------------
+
+def test_mp3_upgraded_to_id3v24_with_padding(tmp_path):
+    path = str(tmp_path / 'song.mp3')
+    with open(path, 'wb') as f:
+        f.write((bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)) * 10)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text='Song'))
+    tags.save(path, v2_version=3, v1=2, padding=lambda info: 0)
+
+    result = optimize_file(path, padding=PADDING)
+    assert "ID3v2.3 → v2.4" in result.changes and "dropped ID3v1" in result.changes
+    tags = ID3(path)
+    assert tags.version == (2, 4, 0) and str(tags['TIT2']) == 'Song'
+    with open(path, 'rb') as f:
+        assert b'TAG' not in f.read()[-128:]
+    assert result.padding == PADDING
+    assert optimize_file(path, padding=PADDING).changes == []
+
+
+# -- MP4 --------------------------------------------------------------------
+
+MDAT_PAYLOAD = b'A' * 100 + b'B' * 100
+
+
+def build_mp4(path):
+    """ftyp, free, mdat, then moov, with one stco track and one co64 track into mdat."""
+    ftyp = atom(b'ftyp', b'M4A \x00\x00\x00\x00M4A mp42isom')
+    free = atom(b'free', bytes(24))
+    mdat_start = len(ftyp) + len(free) + 8
+
+    def track(table, offsets):
+        fmt = '>I' if table == b'stco' else '>Q'
+        entries = b''.join(struct.pack(fmt, o) for o in offsets)
+        return atom(b'trak', atom(b'mdia',
+            full_atom(b'mdhd', struct.pack('>IIIIHH', 0, 0, 1000, 5000, 0, 0))
+            + full_atom(b'hdlr', bytes(4) + b'soun' + bytes(12) + b'\x00')
+            + atom(b'minf', atom(b'stbl', full_atom(table, struct.pack('>I', len(offsets)) + entries)))))
+
+    moov = atom(b'moov',
+        full_atom(b'mvhd', struct.pack('>IIII', 0, 0, 1000, 5000) + bytes(80))
+        + track(b'stco', [mdat_start, mdat_start + 100])
+        + track(b'co64', [mdat_start + 50]))
+    with open(path, 'wb') as f:
+        f.write(ftyp + free + atom(b'mdat', MDAT_PAYLOAD) + moov)
+    return [mdat_start, mdat_start + 100, mdat_start + 50]
+
+
+def chunk_offsets(path):
+    audio = MP4(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    offsets = []
+    for table, fmt, width in ((b'stco', '>I', 4), (b'co64', '>Q', 8)):
+        pos = data.index(table) + 8
+        count = struct.unpack_from('>I', data, pos)[0]
+        offsets += [struct.unpack_from(fmt, data, pos + 4 + i * width)[0] for i in range(count)]
+    return offsets, data, audio
+
+
+def top_level(data):
+    names, pos = [], 0
+    while pos < len(data):
+        size, name = struct.unpack_from('>I4s', data, pos)
+        names.append(name)
+        pos += size
+    return names
+
+
+def test_mp4_faststart_patches_chunk_offsets(tmp_path):
+    path = str(tmp_path / 'song.m4a')
+    old_offsets = build_mp4(path)
+    with open(path, 'rb') as f:
+        old = f.read()
+    chunks = [old[o:o + 50] for o in old_offsets]
+
+    result = optimize_file(path, padding=PADDING)
+    assert result.changes[:2] == ["moved moov to front", "dropped 32 B of free atoms"]
+
+    offsets, data, audio = chunk_offsets(path)
+    assert top_level(data) == [b'ftyp', b'moov', b'mdat']
+    assert all(new > old for new, old in zip(offsets, old_offsets))
+    assert [data[o:o + 50] for o in offsets] == chunks
+    assert audio.info.length == 5.0
+    assert optimize_file(path, padding=PADDING).changes == []
+
+
+def test_mp4_offset_outside_mdat_is_refused(tmp_path):
+    path = str(tmp_path / 'bad.m4a')
+    build_mp4(path)
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    pos = data.index(b'stco') + 8
+    struct.pack_into('>I', data, pos + 4, 3)   # points into ftyp
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    with pytest.raises(LayoutError):
+        optimize_file(path, padding=PADDING)
+    with open(path, 'rb') as f:
+        assert f.read() == data
+
+
+def test_unsupported_format(tmp_path):
+    path = tmp_path / 'song.wav'
+    path.write_bytes(b'RIFF')
+    with pytest.raises(LayoutError):
+        optimize_file(str(path))
@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from tagqt.core.library import LibraryIndex
+from tagqt.core.record import TrackRecord
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LibraryIndex(str(tmp_path / 'index.db'))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def music(tmp_path):
+    folder = tmp_path / 'music'
+    folder.mkdir()
+    paths = []
+    for name in ('a.mp3', 'b.mp3'):
+        path = folder / name
+        path.write_bytes(b'x' * 10)
+        paths.append(str(path))
+    return str(folder), paths
+
+
+def _store(index, paths):
+    index.store([(p, os.stat(p), TrackRecord.create(p, title=os.path.basename(p))) for p in paths])
+
+
+def test_lookup_returns_stored_records(index, music):
+    folder, paths = music
+    _store(index, paths)
+    entries = index.lookup_folder(folder)
+    assert sorted(entries) == paths
+    assert TrackRecord.from_json(paths[0], entries[paths[0]][3]).title == 'a.mp3'
+
+
+def test_lookup_stays_inside_the_folder(index, music, tmp_path):
+    folder, paths = music
+    sibling = tmp_path / 'music2.mp3'
+    sibling.write_bytes(b'x')
+    _store(index, paths + [str(sibling)])
+    assert sorted(index.lookup_folder(folder)) == paths
+
+
+def test_is_current_notices_size_and_mtime_changes(index, music):
+    folder, paths = music
+    _store(index, paths)
+    entry = index.lookup_folder(folder)[paths[0]]
+    assert LibraryIndex.is_current(entry, os.stat(paths[0]))
+
+    with open(paths[0], 'ab') as f:
+        f.write(b'more')
+    assert not LibraryIndex.is_current(entry, os.stat(paths[0]))
+
+    st = os.stat(paths[1])
+    entry = index.lookup_folder(folder)[paths[1]]
+    os.utime(paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert not LibraryIndex.is_current(entry, os.stat(paths[1]))
+
+
+def test_rename_moves_the_row_and_replaces_the_target(index, music):
+    folder, (a, b) = music
+    _store(index, [a, b])
+    index.rename(a, b)
+    entries = index.lookup_folder(folder)
+    assert list(entries) == [b]
+    assert TrackRecord.from_json(b, entries[b][3]).title == 'a.mp3'
+
+
+def test_prune_drops_files_no_longer_present(index, music):
+    folder, (a, b) = music
+    _store(index, [a, b])
+    index.prune(folder, [b])
+    assert list(index.lookup_folder(folder)) == [b]
+
+
+def test_schema_change_discards_old_rows(tmp_path, music):
+    folder, paths = music
+    db = str(tmp_path / 'old.db')
+    index = LibraryIndex(db)
+    _store(index, paths)
+    index._conn.execute("PRAGMA user_version = 1")
+    index._conn.commit()
+    index.close()
+
+    reopened = LibraryIndex(db)
+    assert reopened.lookup_folder(folder) == {}
+    reopened.close()
+
+
+def test_save_updates_the_shared_index(library_index, tmp_path):
+    from tagqt.core.tags import MetadataHandler
+    path = tmp_path / 'song.mp3'
+    path.write_bytes((bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)) * 20)
+    _store(library_index, [str(path)])
+
+    md = MetadataHandler(str(path))
+    md.title = 'New Title'
+    assert md.save()
+    entry = library_index.lookup_folder(str(tmp_path))[str(path)]
+    assert LibraryIndex.is_current(entry, os.stat(path))
+    assert TrackRecord.from_json(str(path), entry[3]).title == 'New Title'
@@ -0,0 +1,67 @@
+import itertools
+
+import pytest
+
+from tagqt.core.matching import FileFacts, Track, _assign, match_files, title_similarity
+
+
+def _track(position, title, length=200, disc=1, recording_id=None):
+    recording = {'id': recording_id} if recording_id else {}
+    return Track(disc, position, title, length, 3, recording)
+
+
+def _facts(title, track=None, duration=200, disc=None, recording_id=None):
+    return FileFacts(title, '', track, disc, duration, recording_id)
+
+
+@pytest.mark.parametrize('a, b', [
+    ("Don’t Stop", "Don't Stop"),
+    ("Don`t Stop", "Dont Stop"),
+    ("Café Society", "Cafe society"),
+])
+def test_titles_that_normalize_the_same(a, b):
+    assert title_similarity(a, b) == 1.0
+
+
+def test_exact_title_beats_a_longer_one():
+    assert title_similarity("Intro", "Intro") > title_similarity("Intro", "Intro (Reprise)")
+
+
+def test_assign_finds_the_cheapest_total():
+    # Greedy gives row 0 its cheapest column and then pays 9 for row 1
+    assert _assign([[1, 2], [1, 9]]) == {0: 1, 1: 0}
+    cost = [[4, 1, 3], [2, 0, 5], [3, 2, 2]]
+    pairs = _assign(cost)
+    best = min(sum(cost[r][c] for r, c in enumerate(p)) for p in itertools.permutations(range(3)))
+    assert sum(cost[r][c] for r, c in pairs.items()) == best == 5
+    assert sorted(pairs.values()) == [0, 1, 2]
+
+
+def test_assign_with_more_columns_than_rows():
+    pairs = _assign([[5, 1, 9, 9], [9, 1, 2, 9]])
+    assert pairs == {0: 1, 1: 2}
+
+
+def test_match_files_by_title_number_and_duration():
+    tracks = [_track(1, "Intro", 60), _track(2, "Intro (Reprise)", 240), _track(3, "Don't Stop", 180)]
+    facts = [_facts("Don’t Stop", duration=181), _facts("Intro", track=1, duration=61),
+             _facts("Intro", track=2, duration=239)]
+    result = match_files(facts, tracks)
+    assert {i: t.position for i, (t, _) in result.items()} == {0: 3, 1: 1, 2: 2}
+    assert result[1][1] == pytest.approx(1.0, abs=0.01)
+
+
+def test_recording_id_wins_over_scores():
+    tracks = [_track(1, "Alpha", recording_id='rec-a'), _track(2, "Beta", recording_id='rec-b')]
+    facts = [_facts("Alpha", track=1, recording_id='rec-b'), _facts("Alpha", track=1)]
+    result = match_files(facts, tracks)
+    assert result[0] == (tracks[1], 1.0)
+    assert result[1][0] is tracks[0]
+
+
+def test_poor_matches_are_dropped_and_extra_files_left_out():
+    tracks = [_track(1, "Alpha", 200)]
+    facts = [_facts("Something Else", track=7, duration=20), _facts("Alpha", duration=200)]
+    result = match_files(facts, tracks)
+    assert list(result) == [1]
+    assert match_files([], tracks) == {} and match_files(facts, []) == {}
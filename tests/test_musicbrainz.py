@@ -0,0 +1,68 @@
+import musicbrainzngs
+import pytest
+
+from tagqt.core import musicbrainz
+from tagqt.core.art import CoverArtManager
+from tagqt.core.musicbrainz import GenreMemo, MusicBrainzClient
+
+
+def test_genre_memo_remembers_answers_including_empty_ones():
+    memo = GenreMemo()
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        return [] if key == 'quiet' else ['rock']
+
+    assert memo.get('artist', 'loud', fetch) == ['rock']
+    assert memo.get('artist', 'loud', fetch) == ['rock']
+    assert memo.get('artist', 'quiet', fetch) == []
+    assert memo.get('artist', 'quiet', fetch) == []
+    assert calls == ['loud', 'quiet']
+
+
+def test_genre_memo_retries_failed_lookups():
+    memo = GenreMemo()
+    answers = [None, ['jazz']]
+
+    def fetch(key):
+        return answers.pop(0)
+
+    assert memo.get('release-group', 'rg', fetch) == []
+    assert memo.get('release-group', 'rg', fetch) == ['jazz']
+    assert memo.get('release-group', 'rg', fetch) == ['jazz']
+
+
+EMPTY_SEARCH = b'<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#"><release-list count="0"/></metadata>'
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    """URLs musicbrainzngs requests, answered with an empty search result."""
+    urls = []
+
+    def safe_read(opener, req, body=None, **kwargs):
+        urls.append(req.get_full_url())
+        return EMPTY_SEARCH
+
+    monkeypatch.setattr(musicbrainzngs.musicbrainz, '_safe_read', safe_read)
+    monkeypatch.setattr(musicbrainz, 'get_http_cache', lambda: None)
+    yield urls
+    MusicBrainzClient.configure("web")
+
+
+@pytest.mark.parametrize('server', [
+    'https://mirror.example.org/musicbrainz',
+    'https://mirror.example.org/musicbrainz/',
+    'https://mirror.example.org/musicbrainz/ws/2',
+])
+def test_mirror_keeps_path_prefix(requested, server):
+    assert MusicBrainzClient.configure("mirror", server) == "mirror"
+    MusicBrainzClient.search_release("Band", "Album")
+    assert requested[0].startswith('https://mirror.example.org/musicbrainz/ws/2/release/?')
+
+
+def test_cover_search_uses_configured_mirror(requested):
+    MusicBrainzClient.configure("mirror", "http://localhost:5000/mb")
+    assert CoverArtManager().search_cover_musicbrainz("Band", "Album") is None
+    assert [url.split('?')[0] for url in requested] == ['http://localhost:5000/mb/ws/2/release/']
@@ -0,0 +1,42 @@
+import pytest
+
+from tagqt.core.query import QueryError, compile_query
+from tagqt.core.record import TrackRecord
+from tagqt.core.store import TrackStore
+from tagqt.core.textindex import TrigramIndex
+
+
+@pytest.fixture
+def store():
+    store = TrackStore()
+    # Sample rates are stored in whole kHz, as MetadataHandler reports them
+    store.append([
+        TrackRecord.create('/music/cd.flac', title='CD', sample_rate=44),
+        TrackRecord.create('/music/dvd.flac', title='DVD', sample_rate=48),
+        TrackRecord.create('/music/old.mp3', title='Old', sample_rate=22),
+    ])
+    return store
+
+
+def matches(store, text):
+    rows = compile_query(text, TrigramIndex()).rows(store)
+    return [store.value(row, 'title') for row in rows]
+
+
+@pytest.mark.parametrize('text', [
+    'samplerate:44100', 'samplerate:44.1', 'samplerate:44khz', 'samplerate:44.1kHz',
+    'samplerate=44100', 'samplerate:44100hz',
+])
+def test_sample_rate_matches_44_1_khz(store, text):
+    assert matches(store, text) == ['CD']
+
+
+def test_sample_rate_comparisons(store):
+    assert matches(store, 'samplerate<44100') == ['Old']
+    assert matches(store, 'samplerate>=44.1') == ['CD', 'DVD']
+    assert matches(store, 'samplerate:44.1..48khz') == ['CD', 'DVD']
+
+
+def test_sample_rate_rejects_other_units(store):
+    with pytest.raises(QueryError):
+        compile_query('samplerate:44mb', TrigramIndex())
@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+
+import pytest
+
+from tagqt.core import scan
+from tagqt.core.scan import MIN_PARALLEL_FILES, ScanEngine
+
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    # Every fourth path is missing, so results mix records and errors
+    paths = []
+    for i in range(MIN_PARALLEL_FILES + 20):
+        path = tmp_path / f'{i:03d}.mp3'
+        if i % 4:
+            path.write_bytes(MP3_FRAME * 5)
+        paths.append(str(path))
+    return paths
+
+
+def flatten(chunks):
+    return [result for chunk in chunks for result in chunk]
+
+
+def check_results(results, paths):
+    assert [r[0] for r in results] == paths
+    for i, (path, st, record, error) in enumerate(results):
+        if i % 4:
+            assert error is None and record.path == path and st.st_size == len(MP3_FRAME) * 5
+        else:
+            assert record is None and error
+
+
+def test_serial_scan_for_small_folders(paths):
+    engine = ScanEngine(workers=4, chunk_size=8)
+    check_results(flatten(engine.scan(paths[:10])), paths[:10])
+
+
+@pytest.mark.parametrize('use_threads', [True, False])
+def test_parallel_scan_keeps_path_order(paths, use_threads):
+    engine = ScanEngine(workers=3, chunk_size=7, use_threads=use_threads)
+    chunks = list(engine.scan(paths))
+    assert all(len(chunk) <= 7 for chunk in chunks)
+    check_results(flatten(chunks), paths)
+
+
+class BreaksAfter(ThreadPoolExecutor):
+    """A pool whose workers "die" after the first few chunks."""
+
+    def __init__(self, good):
+        super().__init__(max_workers=2)
+        self.good = good
+
+    def submit(self, fn, *args):
+        if self.good > 0:
+            self.good -= 1
+            return super().submit(fn, *args)
+        future = Future()
+        future.set_exception(BrokenExecutor("worker died"))
+        return future
+
+
+def test_broken_pool_falls_back_to_serial(paths, monkeypatch):
+    monkeypatch.setattr(ScanEngine, '_executor', lambda self, p: BreaksAfter(good=3))
+    engine = ScanEngine(workers=2, chunk_size=10)
+    check_results(flatten(engine.scan(paths)), paths)
+
+
+def test_stop_event_ends_the_scan(paths):
+    stop = threading.Event()
+    engine = ScanEngine(workers=2, chunk_size=10, use_threads=True)
+    seen = []
+    for chunk in engine.scan(paths, stop_event=stop):
+        seen.append(chunk)
+        stop.set()
+    assert len(seen) == 1
+    assert [r[0] for r in seen[0]] == paths[:10]
+
+
+def test_unavailable_pool_scans_serially(paths, monkeypatch):
+    def no_pool(self, p):
+        raise OSError("no semaphores")
+    monkeypatch.setattr(ScanEngine, '_executor', no_pool)
+    check_results(flatten(ScanEngine(workers=4).scan(paths)), paths)
+
+
+def test_network_paths_use_threads(monkeypatch, tmp_path):
+    monkeypatch.setattr(scan, 'is_network_path', lambda path: True)
+    executor = ScanEngine(workers=2)._executor([str(tmp_path / 'a.mp3')])
+    assert isinstance(executor, ThreadPoolExecutor)
+    executor.shutdown()
@@ -0,0 +1,29 @@
+from tagqt.core.record import TrackRecord
+from tagqt.core.store import TrackStore
+
+
+def test_same_inode_on_two_devices_keeps_both_rows():
+    store = TrackStore()
+    store.append([
+        TrackRecord.create('/mnt/a/song.flac', inode=42, device=1),
+        TrackRecord.create('/mnt/b/song.flac', inode=42, device=2),
+    ])
+    assert store.row_of_inode(1, 42) == 0
+    assert store.row_of_inode(2, 42) == 1
+    assert store.row_of_inode(3, 42) is None
+
+
+def test_replace_and_reindex_track_device_and_inode():
+    store = TrackStore()
+    store.append([
+        TrackRecord.create('/mnt/a/one.flac', inode=1, device=1),
+        TrackRecord.create('/mnt/a/two.flac', inode=2, device=1),
+    ])
+    store.replace(0, TrackRecord.create('/mnt/b/one.flac', inode=1, device=2))
+    assert store.row_of_inode(1, 1) is None
+    assert store.row_of_inode(2, 1) == 0
+
+    store.remove_range(0, 0)
+    store.reindex()
+    assert store.row_of_inode(2, 1) is None
+    assert store.row_of_inode(1, 2) == 0
@@ -0,0 +1,139 @@
+import io
+import os
+import struct
+
+import pytest
+from mutagen.easyid3 import EasyID3
+from mutagen.flac import FLAC, Picture
+from PIL import Image
+
+from tagqt.core.tags import MetadataHandler, WriteReport, _wrapped_id3
+
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+
+
+def _jpeg(width, height):
+    buf = io.BytesIO()
+    Image.new('RGB', (width, height), 'white').save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def mp3_path(tmp_path):
+    path = tmp_path / 'song.mp3'
+    path.write_bytes(MP3_FRAME * 20)
+    return str(path)
+
+
+@pytest.fixture
+def flac_path(tmp_path):
+    # STREAMINFO for 10 s of 44.1 kHz 16-bit stereo, then a frame header
+    info = struct.pack('>HH', 4096, 4096) + bytes(6)
+    info += ((44100 << 44) | (1 << 41) | (15 << 36) | 441000).to_bytes(8, 'big') + bytes(16)
+    path = tmp_path / 'track.flac'
+    path.write_bytes(b'fLaC' + bytes([0x80]) + len(info).to_bytes(3, 'big') + info
+                     + b'\xff\xf8' + bytes(1000))
+    return str(path)
+
+
+def test_set_cover_records_flac_dimensions(flac_path):
+    md = MetadataHandler(flac_path)
+    md.set_cover(_jpeg(300, 200))
+    assert md.save()
+
+    pic = FLAC(flac_path).pictures[0]
+    assert (pic.width, pic.height, pic.depth) == (300, 200, 24)
+    info = MetadataHandler(flac_path, scan=True).cover_info
+    assert (info['width'], info['height']) == (300, 200)
+
+
+def test_scan_reads_size_from_image_when_header_has_none(flac_path):
+    audio = FLAC(flac_path)
+    pic = Picture()
+    pic.type = 3
+    pic.mime = 'image/jpeg'
+    pic.data = _jpeg(120, 80)
+    audio.add_picture(pic)
+    audio.save()
+
+    md = MetadataHandler(flac_path, scan=True)
+    assert md.cover_info == {'mime': 'image/jpeg', 'width': 120, 'height': 80, 'size': len(pic.data)}
+    assert md.title == ''
+
+
+def test_save_without_changes_writes_nothing(mp3_path):
+    md = MetadataHandler(mp3_path)
+    md.title = ''
+    assert not md.is_dirty
+    assert not md.save()
+    assert md.bytes_written == 0
+
+
+def test_resize_reserves_padding_so_the_next_edit_is_in_place(mp3_path):
+    audio_size = os.path.getsize(mp3_path)
+    md = MetadataHandler(mp3_path)
+    md.title = 'First'
+    assert md.save(padding=4096)
+    assert md.rewritten and md.bytes_written == os.path.getsize(mp3_path)
+    size = os.path.getsize(mp3_path)
+    assert size >= audio_size + 4096
+
+    md = MetadataHandler(mp3_path)
+    md.title = 'A somewhat longer second title'
+    md.lyrics = 'la la la'
+    assert md.save()
+    assert not md.rewritten
+    assert os.path.getsize(mp3_path) == size
+    # Only the tag region was written
+    assert md.bytes_written == size - audio_size
+
+
+def test_flac_edit_in_place_writes_only_the_metadata(flac_path):
+    md = MetadataHandler(flac_path)
+    md.title = 'First'
+    assert md.save(padding=4096) and md.rewritten
+    size = os.path.getsize(flac_path)
+
+    md = MetadataHandler(flac_path)
+    md.title = 'Second'
+    assert md.save()
+    assert not md.rewritten and os.path.getsize(flac_path) == size
+    assert 0 < md.bytes_written < size
+
+
+def test_write_report_tallies_saves(mp3_path, flac_path):
+    report = WriteReport()
+    for path in (mp3_path, flac_path):
+        md = MetadataHandler(path)
+        md.title = 'New'
+        md.save()
+        report.add(md)
+    md = MetadataHandler(mp3_path)
+    md.artist = 'Band'
+    md.save()
+    report.add(md)
+    report.add(MetadataHandler(mp3_path))  # never saved
+
+    assert (report.rewritten, report.in_place, report.files) == (2, 1, 3)
+    assert report.total_bytes == report.in_place_bytes + report.rewritten_bytes
+    assert report.in_place_bytes < report.rewritten_bytes
+
+
+def test_mp3_cover_and_title_share_one_tag(mp3_path):
+    md = MetadataHandler(mp3_path)
+    md.title = 'Song'
+    md.set_cover(_jpeg(50, 50))
+    md.lyrics = 'words'
+    assert md.save()
+
+    md = MetadataHandler(mp3_path)
+    assert (md.title, md.lyrics) == ('Song', 'words')
+    assert md.get_cover() is not None
+
+
+def test_missing_easyid3_internals_fail_loudly():
+    easy = EasyID3()
+    assert _wrapped_id3(easy) is not None
+    del easy._EasyID3__id3
+    with pytest.raises(RuntimeError, match='EasyID3'):
+        _wrapped_id3(easy)
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from tagqt.core.throttle import HostPolicy, RequestCancelled, RequestScheduler, host_of
+
+
+def _hold(scheduler, url, entered, release, **kwargs):
+    """Start a thread that takes url's slot and keeps it until release is set."""
+    def run():
+        with scheduler.slot(url, **kwargs):
+            entered.set()
+            release.wait(5)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_host_of():
+    assert host_of('https://CoverArtArchive.org/release/1') == 'coverartarchive.org'
+    assert host_of('syncedlyrics') == 'syncedlyrics'
+
+
+def test_burst_goes_out_at_once_then_the_rate_applies():
+    scheduler = RequestScheduler({'example.org': HostPolicy(20.0, 3, 10)})
+    start = time.monotonic()
+    for _ in range(3):
+        with scheduler.slot('https://example.org/a'):
+            pass
+    assert time.monotonic() - start < 0.04
+    for _ in range(2):
+        with scheduler.slot('https://example.org/a'):
+            pass
+    # Two more tokens at 20 per second take about 0.1 s
+    assert time.monotonic() - start >= 0.09
+    stats = scheduler.stats()['example.org']
+    assert stats.requests == 5 and stats.max_wait >= 0.04
+
+
+def test_hosts_do_not_wait_on_each_other():
+    scheduler = RequestScheduler({'slow.org': HostPolicy(0.1, 1, 1)})
+    with scheduler.slot('https://slow.org/'):
+        pass
+    start = time.monotonic()
+    with scheduler.slot('https://fast.org/'):
+        pass
+    assert time.monotonic() - start < 0.05
+
+
+def test_policy_applies_to_subdomains():
+    scheduler = RequestScheduler({'example.org': HostPolicy(None, 1, 1)})
+    entered, release = threading.Event(), threading.Event()
+    holder = _hold(scheduler, 'https://api.example.org/x', entered, release)
+    assert entered.wait(2)
+    waiting = threading.Event()
+    _hold(scheduler, 'https://api.example.org/y', waiting, release)
+    _wait_until(lambda: scheduler.stats()['api.example.org'].queued == 1)
+    assert not waiting.is_set()
+    release.set()
+    holder.join(2)
+    assert waiting.wait(2)
+
+
+def test_in_flight_cap_queues_the_rest():
+    scheduler = RequestScheduler({'example.org': HostPolicy(None, 1, 2)})
+    release = threading.Event()
+    entered = [threading.Event() for _ in range(3)]
+    threads = [_hold(scheduler, 'https://example.org/', e, release) for e in entered]
+    _wait_until(lambda: sum(e.is_set() for e in entered) == 2)
+    stats = scheduler.stats()['example.org']
+    assert (stats.in_flight, stats.queued) == (2, 1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert all(e.is_set() for e in entered)
+    assert scheduler.totals()[0] == 3
+    assert scheduler.stats()['example.org'].in_flight == 0
+
+
+def test_cancel_while_queued():
+    scheduler = RequestScheduler({'example.org': HostPolicy(None, 1, 1)})
+    entered, release = threading.Event(), threading.Event()
+    _hold(scheduler, 'https://example.org/', entered, release)
+    assert entered.wait(2)
+
+    cancel = threading.Event()
+    outcome = []
+
+    def queued():
+        try:
+            with scheduler.slot('https://example.org/', cancel=cancel):
+                outcome.append('ran')
+        except RequestCancelled:
+            outcome.append('cancelled')
+
+    thread = threading.Thread(target=queued, daemon=True)
+    thread.start()
+    _wait_until(lambda: scheduler.stats()['example.org'].queued == 1)
+    cancel.set()
+    thread.join(1)
+    assert outcome == ['cancelled']
+    assert scheduler.stats()['example.org'].queued == 0
+    release.set()
+
+
+def test_already_cancelled_request_does_not_take_a_token():
+    scheduler = RequestScheduler({'example.org': HostPolicy(1.0, 1, 1)})
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(RequestCancelled):
+        with scheduler.slot('https://example.org/', cancel=cancel):
+            pass
+    start = time.monotonic()
+    with scheduler.slot('https://example.org/'):
+        pass
+    assert time.monotonic() - start < 0.05
+
+
+def test_set_policy_wakes_waiting_requests():
+    scheduler = RequestScheduler({'example.org': HostPolicy(None, 1, 1)})
+    entered, release = threading.Event(), threading.Event()
+    _hold(scheduler, 'https://example.org/', entered, release)
+    assert entered.wait(2)
+    second = threading.Event()
+    _hold(scheduler, 'https://example.org/', second, release)
+    _wait_until(lambda: scheduler.stats()['example.org'].queued == 1)
+    scheduler.set_policy('example.org', HostPolicy(None, 1, 2))
+    assert second.wait(1)
+    release.set()
@@ -0,0 +1,69 @@
+import musicbrainzngs
+import mutagen
+import pytest
+from PySide6.QtCore import Qt
+
+from tagqt.core import musicbrainz
+from tagqt.ui.workers import AutoTagWorker
+
+# One silent MPEG-1 Layer III frame
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+
+RELEASE = {
+    'id': 'rel-1', 'title': 'Record', 'status': 'Official', 'date': '2001',
+    'artist-credit': [{'name': 'Band', 'artist': {'id': 'art-1'}}],
+    'tag-list': [{'name': 'rock', 'count': '3'}],
+    'medium-list': [{'position': '1', 'track-list': [
+        {'position': str(n), 'recording': {'id': f'rec-{n}', 'title': f'Track {n}'}} for n in (1, 2)
+    ]}],
+}
+
+
+@pytest.fixture
+def album(tmp_path, monkeypatch):
+    paths = []
+    for n in (1, 2):
+        path = tmp_path / f'{n:02d} Track {n}.mp3'
+        path.write_bytes(MP3_FRAME * 50)
+        audio = mutagen.File(path, easy=True)
+        audio.add_tags()
+        audio.update({'title': [f'Track {n}'], 'artist': ['Band'], 'album': ['Record']})
+        audio.save()
+        paths.append(str(path))
+    monkeypatch.setattr(musicbrainz, 'get_http_cache', lambda: None)
+    monkeypatch.setattr(musicbrainzngs, 'search_releases', lambda **kw: {'release-list': [RELEASE]})
+    monkeypatch.setattr(musicbrainzngs, 'get_release_by_id', lambda rid, includes=None: {'release': RELEASE})
+    return paths
+
+
+def run_worker(worker):
+    results = []
+    worker.results.connect(results.extend, type=Qt.DirectConnection)
+    worker.run()
+    return {path: (status, message) for path, status, message in results}
+
+
+def test_auto_tag_reports_only_tags_it_changed(album):
+    first = run_worker(AutoTagWorker(album, skip_existing=False))
+    assert {status for status, _ in first.values()} == {'Updated'}
+    assert 'year' in first[album[0]][1]
+
+    # Everything now matches the release, so nothing is written again
+    second = run_worker(AutoTagWorker(album, skip_existing=False))
+    assert second == {path: ('Skipped', 'All tags already present') for path in album}
+
+
+def test_tracklist_fetched_to_choose_a_release_is_reused(album, monkeypatch):
+    other = dict(RELEASE, id='rel-2', date='2010')
+    monkeypatch.setattr(musicbrainzngs, 'search_releases', lambda **kw: {'release-list': [RELEASE, other]})
+    fetched = []
+
+    def get_release_by_id(rid, includes=None):
+        fetched.append(rid)
+        return {'release': RELEASE if rid == 'rel-1' else other}
+
+    monkeypatch.setattr(musicbrainzngs, 'get_release_by_id', get_release_by_id)
+    results = run_worker(AutoTagWorker(album, skip_existing=False))
+    assert {status for status, _ in results.values()} == {'Updated'}
+    # Both candidates were compared by duration; the winner isn't downloaded again
+    assert sorted(fetched) == ['rel-1', 'rel-2']